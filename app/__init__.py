@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import hmac
 import os
 import secrets
 import logging
@@ -11,10 +13,13 @@ from flask import Flask
 from flask import g, request, redirect, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from flask_login import LoginManager
+from flask_login import LoginManager, current_user
 from flask_caching import Cache
 
 from config import get_config
+from app.assets import init_assets
+from app.compression import init_compression
+from app.cli import register_cli_commands
 
 # 初始化擴充套件
 db = SQLAlchemy()
@@ -108,8 +113,24 @@ def register_blueprints(app: 'Flask') -> None:
     app.logger.info('All blueprints registered successfully')
 
 
+def csp_nonce_placeholder(secret_key: str = None) -> str:
+    """
+    依部署產生 nonce 佔位符
+
+    由 SECRET_KEY 衍生：所有 worker 相同（共享的頁面快取可互用）且無法從原始碼得知。
+    佔位符會在 HTML 回應中被換成有效的 nonce，若為公開的固定字串，
+    注入的標記只要寫入佔位符即可取得 nonce。沒有 SECRET_KEY 時每次啟動隨機產生。
+    """
+    if not secret_key:
+        return f'csp-nonce-{secrets.token_hex(16)}'
+    digest = hmac.new(secret_key.encode('utf-8'), b'csp-nonce-placeholder', hashlib.sha256).hexdigest()
+    return f'csp-nonce-{digest[:32]}'
+
+
 def setup_security_headers(app: 'Flask') -> None:
     """配置安全相關的請求處理器"""
+    if app.config.get('CSP_NONCE_PLACEHOLDER') is None:
+        app.config['CSP_NONCE_PLACEHOLDER'] = csp_nonce_placeholder(app.config.get('SECRET_KEY'))
     
     @app.before_request
     def before_request():
@@ -127,6 +148,16 @@ def setup_security_headers(app: 'Flask') -> None:
     @app.after_request
     def set_security_headers(response):
         """為所有回應新增全面的安全標頭"""
+        # 模板以固定佔位符輸出 nonce（見 inject_template_vars），
+        # 在此以單次替換換上本次請求的 nonce，讓預先渲染 / 快取的 HTML 可重複使用
+        placeholder = app.config.get('CSP_NONCE_PLACEHOLDER')
+        nonce = getattr(g, 'csp_nonce', None)
+        if (placeholder and nonce and response.mimetype == 'text/html'
+                and not response.is_streamed and not response.direct_passthrough):
+            response.set_data(response.get_data().replace(
+                placeholder.encode('ascii'), nonce.encode('ascii')
+            ))
+        
         # 基本安全標頭
         response.headers['X-Content-Type-Options'] = 'nosniff'
         response.headers['X-Frame-Options'] = 'DENY'
@@ -137,8 +168,10 @@ def setup_security_headers(app: 'Flask') -> None:
             response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains; preload'
         
         # 簡單的內容安全政策
+        # 304 回應不送 CSP：瀏覽器會以 304 的標頭更新快取，
+        # 新 nonce 與快取中 HTML 的舊 nonce 不符會導致內嵌腳本被封鎖
         csp_config = app.config.get('CSP')
-        if csp_config:
+        if csp_config and response.status_code != 304:
             csp_parts = []
             for directive, values in csp_config.items():
                 if directive in ('script-src', 'style-src'):
@@ -154,6 +187,32 @@ def setup_security_headers(app: 'Flask') -> None:
         return response
 
 
+# 預先渲染的 404 頁面數量上限（鍵含 Host 標頭，由用戶端控制，需有上限）
+NOT_FOUND_PAGE_LIMIT = 16
+
+
+def render_not_found(app: 'Flask') -> str:
+    """
+    取得 404 頁面內容
+
+    匿名訪客的 404 頁面只隨主機名稱（絕對網址）與年份（頁尾）改變，nonce 為佔位符，
+    因此每個組合只渲染一次，之後直接回傳預先渲染的內容，不再經過模板與 context processor。
+    已登入用戶（導覽列不同）或未使用 nonce 佔位符時照常渲染。
+    """
+    if not app.config.get('CSP_NONCE_PLACEHOLDER') or current_user.is_authenticated:
+        return render_template('error/404.html')
+    tz = pytz.timezone(app.config.get('TIMEZONE', 'UTC'))
+    key = (request.host_url, datetime.now(tz).year)
+    pages = app.extensions.setdefault('not_found_pages', {})
+    body = pages.get(key)
+    if body is None:
+        body = render_template('error/404.html')
+        if len(pages) >= NOT_FOUND_PAGE_LIMIT:
+            pages.clear()
+        pages[key] = body
+    return body
+
+
 def register_error_handlers(app: 'Flask') -> None:
     """為應用程式註冊錯誤處理器"""
     
@@ -168,7 +227,7 @@ def register_error_handlers(app: 'Flask') -> None:
     def not_found_error(error):
         """處理 404 找不到頁面錯誤"""
         app.logger.info(f"Page not found: {request.url}")
-        return render_template('error/404.html'), 404
+        return render_not_found(app), 404
     
     @app.errorhandler(500)
     def internal_error(error):
@@ -192,18 +251,18 @@ def register_context_processors(app: 'Flask') -> None:
         from app.models import Post, Category
         tz = pytz.timezone(app.config.get('TIMEZONE', 'UTC'))
 
-        # 提供導覽列的分類（加上快取，降低查詢負載）
-        categories = cache.get('nav_available_categories')
-        if categories is None:
-            try:
-                categories = Category.query.order_by(Category.name).all()
-            except Exception:
-                categories = []
-            cache.set('nav_available_categories', categories, timeout=app.config.get('CATEGORY_CACHE_TIMEOUT', 300))
+        # 提供導覽列的分類（快取的 CategoryView，過期時只有一個請求重新查詢）
+        try:
+            categories = Category.cached_views()
+        except Exception:
+            categories = []
+
+        # 佔位符模式下模板不嵌入真正的 nonce，輸出內容與請求無關、可被快取
+        csp_nonce = app.config.get('CSP_NONCE_PLACEHOLDER') or getattr(g, 'csp_nonce', '')
 
         return {
             'now': datetime.now(tz),
-            'csp_nonce': getattr(g, 'csp_nonce', ''),
+            'csp_nonce': csp_nonce,
             'app_version': app.config.get('VERSION', '1.0.0'),
             'debug_mode': app.debug,
             'csrf_enabled': csrf is not None,
@@ -247,9 +306,13 @@ def create_app(config_name: str = None, config_class = None) -> 'Flask':
     # Configure application components
     configure_logging(app)
     register_blueprints(app)
+    # 壓縮必須最先註冊，其 after_request 才會在 nonce 替換之後最後執行
+    init_compression(app)
     setup_security_headers(app)
     register_error_handlers(app)
     register_context_processors(app)
+    init_assets(app)
+    register_cli_commands(app)
 
     
     # Development-specific setup
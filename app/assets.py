@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+靜態資源版本管理
+
+為 app/static 下的每個檔案計算內容雜湊，提供 static_url() 模板函數輸出
+`?v=<hash>` 形式的網址。檔案內容不變時網址不變，瀏覽器與 Nginx 可長期快取；
+內容一旦改變，雜湊隨之改變，自動達到快取失效。
+
+清單可於部署時以 `flask assets build` 預先產生（寫入 static/manifest.json），
+未產生時則在應用程式啟動時即時計算。
+
+同一個建置步驟也會為可壓縮的檔案（CSS、文字、SVG、ICO 等）寫入 .gz / .br
+預先壓縮版本，static 路由再依 Accept-Encoding 選擇最小的版本回傳，
+避免 Nginx 未命中時由 Flask 送出未壓縮內容。Brotli 為選用套件，
+未安裝時僅產生 gzip 版本。
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Brotli 為選用套件
+    brotli = None
+
+MANIFEST_FILENAME = 'manifest.json'
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 31536000  # 一年
+
+# 已壓縮格式（woff2、webp、png、jpg）再壓縮幾乎沒有效益，不列入
+COMPRESSIBLE_EXTENSIONS = frozenset({'.css', '.js', '.svg', '.txt', '.xml', '.json', '.ico', '.html', '.map'})
+MIN_COMPRESS_SIZE = 256
+# 依偏好順序排列：(Content-Encoding, 副檔名)
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _iter_static_files(static_folder: str):
+    """列出 static 目錄下需要版本化的檔案（相對路徑，使用 / 分隔）"""
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if rel_path == MANIFEST_FILENAME or rel_path.endswith(('.gz', '.br')):
+                continue
+            yield rel_path, path
+
+
+def _file_digest(path: str) -> str:
+    """計算檔案內容的 SHA-256 雜湊（取前 HASH_LENGTH 碼）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def build_manifest(static_folder: str) -> dict[str, str]:
+    """掃描 static 目錄並回傳 {相對路徑: 內容雜湊}"""
+    return {
+        rel_path: _file_digest(path)
+        for rel_path, path in sorted(_iter_static_files(static_folder))
+    }
+
+
+def write_manifest(static_folder: str) -> dict[str, str]:
+    """重新計算並寫入 static/manifest.json，回傳清單內容"""
+    manifest = build_manifest(static_folder)
+    manifest_path = os.path.join(static_folder, MANIFEST_FILENAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    """以最高壓縮等級壓縮資料（僅於建置時使用）"""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        if brotli is None:
+            raise RuntimeError('Brotli is not installed')
+        return brotli.compress(data, quality=11)
+    raise ValueError(f'Unsupported encoding: {encoding}')
+
+
+def compress_static_assets(static_folder: str) -> list[tuple[str, int, dict[str, int]]]:
+    """
+    為可壓縮的靜態檔案寫入 .gz / .br 兄弟檔案
+
+    壓縮後沒有變小的版本不寫入（並移除舊檔），避免協商到較大的檔案。
+
+    返回：
+        list: [(相對路徑, 原始大小, {encoding: 壓縮後大小})]
+    """
+    results = []
+    for rel_path, path in sorted(_iter_static_files(static_folder)):
+        if os.path.splitext(rel_path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            continue
+
+        sizes = {}
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            target = path + suffix
+            if encoding == 'br' and brotli is None:
+                continue
+            compressed = compress_bytes(data, encoding)
+            if len(compressed) >= len(data):
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            tmp_path = target + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, target)
+            sizes[encoding] = len(compressed)
+        results.append((rel_path, len(data), sizes))
+    return results
+
+
+def find_precompressed_assets(static_folder: str) -> dict[str, frozenset[str]]:
+    """
+    找出可用的預先壓縮版本
+
+    只採用修改時間不早於原始檔的兄弟檔案，避免原始檔更新後送出過期內容。
+
+    返回：
+        dict: {相對路徑: 可用的 Content-Encoding 集合}
+    """
+    available = {}
+    for rel_path, path in _iter_static_files(static_folder):
+        if os.path.splitext(rel_path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            continue
+        source_mtime = os.path.getmtime(path)
+        encodings = frozenset(
+            encoding for encoding, suffix in PRECOMPRESSED_ENCODINGS
+            if os.path.exists(path + suffix) and os.path.getmtime(path + suffix) >= source_mtime
+        )
+        if encodings:
+            available[rel_path] = encodings
+    return available
+
+
+def send_static_asset(filename: str):
+    """
+    static 路由的檢視函數：依 Accept-Encoding 回傳預先壓縮版本
+
+    - 優先 br，其次 gzip，都不接受時回傳原始檔案
+    - 可壓縮的檔案一律加上 Vary: Accept-Encoding
+    - 仍使用 send_from_directory，保有路徑檢查與 ETag / 304 行為
+    """
+    static_folder = current_app.static_folder
+    encodings = current_app.extensions.get('precompressed_assets', {}).get(filename)
+
+    if encodings:
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding in encodings and request.accept_encodings[encoding]:
+                response = send_from_directory(
+                    static_folder, filename + suffix,
+                    mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                    max_age=current_app.get_send_file_max_age(filename),
+                )
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+
+    response = current_app.send_static_file(filename)
+    if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def load_manifest(app) -> dict[str, str]:
+    """
+    載入資源清單
+
+    - 生產環境優先讀取部署時產生的 manifest.json
+    - 開發環境或檔案不存在時，於啟動時即時計算
+    """
+    manifest_path = os.path.join(app.static_folder, MANIFEST_FILENAME)
+    if not app.debug and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            app.logger.warning(f"無法讀取資源清單 {manifest_path}：{e}，改為即時計算")
+    return build_manifest(app.static_folder)
+
+
+def static_url(filename: str, **kwargs) -> str:
+    """
+    產生帶內容雜湊的靜態檔案網址
+
+    範例：static_url('css/style.css') -> /static/css/style.css?v=3f2a9c0b1d4e
+    不在清單中的檔案（例如尚未上傳的縮圖）回傳一般的 static 網址。
+    """
+    digest = current_app.extensions.get('asset_manifest', {}).get(filename)
+    if digest:
+        kwargs['v'] = digest
+    return url_for('static', filename=filename, **kwargs)
+
+
+def set_static_cache_headers(response):
+    """對版本化（?v= 與清單雜湊一致）的靜態檔案設定長期不可變快取"""
+    if request.endpoint != 'static' or response.status_code not in (200, 304):
+        return response
+
+    version = request.args.get('v')
+    filename = (request.view_args or {}).get('filename')
+    if version and version == current_app.extensions.get('asset_manifest', {}).get(filename):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app) -> None:
+    """載入資源清單，註冊 static_url 模板函數、預先壓縮檔案路由與快取標頭處理器"""
+    manifest = load_manifest(app)
+    app.extensions['asset_manifest'] = manifest
+    app.extensions['precompressed_assets'] = find_precompressed_assets(app.static_folder)
+    app.add_template_global(static_url, 'static_url')
+    app.after_request(set_static_cache_headers)
+
+    if 'static' in app.view_functions:
+        app.view_functions['static'] = send_static_asset
+
+    app.logger.info(
+        f'Asset manifest loaded: {len(manifest)} files, '
+        f'{len(app.extensions["precompressed_assets"])} precompressed'
+    )
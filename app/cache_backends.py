@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+兩層快取（CACHE_TYPE = 'app.cache_backends.TieredCache'）
+
+SimpleCache 讓每個 gunicorn worker 各有一份私有 dict：N 個 worker 就有 N 份冷快取，
+失效後資料庫負載為 N 倍，而 cache.delete 只清得到處理該請求的 worker。
+
+TieredCache 在共享後端（L2，預設 FileSystemCache，可設為 RedisCache）前面
+加上每個 worker 的有界 LRU（L1）：
+
+- 讀取先查 L1（未過期直接回傳），未命中才讀 L2 並放入 L1
+- 寫入同時寫 L2 與本 worker 的 L1；其他 worker 的 L1 不會收到新值
+- 失效操作（delete、delete_many、inc / dec、clear）在 L2 的失效紀錄（最近
+  INVALIDATION_LOG_SIZE 筆，每筆一個隨機版本值與被失效的鍵）加上一筆
+- 每個 worker 至多每 CACHE_L1_POLL_INTERVAL 秒讀一次失效紀錄，只從 L1 移除
+  上次讀取後被失效的鍵，其他項目保留；跟不上紀錄（落後超過紀錄長度）時才清空整個 L1
+- set 不讀取 L2 判斷鍵是否存在，也不寫入失效紀錄：覆寫同一個鍵後，其他 worker 的
+  L1 最多再使用舊值 CACHE_L1_TTL 秒。需要立即失效的值應放在帶版本的鍵下
+  （見 app.cache_namespaces），或以 delete / inc 變更
+- L1 項目另有 CACHE_L1_TTL 上限，作為輪詢之外的保險
+
+失效紀錄以讀取、附加、寫回更新；FileSystemCache 上兩個 worker 同時失效時可能遺失一筆，
+該鍵在其他 worker 的 L1 最多延遲 CACHE_L1_TTL 秒失效。
+
+L1 與 SimpleCache 相同，保存 pickle 後的位元組，取出的物件互不共用，
+呼叫端修改取得的值不會影響快取。
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from flask_caching.backends.base import BaseCache
+from werkzeug.utils import import_string
+
+INVALIDATION_LOG_KEY = '__tiered_cache_invalidations__'
+# L2 保存的失效紀錄筆數；worker 在一個輪詢間隔內落後超過此數時清空整個 L1
+INVALIDATION_LOG_SIZE = 256
+# 尚未讀過失效紀錄（紀錄為空時讀到的版本值是 None）
+_UNSYNCED = object()
+
+
+class TieredCache(BaseCache):
+    """程序內 LRU（L1）+ 共享後端（L2）的兩層快取"""
+
+    def __init__(self, shared: BaseCache, default_timeout: int = 300, max_entries: int = 1024,
+                 ttl: float = 30, poll_interval: float = 1.0):
+        super().__init__(default_timeout=default_timeout)
+        self.shared = shared
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        # 鍵 -> (到期時間（monotonic）, pickle 後的值)
+        self._local: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        # 最近一次讀到的失效紀錄版本值
+        self._seen = _UNSYNCED
+        self._checked_at = float('-inf')
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        """
+        由 Flask-Caching 呼叫，依 CACHE_SHARED_TYPE 建立 L2
+
+        CACHE_SHARED_TYPE 與 CACHE_TYPE 相同，可為 Flask-Caching 內建後端名稱
+        （FileSystemCache、RedisCache 等）或完整匯入路徑；FileSystemCache 未設定
+        CACHE_DIR 時使用 instance/cache。
+        """
+        shared_type = config.get('CACHE_SHARED_TYPE') or 'FileSystemCache'
+        if '.' not in shared_type:
+            shared_type = f'flask_caching.backends.{shared_type}'
+        shared_class = import_string(shared_type)
+        if config.get('CACHE_DIR') is None:
+            config['CACHE_DIR'] = os.path.join(app.instance_path, 'cache')
+        shared = shared_class.factory(app, config, list(args), dict(kwargs))
+        return cls(
+            shared,
+            default_timeout=kwargs.get('default_timeout', config['CACHE_DEFAULT_TIMEOUT']),
+            max_entries=config.get('CACHE_L1_MAX_ENTRIES', 1024),
+            ttl=config.get('CACHE_L1_TTL', 30),
+            poll_interval=config.get('CACHE_L1_POLL_INTERVAL', 1.0),
+        )
+
+    # ---- L1 ----
+
+    def _sync(self) -> None:
+        """依輪詢間隔讀取失效紀錄，從 L1 移除其他 worker 失效的鍵"""
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_interval:
+            return
+        self._checked_at = now
+        log = self.shared.get(INVALIDATION_LOG_KEY) or ()
+        head = log[-1][0] if log else None
+        if head == self._seen:
+            return
+        tokens = [token for token, _keys in log]
+        if self._seen is None and len(log) < INVALIDATION_LOG_SIZE:
+            # 上次讀取時紀錄為空，紀錄中的每一筆都是之後新增的
+            start = 0
+        elif self._seen is not _UNSYNCED and self._seen in tokens:
+            start = tokens.index(self._seen) + 1
+        else:
+            # 第一次讀取、落後超過紀錄長度或紀錄已被清除：無法得知哪些鍵變了
+            start = None
+        keys = None
+        if start is not None:
+            keys = set()
+            for _token, entry_keys in log[start:]:
+                if entry_keys is None:
+                    keys = None
+                    break
+                keys.update(entry_keys)
+        with self._lock:
+            if keys is None:
+                self._local.clear()
+            else:
+                for key in keys:
+                    self._local.pop(key, None)
+        self._seen = head
+
+    def _invalidate(self, keys: Optional[Tuple[str, ...]]) -> None:
+        """
+        在失效紀錄加上一筆，讓其他 worker 從 L1 移除這些鍵（None 表示全部）
+
+        必須在 L2 的異動之後呼叫：看到這筆紀錄而移除鍵的 worker，
+        之後從 L2 讀到的一定是異動後的內容。
+        """
+        log = tuple(self.shared.get(INVALIDATION_LOG_KEY) or ())
+        entry = (uuid.uuid4().hex, keys)
+        self.shared.set(INVALIDATION_LOG_KEY, (log + (entry,))[-INVALIDATION_LOG_SIZE:], timeout=0)
+
+    def _local_get(self, key: str) -> tuple[bool, Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return False, None
+            expires_at, data = item
+            if expires_at <= now:
+                del self._local[key]
+                return False, None
+            self._local.move_to_end(key)
+        return True, pickle.loads(data)
+
+    def _local_set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        timeout = self._normalize_timeout(timeout)
+        ttl = min(self.ttl, timeout) if timeout else self.ttl
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, data)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    # ---- Cache API ----
+
+    def get(self, key: str) -> Any:
+        self._sync()
+        found, value = self._local_get(key)
+        if found:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self._local_set(key, value)
+        return value
+
+    def get_many(self, *keys: str) -> list:
+        return [self.get(key) for key in keys]
+
+    def get_shared(self, key: str) -> Any:
+        """略過 L1 直接讀取 L2，並以讀到的值更新本 worker 的 L1
+
+        set 不通知其他 worker，L1 的值可能比 L2 舊；呼叫端發現 L1 的值已過時
+        （例如 app.cache_fetch 的項目版本不符）時以此取得其他 worker 寫入的新值。
+        """
+        value = self.shared.get(key)
+        if value is None:
+            self._local_delete(key)
+        else:
+            self._local_set(key, value)
+        return value
+
+    def has(self, key: str) -> bool:
+        self._sync()
+        found, _value = self._local_get(key)
+        return found or self.shared.has(key)
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        # 不通知其他 worker（見模組說明）：其他 worker 的 L1 最多 CACHE_L1_TTL 秒後讀到新值
+        result = self.shared.set(key, value, timeout=timeout)
+        self._local_set(key, value, timeout)
+        return result
+
+    def set_many(self, mapping: dict, timeout: Optional[int] = None) -> list:
+        result = self.shared.set_many(mapping, timeout=timeout)
+        for key, value in mapping.items():
+            self._local_set(key, value, timeout)
+        return result
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        # 只在鍵不存在時寫入，不會讓其他 worker 的 L1 過時
+        added = self.shared.add(key, value, timeout=timeout)
+        if added:
+            self._local_set(key, value, timeout)
+        return added
+
+    def delete(self, key: str) -> bool:
+        result = self.shared.delete(key)
+        self._local_delete(key)
+        self._invalidate((key,))
+        return result
+
+    def delete_many(self, *keys: str) -> list:
+        result = self.shared.delete_many(*keys)
+        self._local_delete(*keys)
+        self._invalidate(keys)
+        return result
+
+    def clear(self) -> bool:
+        result = self.shared.clear()
+        with self._lock:
+            self._local.clear()
+        self._invalidate(None)
+        return result
+
+    def inc(self, key: str, delta: int = 1) -> Optional[int]:
+        result = self.shared.inc(key, delta=delta)
+        self._local_delete(key)
+        self._invalidate((key,))
+        return result
+
+    def dec(self, key: str, delta: int = 1) -> Optional[int]:
+        result = self.shared.dec(key, delta=delta)
+        self._local_delete(key)
+        self._invalidate((key,))
+        return result
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+防止快取雪崩（cache stampede）的讀取
+
+熱門項目（導覽列分類、儀表板統計）過期或所屬命名空間失效的瞬間，
+所有 worker 的所有執行緒會同時重新計算同一份資料。fetch() 以三種方式避免：
+
+- 單一計算（single-flight）：只有取得鎖的呼叫者重新計算；鎖同時以程序內的
+  threading.Lock 與共享快取的 add（跨 worker）取得
+- 過期仍可用（stale-while-revalidate）：未取得鎖的呼叫者直接回傳舊值，
+  包含命名空間剛失效時的上一版資料；完全沒有舊值時短暫等待計算結果
+- 機率性提前更新（XFetch）：到期前，依上次計算耗時 delta 以
+  now - delta * beta * ln(rand) >= expires_at 的機率提前重新計算，
+  熱門項目通常在過期前就已更新
+
+項目以「命名空間:名稱」為鍵（不含版本），值為 (命名空間版本, 值, 計算耗時, 到期時間)，
+版本不符即視為過期的舊值。快取保存時間為 timeout 的兩倍，過期後仍有一段時間可作為舊值。
+
+使用 TieredCache 時：
+- 鎖只存在共享後端（L2），取得與釋放都不經過 L1，也不寫入 L1 的失效紀錄
+- 更新項目以 set 覆寫，不讓任何 worker 的 L1 失效；其他 worker 的 L1 項目過時
+  （版本不符或已到期）時，先略過 L1 從 L2 讀一次，取得其他 worker 已算好的新值
+"""
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from app import cache
+from app.cache_backends import TieredCache
+from app.cache_namespaces import namespace_version
+
+# 取得鎖的呼叫者最長的計算時間，逾時後鎖自動釋放
+LOCK_TIMEOUT = 30
+# 沒有舊值可回傳時，等待其他呼叫者計算結果的上限（秒）
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.02
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(key: str) -> threading.Lock:
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def _shared_backend():
+    """鎖使用的共享後端（TieredCache 時為其 L2）"""
+    backend = cache.cache
+    return backend.shared if isinstance(backend, TieredCache) else backend
+
+
+def _read_shared(key: str):
+    """略過 TieredCache 的 L1 讀取項目；其他後端與 cache.get 相同"""
+    backend = cache.cache
+    return backend.get_shared(key) if isinstance(backend, TieredCache) else cache.get(key)
+
+
+def _is_fresh(entry, version: int, beta: float) -> bool:
+    entry_version, _value, delta, expires_at = entry
+    if entry_version != version:
+        return False
+    # 1 - random() 落在 (0, 1]，避免 log(0)
+    return time.time() - delta * beta * math.log(1.0 - random.random()) < expires_at
+
+
+def _compute_and_store(key: str, version: int, compute: Callable[[], Any], timeout: int) -> Any:
+    started = time.time()
+    value = compute()
+    delta = time.time() - started
+    cache.set(key, (version, value, delta, started + delta + timeout), timeout=timeout * 2)
+    return value
+
+
+def fetch(namespace: str, name: str, compute: Callable[[], Any], timeout: int, beta: float = 1.0) -> Any:
+    """
+    取得快取值，必要時由單一呼叫者重新計算
+
+    Args:
+        namespace: 所屬的快取命名空間（見 app.cache_namespaces）
+        name: 命名空間內的名稱
+        compute: 重新計算的函式
+        timeout: 快取的有效秒數
+        beta: XFetch 的提前程度，大於 1 更早更新
+
+    Returns:
+        快取值或重新計算的值；其他呼叫者計算期間可能是舊值
+    """
+    key = f'{namespace}:{name}'
+    version = namespace_version(namespace)
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(entry, version, beta):
+        return entry[1]
+    if isinstance(cache.cache, TieredCache):
+        # L1 的值可能比 L2 舊：其他 worker 可能已經算好新值
+        entry = _read_shared(key) or entry
+        if entry is not None and _is_fresh(entry, version, beta):
+            return entry[1]
+
+    local_lock = _local_lock(key)
+    lock_key = f'{key}:lock'
+    shared = _shared_backend()
+    if local_lock.acquire(blocking=False):
+        try:
+            if shared.add(lock_key, True, timeout=LOCK_TIMEOUT):
+                try:
+                    return _compute_and_store(key, version, compute, timeout)
+                finally:
+                    shared.delete(lock_key)
+        finally:
+            local_lock.release()
+
+    # 其他呼叫者正在計算
+    if entry is not None:
+        return entry[1]
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = _read_shared(key) or entry
+        if entry is not None and entry[0] == version:
+            return entry[1]
+    # 等待逾時（計算者失敗或過慢）：等待期間出現的舊值（例如更舊的版本）仍優先回傳
+    if entry is not None:
+        return entry[1]
+    # 完全沒有可回傳的值，只能自行計算
+    return _compute_and_store(key, version, compute, timeout)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+快取命名空間
+
+快取項目依資料來源分為幾個命名空間，每個命名空間在快取中有一個版本號，
+空間內的鍵都帶上目前的版本：
+
+    namespaced_key('categories', 'nav')  ->  'categories:v1718000000000:nav'
+
+失效整個命名空間只需換掉版本號，之後所有 worker 產生的鍵都換成新版本，
+舊版本的項目不再被讀取並由逾時自然淘汰。新增的快取項目只要使用 namespaced_key，
+不必登記到任何刪除清單。
+
+- posts：由文章內容衍生的資料（搜尋建議索引等）
+- categories：分類清單、表單選單、導覽列
+- stats：儀表板統計
+- pages：公開頁面的整頁快取
+
+換版本的方式依共享後端而定：
+
+- Redis、Memcached（含作為 TieredCache 的 L2）：一次 inc，為原子操作
+- 其他後端（SimpleCache、FileSystemCache）：inc 不是原子操作，且會把版本鍵改為預設逾時，
+  因此改為刪除版本鍵後寫入新的隨機版本號；同時失效的呼叫者各自寫入的版本號都是新的
+
+版本號為隨機的 62 位元整數，版本鍵過期或被淘汰後重新建立時，不會與尚未淘汰的舊鍵相撞。
+"""
+import secrets
+
+from cachelib import MemcachedCache, RedisCache
+
+from app import cache
+
+NAMESPACES = ('posts', 'categories', 'stats', 'pages')
+
+# inc 為原子操作的共享後端
+ATOMIC_INC_BACKENDS = (RedisCache, MemcachedCache)
+
+
+def _version_key(namespace: str) -> str:
+    if namespace not in NAMESPACES:
+        raise ValueError(f'Unknown cache namespace: {namespace}')
+    return f'ns:{namespace}:version'
+
+
+def _new_version() -> int:
+    return secrets.randbits(62)
+
+
+def _has_atomic_inc() -> bool:
+    """目前的快取後端（TieredCache 時為其 L2）是否提供原子的 inc"""
+    backend = cache.cache
+    backend = getattr(backend, 'shared', backend)
+    return isinstance(backend, ATOMIC_INC_BACKENDS)
+
+
+def namespace_version(namespace: str) -> int:
+    """取得命名空間目前的版本號，不存在時建立"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=0)
+        version = cache.get(key)
+    return version
+
+
+def namespaced_key(namespace: str, key: str) -> str:
+    """帶有命名空間目前版本的快取鍵"""
+    return f'{namespace}:v{namespace_version(namespace)}:{key}'
+
+
+def invalidate_namespace(*namespaces: str) -> None:
+    """
+    失效命名空間內的所有快取項目
+
+    原子後端上每個命名空間一次 inc；版本鍵不存在時 inc 會從 0 起算，
+    此時與非原子後端相同，改寫為新的隨機版本號。
+    """
+    atomic = _has_atomic_inc()
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        if atomic:
+            version = cache.cache.inc(key)
+            if version is not None and version > 1:
+                continue
+        # delete 會通知 TieredCache 的其他 worker 移除 L1 中的版本鍵；
+        # delete 與 add 之間由其他呼叫者建立的版本號同樣是新的
+        cache.delete(key)
+        cache.add(key, _new_version(), timeout=0)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Flask CLI 指令
+
+使用方式：
+    flask --app app_launcher assets build
+    flask --app app_launcher assets pygments
+    flask --app app_launcher sitemap rebuild [--if-configured]
+    flask --app app_launcher categories check-counts [--fix]
+    flask --app app_launcher posts rerender [--missing]
+    flask --app app_launcher search reindex
+"""
+from __future__ import annotations
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+
+assets_cli = AppGroup('assets', help='靜態資源管理指令')
+
+
+@assets_cli.command('build')
+@click.option('--no-compress', is_flag=True, help='只產生雜湊清單，不寫入 .gz / .br 檔案')
+def build_assets(no_compress: bool) -> None:
+    """寫入預先壓縮檔案並計算靜態檔案雜湊（static/manifest.json）"""
+    from app.assets import brotli, compress_static_assets, write_manifest
+    from app.highlighting import stylesheet_is_current
+
+    # pygments.css 納入版本控制，只由 `flask assets pygments` 產生，此處僅檢查
+    style = current_app.config.get('PYGMENTS_STYLE', 'default')
+    if not stylesheet_is_current(current_app.static_folder, style):
+        click.echo(f'⚠ css/pygments.css does not match PYGMENTS_STYLE={style}; run `flask assets pygments`')
+
+    if not no_compress:
+        if brotli is None:
+            click.echo('⚠ Brotli not installed, writing gzip variants only')
+        results = compress_static_assets(current_app.static_folder)
+        for rel_path, size, sizes in results:
+            variants = ', '.join(f'{enc} {n}B' for enc, n in sizes.items()) or 'skipped'
+            click.echo(f'  {rel_path}: {size}B -> {variants}')
+        click.echo(f'✓ Precompressed {len(results)} files')
+
+    manifest = write_manifest(current_app.static_folder)
+    current_app.extensions['asset_manifest'] = manifest
+    click.echo(f'✓ Asset manifest written: {len(manifest)} files')
+
+
+@assets_cli.command('pygments')
+def build_pygments_stylesheet() -> None:
+    """依 PYGMENTS_STYLE 產生 static/css/pygments.css（納入版本控制）"""
+    from app.highlighting import write_stylesheet
+
+    style = current_app.config.get('PYGMENTS_STYLE', 'default')
+    path = write_stylesheet(current_app.static_folder, style)
+    if path is None:
+        raise click.ClickException('Pygments is not installed')
+    click.echo(f'✓ Pygments stylesheet written ({style}) -> {path}')
+
+
+sitemap_cli = AppGroup('sitemap', help='網站地圖管理指令')
+
+
+@sitemap_cli.command('rebuild')
+@click.option('--if-configured', is_flag=True, help='未設定 SITEMAP_BASE_URL / SERVER_NAME 時略過而不視為錯誤')
+def rebuild_sitemap(if_configured: bool) -> None:
+    """從資料庫完整重建預先產生的網站地圖（需設定 SITEMAP_BASE_URL 或 SERVER_NAME）"""
+    from app.services.sitemap_service import SitemapService
+
+    if if_configured and SitemapService.base_url() is None:
+        click.echo('Sitemap rebuild skipped: SITEMAP_BASE_URL is not set, /sitemap.xml is rendered per request')
+        return
+    try:
+        count = SitemapService.rebuild()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'✓ Sitemap rebuilt: {count} posts -> {SitemapService.get_directory()}')
+
+
+categories_cli = AppGroup('categories', help='分類管理指令')
+
+
+@categories_cli.command('check-counts')
+@click.option('--fix', is_flag=True, help='以實際文章數覆寫不一致的計數')
+def check_category_counts(fix: bool) -> None:
+    """檢查分類的文章計數欄位（published_count / total_count）是否與實際一致"""
+    from app.services.category_service import CategoryService
+
+    mismatches = CategoryService.check_post_counts(fix=fix)
+    if not mismatches:
+        click.echo('✓ All category counters are consistent')
+        return
+
+    for category, stored_published, published, stored_total, total in mismatches:
+        click.echo(
+            f'  {category.name} (id={category.id}): '
+            f'published {stored_published} -> {published}, total {stored_total} -> {total}'
+        )
+    if fix:
+        click.echo(f'✓ Fixed {len(mismatches)} categories')
+    else:
+        raise click.ClickException(f'{len(mismatches)} categories have stale counters (run with --fix)')
+
+
+posts_cli = AppGroup('posts', help='文章管理指令')
+
+
+@posts_cli.command('rerender')
+@click.option('--missing', is_flag=True, help='只處理尚未產生渲染結果的文章')
+def rerender_posts(missing: bool) -> None:
+    """重新產生文章的 rendered_html、目錄、字數與閱讀時間"""
+    from app.services.post_service import PostService
+
+    updated = PostService.rerender_posts(only_missing=missing)
+    click.echo(f'✓ Re-rendered posts: {updated} updated')
+
+
+search_cli = AppGroup('search', help='全文搜尋索引指令')
+
+
+@search_cli.command('reindex')
+def reindex_search() -> None:
+    """建立（若不存在）並從資料庫重建全文搜尋索引"""
+    from app.services.search_service import SearchService
+
+    count = SearchService.reindex()
+    click.echo(f'✓ Search index rebuilt: {count} posts')
+
+
+def register_cli_commands(app) -> None:
+    """註冊所有自訂 CLI 指令"""
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(sitemap_cli)
+    app.cli.add_command(categories_cli)
+    app.cli.add_command(posts_cli)
+    app.cli.add_command(search_cli)
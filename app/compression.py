@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+動態回應壓縮
+
+在回應送出前依 Accept-Encoding 以 br / gzip 壓縮 HTML、XML、JSON 等文字回應。
+預設關閉（COMPRESSION_ENABLED），通常由 Nginx 負責壓縮；
+當請求直接打到 Gunicorn 或 Nginx 未設定 gzip 時再開啟。
+
+- COMPRESSION_MIN_SIZE：小於此位元組數的回應不壓縮
+- COMPRESSION_MIMETYPES：允許壓縮的 MIME 類型
+- COMPRESSION_ALGORITHMS：依偏好排序的編碼（br、gzip）
+- 串流回應（stream_with_context / 產生器）以區塊方式邊產生邊壓縮
+- 壓縮後的強 ETag 會轉為弱 ETag（位元組已不同，語意相同）
+
+可重複使用的 gzip 內容：
+整頁快取保存的是含 nonce 佔位符的 HTML，每次請求換上的 nonce 都不同，
+一般作法必須每次重新壓縮。這裡將快取內容依佔位符切段，各段分別壓縮為
+位元組對齊的 raw deflate 區塊（Z_FULL_FLUSH，不跨段引用），請求時只需在
+段落之間插入一個存放 nonce 的未壓縮（stored）區塊，再補上 gzip 標頭與
+CRC32，即可組出合法的 gzip 串流，不必重新壓縮整個頁面。
+"""
+from __future__ import annotations
+
+import struct
+import zlib
+
+from flask import current_app, g, request
+
+try:
+    import brotli
+except ImportError:  # Brotli 為選用套件
+    brotli = None
+
+# gzip 標頭：magic、CM=deflate、無旗標、MTIME=0、XFL=0、OS=unknown
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+# 最後一個空的 stored 區塊（BFINAL=1）
+DEFLATE_FINAL_BLOCK = b'\x01\x00\x00\xff\xff'
+STREAM_FLUSH_SIZE = 8192
+
+
+def _supported_encodings() -> list[str]:
+    """依設定順序列出伺服器可用的編碼"""
+    algorithms = current_app.config.get('COMPRESSION_ALGORITHMS', ['br', 'gzip'])
+    return [a for a in algorithms if a == 'gzip' or (a == 'br' and brotli is not None)]
+
+
+def negotiate_encoding(prefer: str | None = None) -> str | None:
+    """
+    依 Accept-Encoding 選擇編碼
+
+    參數：
+        prefer: 若用戶端接受此編碼則優先使用（例如已有可重用的 gzip 內容）
+    """
+    encodings = _supported_encodings()
+    if prefer in encodings and request.accept_encodings[prefer]:
+        return prefer
+    for encoding in encodings:
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """以設定的壓縮等級壓縮整段資料"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=current_app.config.get('COMPRESSION_BR_LEVEL', 5))
+    compressor = zlib.compressobj(current_app.config.get('COMPRESSION_GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding: str, level: int, charset: str):
+    """
+    逐塊壓縮串流回應，累積到 STREAM_FLUSH_SIZE 才 flush，兼顧即時性與壓縮率
+
+    產生器會在請求結束後才被 WSGI 伺服器迭代，因此不可存取 current_app，
+    所需設定由呼叫端事先傳入。
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        process = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+        finish = compressor.flush
+
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode(charset)
+        if not chunk:
+            continue
+        out = process(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_SIZE:
+            out += flush()
+            pending = 0
+        if out:
+            yield out
+    yield finish()
+
+
+def build_gzip_segments(body: bytes, placeholder: bytes) -> list[bytes]:
+    """將含佔位符的內容切段，各段壓縮為位元組對齊、互不引用的 raw deflate 區塊"""
+    level = current_app.config.get('COMPRESSION_GZIP_LEVEL', 6)
+    segments = []
+    for part in body.split(placeholder):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        segments.append(compressor.compress(part) + compressor.flush(zlib.Z_FULL_FLUSH))
+    return segments
+
+
+def assemble_gzip(segments: list[bytes], filler: bytes, body: bytes) -> bytes:
+    """
+    在預先壓縮的段落之間插入 filler 的 stored 區塊，組成完整 gzip 串流
+
+    參數：
+        segments: build_gzip_segments 的結果
+        filler: 取代佔位符的內容（本次請求的 nonce）
+        body: 替換後的完整內容，用於計算 CRC32 與長度
+    """
+    stored = b'\x00' + struct.pack('<HH', len(filler), len(filler) ^ 0xFFFF) + filler
+    return b''.join((
+        GZIP_HEADER,
+        stored.join(segments),
+        DEFLATE_FINAL_BLOCK,
+        struct.pack('<II', zlib.crc32(body) & 0xFFFFFFFF, len(body) & 0xFFFFFFFF),
+    ))
+
+
+def _weaken_etag(response) -> None:
+    """壓縮後位元組已改變，強 ETag 轉為弱 ETag"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response):
+    """after_request：壓縮符合條件的回應"""
+    if not current_app.config.get('COMPRESSION_ENABLED', False):
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in current_app.config.get('COMPRESSION_MIMETYPES', ()):
+        return response
+    if response.cache_control.no_transform:
+        return response
+
+    if response.is_streamed:
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding:
+            level = current_app.config.get('COMPRESSION_BR_LEVEL' if encoding == 'br' else 'COMPRESSION_GZIP_LEVEL')
+            charset = response.mimetype_params.get('charset', 'utf-8')
+            response.response = compress_stream(response.response, encoding, level or 6, charset)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            _weaken_etag(response)
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config.get('COMPRESSION_MIN_SIZE', 500):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    segments = getattr(g, 'gzip_segments', None)
+    encoding = negotiate_encoding(prefer='gzip' if segments else None)
+    if not encoding:
+        return response
+
+    nonce = getattr(g, 'csp_nonce', None)
+    if encoding == 'gzip' and segments and nonce:
+        compressed = assemble_gzip(segments, nonce.encode('ascii'), data)
+    else:
+        compressed = compress(data, encoding)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_compression(app) -> None:
+    """
+    註冊壓縮處理器
+
+    after_request 以註冊的相反順序執行，因此必須在其他 after_request
+    （特別是 nonce 替換的 set_security_headers）之前註冊，確保壓縮是最後一步。
+    """
+    app.after_request(compress_response)
+    if app.config.get('COMPRESSION_ENABLED', False) and brotli is None and 'br' in app.config.get('COMPRESSION_ALGORITHMS', ()):
+        app.logger.info('Brotli not installed, dynamic compression limited to gzip')
@@ -15,7 +15,6 @@ from wtforms import StringField, TextAreaField, SubmitField, PasswordField, Sele
 from wtforms.validators import DataRequired, Length, Regexp, ValidationError, Email, Optional
 from flask_login import current_user
 from app.models import Category
-from app import cache
 from app.utils import clean_html_content
 
 class PostForm(FlaskForm):
@@ -39,6 +38,7 @@ class PostForm(FlaskForm):
     ])
     description = TextAreaField('Description', validators=[Length(max=160)])
     content = TextAreaField('Content', validators=[DataRequired()])
+    content_format = SelectField('Format', choices=[('html', 'HTML'), ('markdown', 'Markdown')], default='html')
     category = SelectField('Category', coerce=int, validators=[Optional()])
     
     # 修復：在類別層級定義所有按鈕，避免動態創建
@@ -50,24 +50,17 @@ class PostForm(FlaskForm):
     # 已移除表單層級自定義屬性過濾；統一使用 utils.clean_html_content
 
     def _update_category_choices(self):
-        """更新分類選項，每次都從資料庫重新載入"""
+        """更新分類選項，取自快取的分類清單（Category.cached_views，分類異動時失效）"""
         try:
-            # 先找出 Uncategorized 分類
-            uncategorized = Category.query.filter_by(slug='uncategorized').first()
-            other_categories = Category.query.filter(Category.slug != 'uncategorized').order_by(Category.name).all()
-            
-            # 將 Uncategorized 放在第一位（除了 Select Category）
+            views = Category.cached_views()
+
+            # 將 Uncategorized 放在第一位（除了 Select Category），其餘依名稱排序
             choices = [(0, 'Select Category')]
-            if uncategorized:
-                choices.append((uncategorized.id, uncategorized.name))
-            choices.extend([(cat.id, cat.name) for cat in other_categories])
-            
+            choices.extend((view.id, view.name) for view in views if view.slug == 'uncategorized')
+            choices.extend((view.id, view.name) for view in views if view.slug != 'uncategorized')
+
             self.category.choices = choices
-            
-            # 更新快取
-            if current_app:
-                cache.set('blog_category_choices', choices, timeout=current_app.config.get('CATEGORY_CACHE_TIMEOUT', 300))
-            
+
             if current_app:
                 current_app.logger.info(f"Updated category choices: {choices}")
             
@@ -94,6 +87,9 @@ class PostForm(FlaskForm):
     def validate_content(self, field):
         if len(field.data or '') > 100000:
             raise ValidationError('內容過長，請縮短內容。')
+        # Markdown 原始碼保持原樣，儲存時轉為 HTML 後才清理
+        if self.content_format.data == 'markdown':
+            return
         # 與後端一致：使用 utils.clean_html_content 進行清理
         try:
             field.data = clean_html_content(field.data or '', context='form')
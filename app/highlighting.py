@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+程式碼區塊語法高亮（儲存時執行）
+
+渲染階段對 `<pre><code class="language-xxx">` 以 Pygments 產生帶 class 的 <span>
+（例如 <span class="k">），寫入 rendered_html；讀者端不需要任何 JavaScript，
+也不受 CSP 限制。顏色由納入版本控制的靜態樣式表 css/pygments.css 提供，
+只由 `flask assets pygments` 依 PYGMENTS_STYLE 產生；所有規則皆限定在 .highlight 內，
+不影響網站其他的 <pre>。
+
+- 未指定語言或 Pygments 不認得的語言維持原樣，不猜測語言
+- 高亮結果以（語言, 程式碼）的雜湊快取（LRU），編輯文章時未改變的區塊不必重新分析
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:  # Pygments 為選用套件
+    HtmlFormatter = None
+
+try:
+    import lxml.html
+except ImportError:  # lxml 為選用套件
+    lxml = None
+
+# 加在 <pre> 上的 class，pygments.css 的選擇器皆以此為前綴
+HIGHLIGHT_CLASS = 'highlight'
+STYLESHEET_PATH = 'css/pygments.css'
+LANGUAGE_PREFIXES = ('language-', 'lang-')
+
+HIGHLIGHT_MEMO_MAX_ENTRIES = 512
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def is_available() -> bool:
+    """Pygments 與 lxml 皆已安裝時才會高亮"""
+    return HtmlFormatter is not None and lxml is not None
+
+
+@lru_cache(maxsize=64)
+def _get_lexer(language: str):
+    """取得（並快取）語言的 lexer；不認得的語言回傳 None"""
+    try:
+        # 保留前後換行，輸出的文字與原本的程式碼完全相同
+        return get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+
+@lru_cache(maxsize=1)
+def _get_formatter():
+    return HtmlFormatter(nowrap=True)
+
+
+def _code_language(pre, code) -> Optional[str]:
+    """由 <code> 或 <pre> 的 language-xxx / lang-xxx class 取得語言"""
+    for element in (code, pre):
+        for name in (element.get('class') or '').split():
+            for prefix in LANGUAGE_PREFIXES:
+                if name.startswith(prefix) and len(name) > len(prefix):
+                    return name[len(prefix):].lower()
+    return None
+
+
+def highlight_code(code: str, language: str) -> Optional[str]:
+    """
+    將程式碼轉為帶 class 的 <span> HTML（不含外層 pre / code）
+
+    回傳：
+        高亮後的 HTML；語言不支援時回傳 None
+    """
+    key = hashlib.sha256(f'{language}\0{code}'.encode('utf-8')).hexdigest()
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    lexer = _get_lexer(language)
+    result = highlight(code, lexer, _get_formatter()) if lexer is not None else None
+
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > HIGHLIGHT_MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+    return result
+
+
+def highlight_blocks(root) -> int:
+    """
+    就地高亮 lxml 樹中所有 <pre><code> 區塊
+
+    回傳：
+        已高亮的區塊數
+    """
+    if not is_available():
+        return 0
+
+    count = 0
+    for code in list(root.iter('code')):
+        pre = code.getparent()
+        if pre is None or pre.tag != 'pre':
+            continue
+        language = _code_language(pre, code)
+        if not language:
+            continue
+        highlighted = highlight_code(code.text_content(), language)
+        if highlighted is None:
+            continue
+
+        fragment = lxml.html.fragment_fromstring(highlighted, create_parent='code')
+        for child in list(code):
+            code.remove(child)
+        code.text = fragment.text
+        code.extend(fragment)
+
+        classes = (pre.get('class') or '').split()
+        if HIGHLIGHT_CLASS not in classes:
+            pre.set('class', ' '.join(classes + [HIGHLIGHT_CLASS]))
+        count += 1
+    return count
+
+
+def stylesheet_css(style: str = 'default') -> Optional[str]:
+    """
+    Pygments token class 的樣式表內容
+
+    get_style_defs() 另外輸出未加前綴的 `pre { line-height }` 與行號（linenos）規則，
+    會套用到網站上所有的 <pre>；高亮輸出不含行號，因此只取背景與 token 規則，
+    行高改為限定在 pre.highlight。
+
+    回傳：
+        CSS 字串；Pygments 未安裝時回傳 None
+    """
+    if HtmlFormatter is None:
+        return None
+    formatter = HtmlFormatter(style=style)
+    prefix = f'.{HIGHLIGHT_CLASS}'
+    lines = [f'pre{prefix} {{ line-height: 125%; }}']
+    lines += formatter.get_background_style_defs(prefix)
+    lines += formatter.get_token_style_defs(prefix)
+    return '\n'.join(lines) + '\n'
+
+
+def stylesheet_path(static_folder: str) -> str:
+    return os.path.join(static_folder, *STYLESHEET_PATH.split('/'))
+
+
+def stylesheet_is_current(static_folder: str, style: str = 'default') -> bool:
+    """static/css/pygments.css 是否與 style 產生的內容相同（Pygments 未安裝時不檢查）"""
+    css = stylesheet_css(style)
+    if css is None:
+        return True
+    try:
+        with open(stylesheet_path(static_folder), encoding='utf-8') as f:
+            return f.read() == css
+    except OSError:
+        return False
+
+
+def write_stylesheet(static_folder: str, style: str = 'default') -> Optional[str]:
+    """
+    產生 Pygments token class 的樣式表（static/css/pygments.css）
+
+    回傳：
+        寫入的檔案路徑；Pygments 未安裝時回傳 None
+    """
+    css = stylesheet_css(style)
+    if css is None:
+        return None
+    path = stylesheet_path(static_folder)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(css)
+    os.replace(tmp_path, path)
+    return path
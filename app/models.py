@@ -5,17 +5,20 @@ Database Models Module
 This module contains all database models for the Flask blog application.
 All models are consolidated in this single file for better maintainability.
 """
-from typing import Optional
+from typing import Iterable, List, NamedTuple, Optional
 
-from app import db, cache
+from app import db
+from app.cache_fetch import fetch
+from app.cache_namespaces import invalidate_namespace
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from datetime import datetime, timezone
-from sqlalchemy import event, func
-from sqlalchemy.orm import validates
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, joinedload, load_only, object_session, selectinload, validates
 import pytz
-from flask import current_app, Flask
-from app.utils import clean_html_content
+from flask import current_app, has_app_context, Flask
+from app.utils import clean_html_content, content_digest, is_known_clean
+from app.rendering import render_post
 
 
 # ========================================
@@ -147,6 +150,42 @@ class User(UserMixin, db.Model):
 # Category Model
 # ========================================
 
+class CategoryView(NamedTuple):
+    """
+    快取用的唯讀分類資料
+
+    快取 detached 的 ORM 物件時，每次讀取都要還原完整的 SQLAlchemy 狀態，
+    模板存取延遲載入的屬性也可能出錯或觸發查詢；快取只保存這四個欄位。
+    """
+    id: int
+    name: str
+    slug: str
+    published_count: int
+
+    @property
+    def post_count(self) -> int:
+        """與 Category.post_count 相同，供模板共用"""
+        return self.published_count
+
+    @property
+    def is_default_category(self) -> bool:
+        return self.slug == 'uncategorized'
+
+    @staticmethod
+    def pack(views: Iterable['CategoryView']) -> tuple:
+        """
+        打包成快取保存的格式：每個欄位一個 tuple（ids, names, slugs, counts）
+
+        只含 int 與 str，pickle 不需要記錄類別、還原時也不必逐一呼叫建構子
+        """
+        return tuple(zip(*views))
+
+    @classmethod
+    def unpack(cls, packed: tuple) -> List['CategoryView']:
+        """由 pack() 的結果還原"""
+        return list(map(cls._make, zip(*packed)))
+
+
 class Category(db.Model):
     """文章分類模型"""
     __tablename__ = 'categories'
@@ -157,6 +196,11 @@ class Category(db.Model):
     slug = db.Column(db.String(60), unique=True, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # 反正規化的文章計數，由 Post 的 after_insert / after_update / after_delete 事件維護
+    # 可用 `flask categories check-counts --fix` 檢查並修正
+    published_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # 修復：使用 back_populates 而不是 backref，更清晰的雙向關聯
     # 移除 cascade 刪除，避免刪除分類時自動刪除文章
     posts = db.relationship('Post', back_populates='category', lazy='dynamic')
@@ -169,19 +213,31 @@ class Category(db.Model):
     
     @property
     def post_count(self):
-        """取得該分類下的文章數量"""
-        return self.posts.filter_by(status='published').count()
+        """取得該分類下的已發布文章數量（讀取計數欄位，不執行 COUNT）"""
+        return self.published_count or 0
     
     @property
     def total_post_count(self):
-        """取得該分類下所有文章數量（包含草稿）"""
-        return self.posts.count()
+        """取得該分類下所有文章數量（包含草稿，讀取計數欄位）"""
+        return self.total_count or 0
     
     @property
     def is_default_category(self):
         """檢查是否為預設分類（Uncategorized）"""
         return self.slug == 'uncategorized'
     
+    @staticmethod
+    def cached_views() -> List[CategoryView]:
+        """所有分類的唯讀資料（依名稱排序，快取 CATEGORY_CACHE_TIMEOUT 秒）"""
+        def load():
+            rows = db.session.query(Category.id, Category.name, Category.slug, Category.published_count)\
+                .order_by(Category.name)\
+                .all()
+            return CategoryView.pack(CategoryView._make(row) for row in rows)
+
+        timeout = current_app.config.get('CATEGORY_CACHE_TIMEOUT', 300)
+        return CategoryView.unpack(fetch('categories', 'category_views', load, timeout=timeout))
+    
     def to_dict(self) -> dict:
         """轉換為字典格式"""
         return {
@@ -211,6 +267,15 @@ class Post(db.Model):
     thumbnail = db.Column(db.String(500), nullable=True)
     slug = db.Column(db.String(60), unique=True, nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
+    # 'html'（手寫 HTML）或 'markdown'（content 為 Markdown 原始碼，儲存時轉為 rendered_html）
+    content_format = db.Column(db.String(10), nullable=False, default='html', server_default='html')
+    # 已清理內容的 SHA-256，用於判斷內容是否需要重新清理
+    content_hash = db.Column(db.String(64), nullable=True)
+    # 儲存時由 content 產生（見 app.rendering），讀取路徑不做文字處理
+    rendered_html = db.Column(db.Text, nullable=True)
+    toc = db.Column(db.JSON, nullable=True)
+    word_count = db.Column(db.Integer, nullable=True)
+    reading_minutes = db.Column(db.Integer, nullable=True)
     description = db.Column(db.String(160))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(
@@ -239,6 +304,11 @@ class Post(db.Model):
         if self.status not in ['draft', 'published']:
             raise ValueError(f"Invalid status: {self.status}. Must be 'draft' or 'published'.")
 
+    def validate_content_format(self) -> None:
+        """驗證 content_format 值，只允許 'html' 或 'markdown'"""
+        if self.content_format not in (None, 'html', 'markdown'):
+            raise ValueError(f"Invalid content format: {self.content_format}. Must be 'html' or 'markdown'.")
+
     def local_created_at(self, app: 'Flask' = None):
         """轉換 created_at 為配置時區"""
         if not self.created_at:
@@ -301,25 +371,40 @@ class Post(db.Model):
             'status': self.status,
             'category': self.category_name,
             'author': self.author_name,
+            'reading_minutes': self.reading_minutes,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+    @classmethod
+    def listing_options(cls, with_category: bool = False, with_author: bool = False) -> list:
+        """
+        列表頁使用的載入選項
+
+        - 只載入列表需要的欄位，不傳輸數 KB 的 content
+        - 需要顯示分類 / 作者時預先載入，避免每筆文章各觸發一次延遲載入（N+1）
+        """
+        options = [load_only(
+            cls.id, cls.title, cls.slug, cls.description, cls.thumbnail, cls.status,
+            cls.created_at, cls.updated_at, cls.category_id, cls.author_id, cls.reading_minutes
+        )]
+        if with_category:
+            options.append(joinedload(cls.category))
+        if with_author:
+            options.append(selectinload(cls.author))
+        return options
+
+    @classmethod
+    def listing_query(cls, with_category: bool = False, with_author: bool = False):
+        """建立列表頁的文章查詢（見 listing_options）"""
+        return cls.query.options(*cls.listing_options(with_category, with_author))
+
     @staticmethod
-    @cache.cached(timeout=600, key_prefix='blog_available_categories')  # 增加快取時間到10分鐘
     def get_available_categories():
-        """取得所有可用的分類名稱（快取）"""
+        """取得所有可用的分類名稱（由快取的 CategoryView 取得）"""
         try:
-            # 只取得有已發布文章的分類，並按名稱排序
-            categories = db.session.query(Category.name)\
-                .join(Post)\
-                .filter(Post.status == 'published')\
-                .distinct()\
-                .order_by(Category.name)\
-                .all()
-            result = [cat[0] for cat in categories]
-            current_app.logger.debug(f"載入可用分類：{len(result)}個")
-            return result
+            # 只取得有已發布文章的分類，已按名稱排序
+            return [view.name for view in Category.cached_views() if view.published_count > 0]
         except Exception as e:
             current_app.logger.error(f"Failed to fetch categories: {e}")
             return []
@@ -357,29 +442,293 @@ class Post(db.Model):
 # SQLAlchemy Events
 # ========================================
 
+def _previous_value(target, key):
+    """取得屬性在本次 flush 前（資料庫中）的值"""
+    history = inspect(target).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, key)
+
+
+# 屬性過期（例如 commit 之後）時直接設定新值不會保留舊值，_previous_value 會誤讀為新值；
+# 計數與搜尋索引依賴舊的 status / category_id，設定前先載入資料庫中的值
+@event.listens_for(Post.status, 'set', active_history=True)
+@event.listens_for(Post.category_id, 'set', active_history=True)
+def keep_previous_value(target, value, oldvalue, initiator):
+    """僅用於啟用 active_history"""
+
+
+def _content_changed(target) -> bool:
+    """新文章，或既有文章的 content / content_format 在本次 flush 中被修改（不會觸發載入 content）"""
+    state = inspect(target)
+    return (not state.persistent
+            or state.attrs.content.history.has_changes()
+            or state.attrs.content_format.history.has_changes())
+
+
+def _needs_sanitizing(target, digest: str) -> bool:
+    """
+    判斷已修改的 content 是否需要經過 HTML 清理
+
+    - 內容雜湊與資料庫中已清理內容的雜湊相同時不需要；
+      僅限既有文章且 content_format、content_hash 都未在本次修改：
+      Markdown 文章的雜湊是未清理原始碼的雜湊，改為 HTML 時不可沿用
+    - 內容是本程序剛由 clean_html_content 產生的（表單驗證已清理）時不需要
+    """
+    state = inspect(target)
+    if (state.persistent
+            and not state.attrs.content_format.history.has_changes()
+            and not state.attrs.content_hash.history.has_changes()
+            and digest == target.content_hash):
+        return False
+    return not is_known_clean(digest)
+
+
 # SQLAlchemy 事件：插入或更新前自動清理內容
 @event.listens_for(Post, 'before_insert')
 @event.listens_for(Post, 'before_update')
 def clean_post_content(mapper, connection, target):
-    """自動清理 content，防止不安全 HTML"""
-    if target.content:
-        target.content = clean_html_content(target.content)
+    """
+    自動清理 content，防止不安全 HTML，並產生渲染結果
+
+    只改狀態、分類、slug 等欄位時 content 沒有變動，不再重新清理；
+    內容已清理過（雜湊相符）時也略過 bleach 解析。
+    先檢查是否變動再讀取 content：延遲載入（defer）的 content 不會因此被載入。
+    """
+    if _content_changed(target) and target.content:
+        digest = content_digest(target.content)
+        # Markdown 原始碼不做 HTML 清理（會破壞 > 引用等語法），轉換後的 HTML 才清理
+        if target.content_format != 'markdown' and _needs_sanitizing(target, digest):
+            target.content = clean_html_content(target.content)
+            digest = content_digest(target.content)
+        target.content_hash = digest
+        # 渲染階段：產生 rendered_html、目錄與閱讀時間
+        render_post(target)
     target.validate_status()
+    target.validate_content_format()
     
     # 確保 updated_at 有正確的時區資訊
     if not target.updated_at or target.updated_at.tzinfo is None:
         target.updated_at = datetime.now(timezone.utc)
 
-# SQLAlchemy 事件：文章狀態變更時清理分類快取
+# SQLAlchemy 事件：文章異動時失效由文章衍生的快取
+# 文章清單與數量影響分類（文章數）、統計、公開頁面，以及 slug 過濾器、搜尋建議（posts）
+POST_CACHE_NAMESPACES = ('posts', 'categories', 'stats', 'pages')
+
+
 @event.listens_for(Post, 'after_insert')
 @event.listens_for(Post, 'after_update')
 @event.listens_for(Post, 'after_delete')
 def clear_category_cache_on_post_change(mapper, connection, target):
-    """當文章新增、更新或刪除時，清理分類快取"""
+    """
+    文章新增、更新或刪除時，記錄需要在提交後失效快取
+
+    flush 時不失效：提交前讀到新版本號的 worker 會以尚未提交的舊資料重建，
+    提交後仍需再失效一次；只在提交後失效一次即可。
+    slug 一併記錄，提交後直接加入本程序的 slug 過濾器
+    """
+    session = object_session(target)
+    if session is not None:
+        session.info['post_caches_changed'] = True
+        if target.slug:
+            session.info.setdefault('post_slugs', set()).add(target.slug)
+
+
+@event.listens_for(Session, 'after_commit')
+def clear_post_caches_after_commit(session):
+    """交易提交後失效由文章衍生的快取命名空間（每次提交一次）"""
+    from app.services.slug_filter_service import SlugFilterService
+
+    slugs = session.info.pop('post_slugs', ())
+    if not session.info.pop('post_caches_changed', False) or not has_app_context():
+        return
+    try:
+        invalidate_namespace(*POST_CACHE_NAMESPACES)
+    except Exception as e:
+        current_app.logger.error(f"文章快取失效失敗：{e}")
+    SlugFilterService.add_slugs(slugs)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_post_cache_changes(session):
+    """交易回滾時不需再失效"""
+    session.info.pop('post_caches_changed', None)
+    session.info.pop('post_slugs', None)
+
+
+# SQLAlchemy 事件：維護分類的文章計數欄位
+def _adjust_category_counts(connection, category_id, published_delta, total_delta):
+    """在同一個 flush 連線上以相對值更新計數，與文章異動位於同一交易"""
+    if not category_id or (not published_delta and not total_delta):
+        return
+    table = Category.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.id == category_id)
+        .values(
+            published_count=table.c.published_count + published_delta,
+            total_count=table.c.total_count + total_delta,
+        )
+    )
+
+
+@event.listens_for(Post, 'after_insert')
+def increment_category_counts(mapper, connection, target):
+    """新增文章：目標分類計數 +1"""
+    _adjust_category_counts(connection, target.category_id, int(target.status == 'published'), 1)
+
+
+@event.listens_for(Post, 'after_update')
+def move_category_counts(mapper, connection, target):
+    """更新文章：狀態或分類改變時，從舊分類扣除、加到新分類"""
+    old_category = _previous_value(target, 'category_id')
+    old_published = _previous_value(target, 'status') == 'published'
+    new_published = target.status == 'published'
+    if old_category == target.category_id and old_published == new_published:
+        return
+    _adjust_category_counts(connection, old_category, -int(old_published), -1)
+    _adjust_category_counts(connection, target.category_id, int(new_published), 1)
+
+
+@event.listens_for(Post, 'after_delete')
+def decrement_category_counts(mapper, connection, target):
+    """刪除文章：原分類計數 -1"""
+    old_published = _previous_value(target, 'status') == 'published'
+    _adjust_category_counts(connection, _previous_value(target, 'category_id'), -int(old_published), -1)
+
+
+# SQLAlchemy 事件：維護全文搜尋索引（與文章異動位於同一交易）
+SEARCH_INDEXED_FIELDS = ('title', 'description', 'content', 'content_format', 'status')
+
+
+def _search_body_html(connection, target):
+    """取得要索引的文章 HTML；未載入時直接查詢，避免在 flush 中觸發延遲載入"""
+    unloaded = inspect(target).unloaded
+    if 'rendered_html' not in unloaded and target.rendered_html is not None:
+        return target.rendered_html
+    if 'content' not in unloaded and 'rendered_html' not in unloaded:
+        return target.content
+    table = Post.__table__
+    row = connection.execute(
+        table.select().with_only_columns(table.c.rendered_html, table.c.content).where(table.c.id == target.id)
+    ).first()
+    return (row.rendered_html or row.content) if row else ''
+
+
+@event.listens_for(Post, 'after_insert')
+@event.listens_for(Post, 'after_update')
+def sync_search_index(mapper, connection, target):
+    """已發布文章寫入索引，改為草稿時移除；只改分類、縮圖等欄位不重新索引"""
+    from app.services.search_service import SearchService
+
+    state = inspect(target)
+    if state.persistent and _previous_value(target, 'status') == target.status == 'draft':
+        return
+    if state.persistent and not any(state.attrs[key].history.has_changes() for key in SEARCH_INDEXED_FIELDS):
+        return
+    if SearchService.uses_memory_index():
+        # 記憶體索引：記錄變更，交易提交後才套用
+        session = object_session(target)
+        if session is not None:
+            document = None
+            if target.status == 'published':
+                document = (target.title, target.description, _search_body_html(connection, target))
+            session.info.setdefault('search_changes', {})[target.id] = document
+    elif target.status == 'published':
+        SearchService.index_post(connection, target.id, target.title, target.description,
+                                 _search_body_html(connection, target))
+    else:
+        SearchService.remove_post(connection, target.id)
+
+
+@event.listens_for(Post, 'after_delete')
+def remove_from_search_index(mapper, connection, target):
+    """刪除文章時移除索引"""
+    from app.services.search_service import SearchService
+    if SearchService.uses_memory_index():
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('search_changes', {})[target.id] = None
+    else:
+        SearchService.remove_post(connection, target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_search_changes(session):
+    """交易提交後增量更新記憶體搜尋索引"""
+    changes = session.info.pop('search_changes', None)
+    if not changes:
+        return
+    try:
+        from app.services.search_service import SearchService
+        if has_app_context() and SearchService.uses_memory_index():
+            SearchService.apply_memory_changes(changes)
+    except Exception as e:
+        # 索引更新失敗不影響已提交的資料，`flask search reindex` 可重建
+        current_app.logger.error(f"搜尋索引增量更新失敗：{e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_search_changes(session):
+    """交易回滾時捨棄尚未套用的搜尋索引變更"""
+    session.info.pop('search_changes', None)
+
+
+@event.listens_for(Post.__table__, 'after_create')
+def create_search_index(table, connection, **kw):
+    """db.create_all() 建立 posts 表時一併建立搜尋索引表（既有資料庫由遷移建立）"""
+    from app.services.search_service import SearchService
+    SearchService.create_index(connection)
+
+
+@event.listens_for(Post.__table__, 'before_drop')
+def drop_search_index(table, connection, **kw):
+    """db.drop_all() 時先移除搜尋索引表（PostgreSQL 的索引表參照 posts）"""
+    from app.services.search_service import SearchService
+    SearchService.drop_index(connection)
+
+
+# SQLAlchemy 事件：記錄網站地圖需要更新的文章，於交易提交後套用
+@event.listens_for(Post, 'after_insert')
+@event.listens_for(Post, 'after_update')
+def record_sitemap_change(mapper, connection, target):
+    """flush 時記錄文章快照（此時不可再查詢資料庫，也尚未確定會提交）"""
+    session = object_session(target)
+    if session is None:
+        return
+    from app.services.sitemap_service import SitemapService
+    session.info.setdefault('sitemap_changes', {})[target.id] = SitemapService.post_snapshot(target)
+
+
+@event.listens_for(Post, 'after_delete')
+def record_sitemap_delete(mapper, connection, target):
+    """flush 時記錄被刪除的文章 ID"""
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault('sitemap_changes', {}).pop(target.id, None)
+    session.info.setdefault('sitemap_deleted', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_sitemap_changes(session):
+    """交易提交後增量更新預先產生的網站地圖"""
+    changes = session.info.pop('sitemap_changes', None)
+    deleted = session.info.pop('sitemap_deleted', None)
+    if not changes and not deleted:
+        return
     try:
-        from app import cache
-        cache.delete('blog_available_categories')
-    except Exception:
-        # 在事件監聽器中避免拋出異常
-        pass
+        from app.services.sitemap_service import SitemapService
+        if has_app_context() and SitemapService.is_enabled():
+            SitemapService.apply_changes((changes or {}).values(), deleted or ())
+    except Exception as e:
+        # 網站地圖更新失敗不影響已提交的資料，下次重建時會修正
+        current_app.logger.error(f"網站地圖增量更新失敗：{e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_sitemap_changes(session):
+    """交易回滾時捨棄尚未套用的網站地圖變更"""
+    session.info.pop('sitemap_changes', None)
+    session.info.pop('sitemap_deleted', None)
 
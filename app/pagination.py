@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+鍵集（Keyset / Cursor）分頁
+
+以 (created_at, id) 作為排序鍵，透過 WHERE 條件直接定位下一頁，
+取代 OFFSET 掃描與每頁一次的 COUNT(*)。配合 posts 表上的
+idx_status_created_at 索引，深層頁面的成本與第一頁相同。
+
+游標以 URL-safe base64 編碼成不透明字串（?after= / ?before=），
+前端不需要也不應該解析其內容。
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+from functools import cached_property
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """將 (created_at, id) 編碼為不透明游標字串"""
+    raw = f'{created_at.isoformat()}|{item_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    """解析游標字串；格式錯誤時回傳 None"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        created_str, id_str = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_str), int(id_str)
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+
+
+class KeysetPagination:
+    """
+    鍵集分頁結果
+
+    介面刻意與 Flask-SQLAlchemy 的 Pagination 相近（items / has_next /
+    has_prev / per_page / total），讓模板與路由可以共用。
+
+    - 只查詢 per_page + 1 筆資料以判斷是否還有下一頁
+    - total 為延遲計算屬性，只有模板實際讀取時才執行 COUNT
+    """
+
+    def __init__(self, query, per_page: int, created_column, id_column,
+                 after: Optional[Cursor] = None, before: Optional[Cursor] = None):
+        self._query = query
+        self.per_page = per_page
+        self.after = after
+        self.before = before
+
+        if before is not None:
+            created_at, item_id = before
+            rows = query.filter(or_(
+                created_column > created_at,
+                and_(created_column == created_at, id_column > item_id)
+            )).order_by(created_column.asc(), id_column.asc()).limit(per_page + 1).all()
+            self.has_prev = len(rows) > per_page
+            self.has_next = True
+            self.items = list(reversed(rows[:per_page]))
+        else:
+            if after is not None:
+                created_at, item_id = after
+                query = query.filter(or_(
+                    created_column < created_at,
+                    and_(created_column == created_at, id_column < item_id)
+                ))
+            rows = query.order_by(created_column.desc(), id_column.desc()).limit(per_page + 1).all()
+            self.has_next = len(rows) > per_page
+            self.has_prev = after is not None
+            self.items = rows[:per_page]
+
+    @property
+    def next_cursor(self) -> Optional[str]:
+        """下一頁的游標（最後一筆資料）"""
+        if not self.has_next or not self.items:
+            return None
+        last = self.items[-1]
+        return encode_cursor(last.created_at, last.id)
+
+    @property
+    def prev_cursor(self) -> Optional[str]:
+        """上一頁的游標（第一筆資料）"""
+        if not self.has_prev or not self.items:
+            return None
+        first = self.items[0]
+        return encode_cursor(first.created_at, first.id)
+
+    @cached_property
+    def total(self) -> int:
+        """符合條件的總筆數（僅在被讀取時查詢一次）"""
+        return self._query.order_by(None).count()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+文章儲存時的渲染階段
+
+內容寫入資料庫時（Post 的 before_insert / before_update 事件，content 實際改變才執行）
+由已清理的 content（或 Markdown 原始碼轉換、清理後的 HTML）產生並保存：
+
+- rendered_html：標題（h1–h3）加上錨點 id、程式碼區塊經 Pygments 高亮
+  （見 app.highlighting）的 HTML，文章頁直接輸出
+- toc：目錄（[{level, id, text}, ...]），以 JSON 欄位保存
+- word_count：字數，中日韓文字每字計一，其他語言以空白分隔的單字計一
+- reading_minutes：估計閱讀時間（分鐘，至少 1）
+
+讀取路徑因此不做任何文字處理，列表頁也能在不載入 content 的情況下顯示閱讀時間。
+既有文章可用 `flask posts rerender` 補上渲染結果。
+"""
+from __future__ import annotations
+
+import math
+import re
+from typing import NamedTuple, Optional
+
+try:
+    import lxml.html
+except ImportError:  # lxml 為選用套件
+    lxml = None
+
+try:
+    import markdown
+except ImportError:  # Markdown 為選用套件，僅 markdown 格式的文章需要
+    markdown = None
+
+from app.highlighting import highlight_blocks
+from app.sanitizer import serialize_fragment
+from app.utils import clean_html_content
+
+CONTENT_FORMATS = ('html', 'markdown')
+# fenced_code 輸出 <pre><code class="language-xxx">，與手寫 HTML 的程式碼區塊相同
+MARKDOWN_EXTENSIONS = ('fenced_code', 'sane_lists')
+
+HEADING_TAGS = ('h1', 'h2', 'h3')
+# 閱讀速度：英文等以單字計，中日韓以字元計
+WORDS_PER_MINUTE = 200
+CJK_CHARS_PER_MINUTE = 400
+
+# 平假名、片假名、CJK 擴充 A、CJK 統一漢字、韓文音節、CJK 相容漢字
+CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_CJK = re.compile(f'[{CJK_RANGES}]')
+_WORD = re.compile(r'[^\W_]+(?:[\'’-][^\W_]+)*')
+_TAG = re.compile(r'<[^>]+>')
+_ANCHOR_STRIP = re.compile(r'[^\w\s-]')
+_ANCHOR_SPACE = re.compile(r'[\s_-]+')
+
+
+class RenderedContent(NamedTuple):
+    """render_content 的結果，對應 Post 的同名欄位"""
+    rendered_html: str
+    toc: list
+    word_count: int
+    reading_minutes: int
+
+
+def count_words(text: str) -> tuple[int, int]:
+    """回傳（非中日韓單字數, 中日韓字元數）"""
+    cjk = len(_CJK.findall(text))
+    words = len(_WORD.findall(_CJK.sub(' ', text)))
+    return words, cjk
+
+
+def reading_minutes(words: int, cjk: int) -> int:
+    """依字數估計閱讀分鐘數（至少 1 分鐘）"""
+    return max(1, math.ceil(words / WORDS_PER_MINUTE + cjk / CJK_CHARS_PER_MINUTE))
+
+
+def make_anchor(text: str, used: set) -> str:
+    """由標題文字產生不重複的錨點 id（保留中文等 Unicode 字元）"""
+    anchor = _ANCHOR_SPACE.sub('-', _ANCHOR_STRIP.sub('', text.lower())).strip('-')
+    anchor = anchor or f'section-{len(used) + 1}'
+    candidate, n = anchor, 2
+    while candidate in used:
+        candidate = f'{anchor}-{n}'
+        n += 1
+    used.add(candidate)
+    return candidate
+
+
+def compile_markdown(source: str) -> str:
+    """將 Markdown 轉為 HTML，並套用與手寫 HTML 相同的 clean_html_content 白名單"""
+    if markdown is None:
+        raise RuntimeError('Markdown is not installed')
+    return clean_html_content(markdown.markdown(source, extensions=list(MARKDOWN_EXTENSIONS)), context='markdown')
+
+
+def render_content(content: Optional[str], content_format: str = 'html') -> RenderedContent:
+    """
+    由文章內容產生渲染結果
+
+    參數：
+        content: html 格式為已經過 clean_html_content 的內容；markdown 格式為原始碼
+        content_format: 'html' 或 'markdown'
+    """
+    if not content or not content.strip():
+        return RenderedContent(content or '', [], 0, 0)
+    if content_format == 'markdown':
+        # 只在儲存時轉換一次，公開頁面讀取 rendered_html，不會呼叫 Markdown 解析器
+        content = compile_markdown(content)
+
+    if lxml is None:
+        # 沒有 lxml 時不加錨點，只計算字數
+        words, cjk = count_words(_TAG.sub(' ', content))
+        return RenderedContent(content, [], words + cjk, reading_minutes(words, cjk))
+
+    root = lxml.html.fragment_fromstring(content, create_parent='div')
+    toc, used = [], set()
+    headings = list(root.iter(*HEADING_TAGS))
+    # 先保留作者自訂的 id，避免自動產生的錨點與其重複
+    used.update(el.get('id') for el in headings if el.get('id'))
+    for element in headings:
+        text = ' '.join(element.text_content().split())
+        if not text:
+            continue
+        anchor = element.get('id') or make_anchor(text, used)
+        element.set('id', anchor)
+        toc.append({'level': int(element.tag[1]), 'id': anchor, 'text': text})
+
+    # 以空白連接各段文字，避免相鄰區塊（</h2><p>）的字黏在一起
+    words, cjk = count_words(' '.join(root.itertext()))
+    highlighted = highlight_blocks(root)
+    rendered_html = serialize_fragment(root) if toc or highlighted else content
+    return RenderedContent(rendered_html, toc, words + cjk, reading_minutes(words, cjk))
+
+
+def render_post(post) -> None:
+    """將渲染結果寫入 Post 的 rendered_html / toc / word_count / reading_minutes"""
+    result = render_content(post.content, post.content_format or 'html')
+    post.rendered_html = result.rendered_html
+    post.toc = result.toc
+    post.word_count = result.word_count
+    post.reading_minutes = result.reading_minutes
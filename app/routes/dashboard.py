@@ -41,8 +41,8 @@ def posts():
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 10, type=int), 50)
     
-    # 建立查詢
-    query = Post.query
+    # 建立查詢（只載入列表欄位，並預先載入分類，避免 N+1 查詢）
+    query = Post.listing_query(with_category=True)
     
     # 篩選條件
     status_filter = request.args.get('status')
@@ -96,6 +96,7 @@ def new_post():
             'thumbnail': form.thumbnail.data,
             'description': form.description.data,
             'content': form.content.data,
+            'content_format': form.content_format.data,
             'category_id': form.category.data
         }
         
@@ -151,6 +152,7 @@ def edit_post(id):
             'thumbnail': form.thumbnail.data,
             'description': form.description.data,
             'content': form.content.data,
+            'content_format': form.content_format.data,
             'category_id': form.category.data
         }
         
@@ -312,58 +314,23 @@ def edit_category(id):
 def delete_category(id):
     """刪除分類"""
     category = Category.query.get_or_404(id)
+    category_name = category.name or f"Category-{id}"  # 保存名稱用於日誌
     
     try:
-        # 除錯資訊
-        category_name_debug = category.name or f"Category-{id}"
-        current_app.logger.info(f"Attempting to delete category {id}: {category_name_debug}")
-        current_app.logger.info(f"Is default category: {category.is_default_category}")
-        current_app.logger.info(f"Post count: {category.post_count}")
-        current_app.logger.info(f"Total post count: {category.total_post_count}")
-        
-        # 檢查是否為預設分類
-        if category.is_default_category:
-            flash('無法刪除預設分類 "Uncategorized"！', 'danger')
-            current_app.logger.warning(f"阻止刪除預設分類 {id}")
-            return redirect(url_for('dashboard.categories'))
-        
-        # 如果分類下有文章，自動移動到 Uncategorized
-        if category.total_post_count > 0:
-            current_app.logger.info(f"Moving {category.total_post_count} posts to Uncategorized")
-            uncategorized = Category.query.filter_by(slug='uncategorized').first()
-            
-            if not uncategorized:
-                flash('錯誤：找不到預設分類 "Uncategorized"！', 'danger')
-                current_app.logger.error("找不到預設分類 'Uncategorized'！")
-                return redirect(url_for('dashboard.categories'))
-            
-            # 將所有文章移到 Uncategorized
-            moved_posts = []
-            for post in category.posts:
-                title = post.title or 'Untitled'
-                status = post.status or 'unknown'
-                current_app.logger.info(f"Moving post {post.id} '{title}' from category {category.id} to {uncategorized.id}")
-                post.category_id = uncategorized.id
-                moved_posts.append(f"{title} ({status})")
-            
-            flash(f'已將此分類下的 {category.total_post_count} 篇文章移至 "Uncategorized" 分類。', 'info')
-            current_app.logger.info(f"Moved posts: {', '.join(moved_posts)}")
-        
-        # 執行刪除
-        current_app.logger.info(f"Deleting category {id}")
-        category_name = category.name or f"Category-{id}"  # 保存名稱用於日誌
-        db.session.delete(category)
-        db.session.commit()
-        current_app.logger.info(f"Category {id} deleted successfully")
-        
-        # 清除快取（包含統計快取）
-        CategoryService.clear_category_cache()
+        # 文章以單一 UPDATE 移至 Uncategorized，與刪除位於同一交易，快取只清除一次
+        moved = CategoryService.delete_category(category)
         
+        if moved:
+            flash(f'已將此分類下的 {moved} 篇文章移至 "Uncategorized" 分類。', 'info')
         flash('分類刪除成功！', 'success')
-        current_app.logger.info(f"分類 '{category_name}' (ID: {id}) 由使用者 {current_user.id} 刪除")
+        current_app.logger.info(
+            f"分類 '{category_name}' (ID: {id}) 由使用者 {current_user.id} 刪除，移動 {moved} 篇文章"
+        )
         
+    except ValueError as e:
+        flash(str(e), 'danger')
+        current_app.logger.warning(f"刪除分類 {id} 被拒絕：{e}")
     except Exception as e:
-        db.session.rollback()
         current_app.logger.error(f"刪除分類 {id} 時發生錯誤：{str(e)}")
         flash(f"刪除失敗：{str(e)}", "danger")
     
@@ -19,10 +19,13 @@ from __future__ import annotations
 # ========================================
 
 # 標準庫匯入
-# date: 用於網站地圖的日期處理
+# hashlib/os: 計算模板內容雜湊，作為 ETag 的版本來源
+# date/datetime: 用於網站地圖的日期處理與 Last-Modified
 # TYPE_CHECKING: 支援類型檢查而不會在運行時匯入
 # urlparse: 用於驗證和解析 URL，防止重定向攻擊
-from datetime import date
+import hashlib
+import os
+from datetime import date, datetime, time, timezone
 from typing import TYPE_CHECKING
 from urllib.parse import urlparse
 
@@ -37,12 +40,19 @@ from urllib.parse import urlparse
 # abort: 拋出 HTTP 錯誤
 # current_app: 當前應用程式實例
 # send_from_directory: 安全地提供靜態檔案
+# g: 請求範圍內保存本次回應的驗證器（ETag / Last-Modified）
+# stream_template: 串流渲染模板（網站地圖）
+# send_file: 回傳預先產生的網站地圖檔案
+# jsonify: 回傳 JSON（搜尋建議）
 from flask import (
     Blueprint, render_template, request,
     redirect, url_for, flash, Response, abort,
-    current_app, send_from_directory
+    current_app, send_from_directory, send_file, g, stream_template, jsonify
 )
 
+# is_resource_modified: 依 If-None-Match / If-Modified-Since 判斷是否可回傳 304
+from werkzeug.http import is_resource_modified
+
 # Flask-Login 擴展：提供用戶會話管理
 # login_user: 登入用戶
 # logout_user: 登出用戶
@@ -52,7 +62,9 @@ from flask_login import login_user, logout_user, login_required, current_user
 
 # SQLAlchemy 查詢函數
 # func: 提供資料庫函數，如 lower() 用於不區分大小寫查詢
+# load_only: 只載入指定欄位（網站地圖不需要文章內容）
 from sqlalchemy import func
+from sqlalchemy.orm import defer, load_only
 
 # 型別檢查匯入
 # 僅在類型檢查時匯入，避免循環匯入問題
@@ -64,8 +76,23 @@ if TYPE_CHECKING:
 # Post: 文章模型，管理部落格內容
 # Category: 分類模型，組織文章分類
 # LoginForm: 登入表單，處理用戶輸入驗證
+# KeysetPagination: 以 (created_at, id) 游標分頁，避免 OFFSET 掃描
+from app import db
+from app.cache_namespaces import namespace_version
 from app.models import User, Post, Category
 from app.forms import LoginForm
+from app.pagination import KeysetPagination, decode_cursor
+# compress_stream: 串流 gzip 壓縮（sitemap.xml.gz）
+from app.compression import compress_stream
+# SearchService: 全文搜尋索引
+from app.services.search_service import SearchService
+from app.services.suggest_service import SuggestService
+# SlugFilterService: 不存在的 slug 不查詢資料庫
+from app.services.slug_filter_service import SlugFilterService
+# SitemapService: 預先產生於 instance 目錄的網站地圖
+from app.services.sitemap_service import SitemapService
+# PageCacheService: 匿名訪客的整頁快取
+from app.services.page_cache_service import PageCacheService
 
 
 # ========================================
@@ -160,6 +187,7 @@ def _paginate_posts(query, page: int, per_page: int):
     - 為文章查詢添加統一的分頁和排序邏輯
     - 按建立時間降序排列（最新的在前）
     - 提供一致的分頁行為和錯誤處理
+    - PAGINATION_MODE 為 'keyset'（預設）時使用游標分頁
     
     參數：
         query: SQLAlchemy 查詢物件
@@ -167,17 +195,42 @@ def _paginate_posts(query, page: int, per_page: int):
         per_page (int): 每頁顯示的文章數量
     
     返回：
-        Pagination: Flask-SQLAlchemy 分頁物件
+        KeysetPagination | Pagination: 分頁物件
         
     分頁物件包含：
     - items: 當前頁的文章列表
-    - total: 總文章數
+    - total: 總文章數（游標模式下延遲計算）
     - has_prev/has_next: 是否有上一頁/下一頁
-    - prev_num/next_num: 上一頁/下一頁頁碼
+    
+    游標模式：
+    - 依 (created_at, id) 排序，使用 ?after= / ?before= 不透明游標
+    - 不執行 OFFSET 與 COUNT(*)，深層頁面與第一頁成本相同
+    - 舊的 ?page=N 連結（且未帶游標）仍以 OFFSET 分頁處理，維持相容
+    - 無效游標回傳 404，避免爬蟲產生重複內容
+    
+    查詢優化：
+    - 套用 Post.listing_options()，只載入列表欄位，不傳輸 content
     
     安全設定：
     - error_out=False: 避免無效頁碼導致 404 錯誤
     """
+    # 列表只顯示標題、摘要與縮圖，不載入文章內容
+    query = query.options(*Post.listing_options())
+
+    after_token = request.args.get('after')
+    before_token = request.args.get('before')
+    use_keyset = current_app.config.get('PAGINATION_MODE', 'keyset') == 'keyset'
+
+    if use_keyset and (after_token or before_token or page <= 1):
+        after = decode_cursor(after_token)
+        before = decode_cursor(before_token)
+        if (after_token and after is None) or (before_token and before is None):
+            abort(404)
+        return KeysetPagination(
+            query, per_page, Post.created_at, Post.id,
+            after=after, before=None if after else before
+        )
+
     return query.order_by(Post.created_at.desc()).paginate(
         page=page, 
         per_page=per_page, 
@@ -185,6 +238,189 @@ def _paginate_posts(query, page: int, per_page: int):
     )
 
 
+def _pagination_urls(pagination, **params) -> tuple[str | None, str | None]:
+    """
+    產生上一頁 / 下一頁的 URL
+    
+    功能說明：
+    - 游標分頁：輸出 ?before= / ?after= 游標連結
+    - 頁碼分頁：輸出 ?page= 連結（第一頁省略參數）
+    - 供模板輸出 rel=prev / rel=next 與頁尾導覽
+    
+    參數：
+        pagination: _paginate_posts 回傳的分頁物件
+        **params: 需保留在連結上的其他查詢參數（例如搜尋的 q）
+    
+    返回：
+        tuple[str | None, str | None]: (上一頁 URL, 下一頁 URL)
+    """
+    view_args = {**(request.view_args or {}), **params}
+
+    if isinstance(pagination, KeysetPagination):
+        prev_url = next_url = None
+        if pagination.prev_cursor:
+            prev_url = url_for(request.endpoint, before=pagination.prev_cursor, **view_args)
+        if pagination.next_cursor:
+            next_url = url_for(request.endpoint, after=pagination.next_cursor, **view_args)
+        return prev_url, next_url
+
+    prev_url = next_url = None
+    if pagination.has_prev:
+        if pagination.prev_num > 1:
+            view_args['page'] = pagination.prev_num
+        prev_url = url_for(request.endpoint, **view_args)
+    if pagination.has_next:
+        next_url = url_for(request.endpoint, **{**view_args, 'page': pagination.next_num})
+    return prev_url, next_url
+
+
+def _validator_seed() -> str:
+    """
+    取得驗證器的版本種子
+    
+    功能說明：
+    - 結合 VERSION 設定、所有模板內容與靜態資源清單計算雜湊
+    - 部署新版模板或靜態檔案後 ETag 自動改變，避免用戶端沿用舊版 HTML
+    - 每個應用程式只計算一次，保存在 app.extensions
+    
+    返回：
+        str: 12 碼的版本雜湊
+    """
+    seed = current_app.extensions.get('validator_seed')
+    if seed is None:
+        digest = hashlib.sha256(str(current_app.config.get('VERSION', '1.0.0')).encode('utf-8'))
+        template_folder = os.path.join(current_app.root_path, current_app.template_folder or 'templates')
+        for root, _dirs, files in sorted(os.walk(template_folder)):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, template_folder).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        for filename, file_hash in sorted(current_app.extensions.get('asset_manifest', {}).items()):
+            digest.update(f'{filename}={file_hash}'.encode('utf-8'))
+        seed = digest.hexdigest()[:12]
+        current_app.extensions['validator_seed'] = seed
+    return seed
+
+
+def _content_version() -> str:
+    """
+    列表頁（首頁、分類頁、搜尋）驗證器使用的內容版本
+    
+    功能說明：
+    - 由 posts 與 categories 快取命名空間的版本號組成（見 app.cache_namespaces）
+    - 文章新增、修改、刪除或分類異動後版本號改變，ETag 隨之改變
+    - 只讀取快取，不對資料庫執行 MAX(updated_at) / COUNT 聚合查詢
+    
+    返回：
+        str: 內容版本字串
+    """
+    return f"{namespace_version('posts')}.{namespace_version('categories')}"
+
+
+def _posts_aggregate(query) -> tuple[datetime | None, int]:
+    """
+    以單一聚合查詢取得文章集合的最後修改時間與數量
+    
+    功能說明：
+    - SELECT MAX(updated_at), COUNT(id)，不載入任何文章內容
+    - 數量用於偵測刪除（刪除文章不會提高 MAX(updated_at)）
+    - 只用於即時產生的 sitemap（本來就需要文章數量來分片）
+    
+    參數：
+        query: 已套用篩選條件的文章查詢
+    
+    返回：
+        tuple[datetime | None, int]: (最後修改時間, 文章數量)
+    """
+    last_modified, count = query.with_entities(
+        func.max(Post.updated_at), func.count(Post.id)
+    ).order_by(None).one()
+    # SQLite 不保存時區，updated_at 一律以 UTC 寫入
+    if last_modified and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified, count
+
+
+def _make_validators(last_modified: datetime | None, *parts) -> tuple[str, datetime | None] | None:
+    """
+    建立回應驗證器
+    
+    功能說明：
+    - ETag 由版本種子、登入狀態、最後修改時間與呼叫端提供的其他部分雜湊而成
+    - 登入狀態列入雜湊：已登入用戶看到的頁面（草稿、後台連結）與訪客不同
+    - 結果保存在 g.validators，由 _apply_validators 寫入實際回應
+    - CONDITIONAL_GET_ENABLED 關閉時回傳 None
+    
+    參數：
+        last_modified: 內容的最後修改時間（Last-Modified），列表頁為 None（只送 ETag）
+        *parts: 其他會影響輸出的值（數量、分類欄位等）
+    
+    返回：
+        tuple[str, datetime | None] | None: (ETag, Last-Modified)
+    """
+    if not current_app.config.get('CONDITIONAL_GET_ENABLED', True):
+        return None
+
+    user_key = current_user.get_id() if current_user.is_authenticated else 'anonymous'
+    raw = '|'.join(str(part) for part in (
+        _validator_seed(), user_key,
+        last_modified.isoformat() if last_modified else '', *parts
+    ))
+    etag = hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+    g.validators = (etag, last_modified)
+    return g.validators
+
+
+def _not_modified(validators: tuple[str, datetime | None] | None) -> Response | None:
+    """
+    在渲染之前檢查條件式請求
+    
+    功能說明：
+    - 依 If-None-Match（優先）或 If-Modified-Since 判斷內容是否改變
+    - 未改變時回傳 304，跳過模板渲染與文章內容查詢
+    
+    參數：
+        validators: _make_validators 的結果
+    
+    返回：
+        Response | None: 304 回應，或 None 表示需要正常渲染
+    """
+    if validators is None or request.method not in ('GET', 'HEAD'):
+        return None
+    etag, last_modified = validators
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return _apply_validators(Response(status=304), validators)
+
+
+def _apply_validators(response: Response, validators: tuple[str, datetime | None] | None = None) -> Response:
+    """
+    將驗證器寫入回應標頭
+    
+    功能說明：
+    - ETag 使用弱驗證器（壓縮、nonce 替換後位元組不同，語意相同）
+    - Cache-Control: no-cache 讓瀏覽器每次回伺服器驗證，內容更新能立即生效
+    - 已登入用戶的回應加上 private，避免共享快取保存
+    
+    參數：
+        response: 要加上標頭的回應
+        validators: 驗證器，省略時使用 g.validators
+    """
+    validators = validators or getattr(g, 'validators', None)
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified = validators
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
+
+
 def _get_safe_next_url(default_endpoint: str = 'dashboard.index') -> str:
     """
     安全地取得 next 參數的 URL，防止重定向攻擊
@@ -290,6 +526,40 @@ auth_bp = Blueprint('auth', __name__)
 sitemap_bp = Blueprint('sitemap', __name__)
 
 
+# ========================================
+# 整頁快取（僅限 main 藍圖的匿名訪客）
+# ========================================
+
+@main_bp.before_request
+def _serve_cached_page():
+    """
+    命中快取時直接回傳已渲染的頁面
+    
+    - 跳過 ORM 查詢、context processor 與 Jinja 渲染
+    - 已登入用戶一律略過快取（可看到草稿與後台連結）
+    - 文章異動於提交後失效（app.models.clear_post_caches_after_commit），
+      分類異動時由 CategoryService.clear_category_cache() 失效
+    """
+    return PageCacheService.serve_cached_page()
+
+
+@main_bp.after_request
+def _store_cached_page(response):
+    """將匿名訪客的 200 HTML 回應寫入整頁快取"""
+    return PageCacheService.store_page(response)
+
+
+@main_bp.after_request
+def _set_validators(response):
+    """
+    為路由計算出的驗證器加上 ETag / Last-Modified 標頭
+    
+    藍圖的 after_request 以註冊的相反順序執行，此函數先於整頁快取執行，
+    因此快取內容會一併保存驗證器，命中時同樣能回傳 304。
+    """
+    return _apply_validators(response)
+
+
 # ========================================
 # 主要路由功能 (原 main.py)
 # ========================================
@@ -316,6 +586,7 @@ def index():
     模板變數：
         posts: 當前頁的文章列表
         pagination: 分頁物件（包含頁碼、總數等資訊）
+        prev_url/next_url: 上一頁/下一頁連結（rel=prev/next）
         active_page: 用於導航高亮的頁面標識
     
     SEO 考量：
@@ -324,8 +595,16 @@ def index():
     """
     page, per_page = _get_pagination_params()
     query = Post.query.filter_by(status='published')
+
+    # 條件式請求：內容未改變時在渲染前回傳 304（版本號取自快取，不查詢資料庫）
+    not_modified = _not_modified(_make_validators(None, _content_version()))
+    if not_modified:
+        return not_modified
+
     pagination = _paginate_posts(query, page, per_page)
-    return render_template('main/index.html', posts=pagination.items, pagination=pagination, active_page='home')
+    prev_url, next_url = _pagination_urls(pagination)
+    return render_template('main/index.html', posts=pagination.items, pagination=pagination,
+                           prev_url=prev_url, next_url=next_url, active_page='home')
 
 
 @main_bp.route('/<slug>/', methods=['GET'])
@@ -352,6 +631,10 @@ def post(slug):
        - 其他：根據 slug 欄位查詢
     3. 檢查文章存在性和訪問權限
     
+    資料庫查詢優化：
+    - 延遲載入原始 content，頁面輸出儲存時渲染好的 rendered_html
+    - slug 不在 SlugFilterService 的 Bloom filter 中時直接 404，不查詢資料庫
+
     訪問控制：
     - 已發布文章：所有用戶可訪問
     - 草稿文章：僅已登入用戶可訪問
@@ -371,15 +654,23 @@ def post(slug):
     if slug.startswith('untitled-'):
         try:
             post_id = int(slug.replace('untitled-', ''))
-            post = Post.query.filter_by(id=post_id).first_or_404()
+            post = Post.query.options(defer(Post.content)).filter_by(id=post_id).first_or_404()
         except ValueError:
             abort(404)
     else:
-        post = Post.query.filter_by(slug=slug).first_or_404()
+        if not SlugFilterService.might_exist(slug):
+            abort(404)
+        post = Post.query.options(defer(Post.content)).filter_by(slug=slug).first_or_404()
     
     # 只有已發布的文章或已登入用戶可以查看草稿
     if post.status == 'draft' and not current_user.is_authenticated:
         abort(404)
+
+    # 條件式請求：文章未修改時回傳 304，不渲染模板
+    # category_id 也列入：刪除分類時的批次搬移可能不經過 ORM 事件
+    not_modified = _not_modified(_make_validators(post.updated_at, post.id, post.status, post.category_id))
+    if not_modified:
+        return not_modified
     
     return render_template('blog/post.html', post=post)
 
@@ -421,6 +712,7 @@ def category(slug):
     模板變數：
         posts: 當前頁的文章列表
         pagination: 分頁物件
+        prev_url/next_url: 上一頁/下一頁連結
         category: 完整的分類物件（包含名稱、描述等）
         active_page: 頁面標識符
     
@@ -441,17 +733,93 @@ def category(slug):
         func.lower(Category.slug) == slug.lower(),
         Post.status == 'published'
     )
+
+    # 條件式請求：分類本身的欄位也會顯示在頁面上，一併列入 ETag
+    validators = _make_validators(
+        None, _content_version(), category.id, category.name, category.description
+    )
+    not_modified = _not_modified(validators)
+    if not_modified:
+        return not_modified
+
     pagination = _paginate_posts(query, page, per_page)
+    prev_url, next_url = _pagination_urls(pagination)
 
     return render_template(
         'main/category.html',
         posts=pagination.items,
         pagination=pagination,
+        prev_url=prev_url,
+        next_url=next_url,
         category=category,   # 傳整個 category object 給 template，比單純 name 更彈性
         active_page='category'
     )
 
 
+@main_bp.route('/search')
+def search():
+    """
+    全文搜尋：以關鍵字搜尋已發布文章的標題、摘要與內容
+
+    URL 模式：
+        GET /search?q=<關鍵字>&page=<頁碼>
+        （對應 post_list.html 中 schema.org SearchAction 的 target）
+
+    查詢邏輯：
+    - 由 SearchService 查詢全文索引（SQLite FTS5 / PostgreSQL tsvector）
+    - 所有關鍵字皆須符合，依相關度排序（標題 > 摘要 > 內容）
+    - 中文以二字詞（bigram）比對
+    - 以 ?page= 分頁，結果只載入列表欄位
+
+    模板變數：
+        posts: 當前頁的文章列表
+        query: 搜尋字串
+        pagination: SearchResults 分頁物件
+    """
+    query = (request.args.get('q') or '').strip()[:200]
+    page, per_page = _get_pagination_params()
+
+    # 條件式請求：索引內容隨已發布文章改變
+    validators = _make_validators(None, _content_version(), 'search', query, page)
+    not_modified = _not_modified(validators)
+    if not_modified:
+        return not_modified
+
+    results = SearchService.search(query, page, per_page)
+    prev_url, next_url = _pagination_urls(results, q=query) if query else (None, None)
+    return render_template('main/search.html', posts=results.items, pagination=results,
+                           query=query, prev_url=prev_url, next_url=next_url, active_page='search')
+
+
+@main_bp.route('/search/suggest')
+def search_suggest():
+    """
+    搜尋框的即時建議：標題或分類名稱中有詞以輸入字串開頭者
+
+    URL 模式：
+        GET /search/suggest?q=<前綴>
+
+    查詢邏輯：
+    - 由 SuggestService 的程序內前綴索引回答，不查詢資料庫
+    - 分類在前，文章依標題排序，最多 8 筆
+    - 回應只有 JSON（{q, suggestions: [{type, title, url}]}），與登入狀態無關
+
+    快取：
+    - Cache-Control: public，max-age 由 SEARCH_SUGGEST_MAX_AGE 設定，
+      讓瀏覽器與 CDN 直接回應重複輸入的前綴
+    - ETag 由索引版本與查詢字串組成，文章或分類異動後改變
+    """
+    query = (request.args.get('q') or '').strip()[:100]
+    version, suggestions = SuggestService.suggest(query)
+    response = jsonify(q=query, suggestions=suggestions)
+    response.set_etag(hashlib.sha256(f'{version}|{query}'.encode('utf-8')).hexdigest()[:32], weak=True)
+    max_age = current_app.config.get('SEARCH_SUGGEST_MAX_AGE', 300)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.stale_while_revalidate = max_age
+    return response.make_conditional(request)
+
+
 @main_bp.route('/robots.txt')
 def robots_txt():
     """
@@ -641,6 +1009,224 @@ def logout():
 # 網站地圖路由功能 (原 sitemap.py)
 # ========================================
 
+def _sitemap_static_routes() -> list[str]:
+    """網站地圖中的靜態路由端點（SITEMAP_STATIC_ROUTES）"""
+    return current_app.config.get('SITEMAP_STATIC_ROUTES', ['main.index'])
+
+
+def _sitemap_static_pages(today: str) -> list[dict]:
+    """
+    網站地圖中的靜態頁面
+    
+    功能說明：
+    - 從應用程式配置讀取 SITEMAP_STATIC_ROUTES
+    - 設定高優先級（1.0）和每日更新頻率
+    
+    參數：
+        today (str): 今日日期（ISO 格式），作為靜態頁面的 lastmod
+    """
+    pages = []
+    for endpoint in _sitemap_static_routes():
+        url = _safe_url_generation(endpoint, _external=True)
+        if url:
+            pages.append({
+                'loc': url,
+                'lastmod': today,
+                'changefreq': 'daily',
+                'priority': '1.0',
+            })
+    return pages
+
+
+def _shard_bounds(shard: int | None, static_count: int) -> tuple[int, int | None]:
+    """
+    計算分片中文章的 OFFSET / LIMIT
+    
+    功能說明：
+    - 第 1 片先放靜態頁面，其餘空間放文章
+    - 文章依 id 排序，新文章只會出現在最後一片，前面的分片內容保持穩定
+    - shard 為 None 表示不分片（全部文章）
+    
+    返回：
+        tuple[int, int | None]: (offset, limit)
+    """
+    if shard is None:
+        return 0, None
+    max_urls = current_app.config.get('SITEMAP_MAX_URLS', 50000)
+    if shard == 1:
+        return 0, max_urls - static_count
+    return (shard - 1) * max_urls - static_count, max_urls
+
+
+def _iter_sitemap_pages(shard: int | None, today: str):
+    """
+    逐筆產生網站地圖項目
+    
+    功能說明：
+    - 直接迭代 yield_per 的查詢結果，不在記憶體中累積整份清單
+    - 只載入產生 URL 所需的欄位（id、slug、updated_at、created_at）
+    - 查詢失敗時記錄錯誤並結束，已輸出的部分仍為合法 XML
+    
+    參數：
+        shard (int | None): 分片編號（從 1 開始），None 表示不分片
+        today (str): 今日日期（ISO 格式）
+    """
+    if shard in (None, 1):
+        yield from _sitemap_static_pages(today)
+
+    offset, limit = _shard_bounds(shard, len(_sitemap_static_routes()))
+    query = Post.query.filter_by(status='published').options(
+        load_only(Post.id, Post.slug, Post.updated_at, Post.created_at)
+    ).order_by(Post.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+
+    try:
+        for post in query.yield_per(500):
+            # 支援自定義 slug 和自動生成的 untitled-{id} 格式
+            post_slug = post.slug or f'untitled-{post.id}'
+            post_url = _safe_url_generation('main.post', slug=post_slug, _external=True)
+            if not post_url:
+                continue
+            # 使用文章的實際修改時間，回退到建立時間
+            updated = (post.updated_at or post.created_at).date().isoformat()
+            yield {
+                'loc': post_url,
+                'lastmod': updated,
+                # 允許在 Post 模型中自訂 SEO 參數，提供預設值
+                'changefreq': getattr(post, 'changefreq', 'monthly'),
+                'priority': getattr(post, 'priority', '0.8'),
+            }
+    except Exception as e:
+        current_app.logger.error(f"無法為網站地圖取得文章：{e}")
+
+
+def _iter_sitemap_shards(post_count: int, static_count: int, gzipped: bool):
+    """
+    產生網站地圖索引中的分片項目
+    
+    功能說明：
+    - 每個分片的 lastmod 為該片文章的 MAX(updated_at)
+    - 以子查詢取得分片範圍內的文章，分片數通常只有個位數
+    """
+    max_urls = current_app.config.get('SITEMAP_MAX_URLS', 50000)
+    shard_count = -(-(post_count + static_count) // max_urls)
+    endpoint = 'sitemap.sitemap_shard_gz' if gzipped else 'sitemap.sitemap_shard'
+    for shard in range(1, shard_count + 1):
+        offset, limit = _shard_bounds(shard, static_count)
+        subquery = Post.query.filter_by(status='published').with_entities(
+            Post.updated_at
+        ).order_by(Post.id).offset(offset).limit(limit).subquery()
+        lastmod = db.session.query(func.max(subquery.c.updated_at)).scalar()
+        yield {
+            'loc': url_for(endpoint, shard=shard, _external=True),
+            'lastmod': lastmod.date().isoformat() if lastmod else None,
+        }
+
+
+def _buffered(chunks, size: int = 16384):
+    """合併模板輸出的小片段，避免每個 <url> 都成為一次 socket 寫入"""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _precomputed_sitemap(shard: int | None, gzipped: bool) -> Response:
+    """
+    回傳預先產生的網站地圖檔案
+    
+    功能說明：
+    - 檔案由 SitemapService 寫入 instance 目錄，文章異動後增量更新
+    - 尚未產生時（首次部署、instance 目錄被清空）先完整重建一次
+    - 使用 send_file 的 conditional 模式，依檔案 mtime / 大小回應 ETag 與 304
+    
+    參數：
+        shard (int | None): 分片編號，None 表示 /sitemap.xml
+        gzipped (bool): 是否回傳 .xml.gz
+    """
+    filename = 'sitemap.xml' if shard is None else f'sitemap-{shard}.xml'
+    if gzipped:
+        filename += '.gz'
+
+    if SitemapService.artifact_path('sitemap.xml') is None:
+        SitemapService.rebuild()
+    path = SitemapService.artifact_path(filename)
+    if path is None:
+        abort(404)
+
+    response = send_file(
+        path,
+        mimetype='application/gzip' if gzipped else 'application/xml',
+        conditional=True,
+        etag=True,
+    )
+    response.cache_control.no_cache = True
+    return response
+
+
+def _sitemap_response(shard: int | None = None, gzipped: bool = False) -> Response:
+    """
+    網站地圖與分片的共用處理流程
+    
+    處理流程：
+    1. 以單一聚合查詢計算驗證器，符合條件式請求時回傳 304
+    2. 總 URL 數不超過 SITEMAP_MAX_URLS 時輸出單一 urlset
+    3. 超過時 /sitemap.xml 改為 sitemapindex，列出 /sitemap-<n>.xml 分片
+    4. 以 stream_template 串流輸出，記憶體用量與文章數無關
+    5. gzipped 為 True 時以 gzip 串流壓縮（.xml.gz）
+    
+    參數：
+        shard (int | None): 分片編號，None 表示 /sitemap.xml
+        gzipped (bool): 是否輸出 .xml.gz
+    """
+    if SitemapService.is_enabled():
+        return _precomputed_sitemap(shard, gzipped)
+
+    today = date.today().isoformat()
+    max_urls = current_app.config.get('SITEMAP_MAX_URLS', 50000)
+    static_count = len(_sitemap_static_routes())
+
+    # 條件式請求：爬蟲帶 If-None-Match / If-Modified-Since 時免去整份重建
+    # 靜態路由的 lastmod 為當日日期，因此日期也列入 ETag
+    published = Post.query.filter_by(status='published')
+    last_modified, post_count = _posts_aggregate(published)
+    day_start = datetime.combine(date.today(), time.min, tzinfo=timezone.utc)
+    validators = _make_validators(
+        max(filter(None, (last_modified, day_start))), post_count, today, gzipped
+    )
+    not_modified = _not_modified(validators)
+    if not_modified:
+        return not_modified
+
+    is_index = post_count + static_count > max_urls
+    if shard is not None:
+        shard_count = -(-(post_count + static_count) // max_urls)
+        if not is_index or shard < 1 or shard > shard_count:
+            abort(404)
+        stream = stream_template('sitemap.xml', pages=_iter_sitemap_pages(shard, today))
+    elif is_index:
+        stream = stream_template(
+            'sitemap_index.xml',
+            sitemaps=_iter_sitemap_shards(post_count, static_count, gzipped)
+        )
+    else:
+        stream = stream_template('sitemap.xml', pages=_iter_sitemap_pages(None, today))
+
+    stream = _buffered(stream)
+    if gzipped:
+        level = current_app.config.get('COMPRESSION_GZIP_LEVEL', 6)
+        response = Response(compress_stream(stream, 'gzip', level, 'utf-8'), mimetype='application/gzip')
+    else:
+        response = Response(stream, mimetype='application/xml')
+    return _apply_validators(response, validators)
+
+
 @sitemap_bp.route('/sitemap.xml', methods=['GET'])
 def sitemap():
     """
@@ -650,117 +1236,70 @@ def sitemap():
     - 為搜索引擎提供網站結構的完整地圖
     - 自動包含所有已發布的文章和靜態頁面
     - 提供 SEO 相關的元資料（最後修改時間、更新頻率、優先級）
-    - 支援大量文章的效能優化處理
+    - 以串流方式輸出，支援大量文章
     
     URL 模式：
         GET /sitemap.xml
     
-    SEO 重要性：
-    - 幫助搜索引擎發現和索引網站內容
-    - 提供內容的優先級和更新頻率資訊
-    - 加速新內容的搜索引擎收錄
-    - 改善網站在搜索結果中的可見性
-    
     網站地圖結構：
     1. 靜態頁面：
        - 從應用程式配置讀取 SITEMAP_STATIC_ROUTES
        - 設定高優先級（1.0）和每日更新頻率
-       - 包含首頁和其他重要靜態頁面
     
     2. 動態內容（文章）：
        - 查詢所有已發布狀態的文章
-       - 生成 SEO 友好的 URL
-       - 設定適當的優先級和更新頻率
        - 使用文章的實際修改時間
     
     效能優化：
-    - 使用 yield_per(100) 批次處理大量文章
-    - 減少記憶體使用和資料庫負載
-    - 適合處理數千篇文章的大型網站
+    - 直接迭代 yield_per(500) 的查詢結果並以 stream_template 串流輸出
+    - 不在記憶體中建立整份頁面清單，首位元組時間與文章數無關
+    - 條件式請求在產生內容前就以聚合查詢判斷，未改變時回傳 304
     
-    錯誤處理：
-    - 資料庫查詢異常的妥善處理
-    - URL 生成失敗的容錯機制
-    - 確保部分內容失敗不影響整個網站地圖
-    
-    配置彈性：
-    - 支援透過應用程式配置自訂靜態路由
-    - 支援文章層級的 SEO 參數設定
-    - 預設值確保基本功能始終可用
+    分片（sitemap index）：
+    - 網站地圖協議限制每個檔案最多 50,000 個 URL（SITEMAP_MAX_URLS）
+    - 超過時此路由改為輸出 sitemapindex，列出 /sitemap-<n>.xml 分片
     
     XML 標準：
     - 符合 sitemap.xml 協議標準
     - 包含 loc（URL）、lastmod（最後修改）、changefreq（更新頻率）、priority（優先級）
     - 正確的 MIME 類型（application/xml）
     
-    返回格式：
-        XML 響應，包含所有頁面的結構化資訊
-        
-    模板變數：
-        pages: 包含所有頁面資訊的列表，每個項目包含：
-            - loc: 頁面的完整 URL
-            - lastmod: 最後修改日期 (ISO 格式)
-            - changefreq: 更新頻率 ('daily', 'weekly', 'monthly' 等)
-            - priority: 優先級 (0.0-1.0)
-    
     使用場景：
     - 提交給 Google Search Console
     - 提交給 Bing Webmaster Tools
     - 其他搜索引擎的網站地圖提交
-    - SEO 工具的網站分析
     """
-    pages = []
-    today = date.today().isoformat()
+    return _sitemap_response()
 
-    # 1️⃣ 靜態路由處理
-    # 從應用程式配置讀取需要包含在網站地圖中的靜態路由
-    # 這些通常是網站的重要頁面，如首頁、關於頁面等
-    static_routes = current_app.config.get('SITEMAP_STATIC_ROUTES', ['main.index'])
-    for endpoint in static_routes:
-        url = _safe_url_generation(endpoint, _external=True)
-        if url:
-            pages.append({
-                'loc': url,
-                'lastmod': today,
-                'changefreq': 'daily',
-                'priority': '1.0',
-            })
 
-    # 2️⃣ 動態內容（文章）處理
-    # 查詢所有已發布的文章，使用 yield_per 進行效能優化
-    try:
-        posts = Post.query.filter_by(status='published').yield_per(100)
-    except Exception as e:
-        current_app.logger.error(f"無法為網站地圖取得文章：{e}")
-        posts = []
+@sitemap_bp.route('/sitemap.xml.gz', methods=['GET'])
+def sitemap_gz():
+    """
+    gzip 壓縮的網站地圖
+    
+    內容與 /sitemap.xml 相同，以 application/gzip 串流壓縮輸出；
+    分片模式下索引中的分片連結也會指向 .xml.gz 版本。
+    """
+    return _sitemap_response(gzipped=True)
 
-    for post in posts:
-        # 處理文章 URL 生成
-        # 支援自定義 slug 和自動生成的 untitled-{id} 格式
-        post_slug = post.slug or f'untitled-{post.id}'
-        post_url = _safe_url_generation('main.post', slug=post_slug, _external=True)
-        
-        if post_url:
-            # 使用文章的實際修改時間，回退到建立時間
-            updated = (post.updated_at or post.created_at).date().isoformat()
 
-            # 3️⃣ 動態 SEO 參數設定
-            # 允許在 Post 模型中自訂 SEO 參數，提供預設值
-            changefreq = getattr(post, 'changefreq', 'monthly')
-            priority = getattr(post, 'priority', '0.8')
+@sitemap_bp.route('/sitemap-<int:shard>.xml', methods=['GET'])
+def sitemap_shard(shard):
+    """
+    網站地圖分片
+    
+    URL 模式：
+        GET /sitemap-<n>.xml（n 從 1 開始）
+    
+    只有在總 URL 數超過 SITEMAP_MAX_URLS 時存在，其餘情況回傳 404。
+    """
+    return _sitemap_response(shard)
 
-            pages.append({
-                'loc': post_url,
-                'lastmod': updated,
-                'changefreq': changefreq,
-                'priority': priority,
-            })
 
-    # 返回 XML 格式的網站地圖
-    return Response(
-        render_template("sitemap.xml", pages=pages),
-        mimetype='application/xml'
-    )
+@sitemap_bp.route('/sitemap-<int:shard>.xml.gz', methods=['GET'])
+def sitemap_shard_gz(shard):
+    """gzip 壓縮的網站地圖分片"""
+    return _sitemap_response(shard, gzipped=True)
 
 # ========================================
 # 藍圖註冊與應用程式集成
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+記憶體內倒排索引（SEARCH_BACKEND = 'memory'）
+
+給沒有 FTS5 的 SQLite 單機部署使用：搜尋不查詢資料庫，
+直接在程序內的倒排索引上求交集並排序。
+
+- 詞彙切分與資料庫索引相同（search_tokens：小寫單字、中文二字詞）
+- 分數：標題每次出現 10 分、摘要 5 分、內容 1 分，查詢時乘上 idf
+- 所有關鍵字皆須出現（AND），由文件數最少的詞開始，以二分搜尋比對其他詞
+- 以二進位快照保存於 instance 目錄，worker 啟動時直接載入，不必重建
+- 增量更新只附加到日誌檔（每行一筆 JSON），不重寫整個快照；
+  日誌超過 JOURNAL_COMPACT_ENTRIES 筆時才寫入新快照並清空日誌
+- 其他 worker 依快照的 mtime 與日誌長度判斷是否需要重新載入或補讀日誌
+
+為了讓數萬篇文章的索引仍能放進記憶體並快速載入，posting 不使用 Python dict：
+
+- 每篇文章（每次新增或更新）取得遞增的內部編號，posting 是
+  （內部編號 << 16 | 分數）的 array，只需附加在尾端，永遠保持排序
+- 更新或刪除只把舊編號標記為已刪除（post_ids 中設為 0），搜尋時略過；
+  寫入快照時才從 posting 中移除
+- 載入快照時所有 posting 留在同一個 array 中，只建立「詞 -> 位置」對照表；
+  某個詞第一次被修改時才複製出自己的 array
+"""
+from __future__ import annotations
+
+import gzip
+import heapq
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+FORMAT_MAGIC = b'FBSI'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('<4sIIII')
+TITLE_WEIGHT = 10
+DESCRIPTION_WEIGHT = 5
+BODY_WEIGHT = 1
+# posting 的低 16 位元為分數
+SCORE_BITS = 16
+MAX_SCORE = (1 << SCORE_BITS) - 1
+JOURNAL_COMPACT_ENTRIES = 500
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class MemorySearchIndex:
+    """程序內的倒排索引；讀寫皆以鎖保護，可在多執行緒 worker 中共用"""
+
+    def __init__(self):
+        # 詞 -> posting（內部編號 << 16 | 分數，遞增排列）；載入後修改過的詞
+        self.postings: Dict[str, array] = {}
+        # 快照中的 posting：全部串接在 _packed，詞 -> 詞序號，_starts[詞序號] 為起點
+        self._packed = memoryview(array('Q'))
+        self._packed_terms: Dict[str, int] = {}
+        self._starts = array('Q', [0])
+        # 內部編號 -> 文章 ID（0 表示已刪除）
+        self.post_ids = array('I')
+        # 文章 ID -> 目前的內部編號
+        self.docnos: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        # 最後一次載入或寫入的快照 mtime 與已讀取的日誌位置，用於判斷其他 worker 是否更新過
+        self.mtime: Optional[int] = None
+        self.journal_offset = 0
+        self.journal_entries = 0
+
+    def __len__(self) -> int:
+        return len(self.docnos)
+
+    @property
+    def term_count(self) -> int:
+        return len(self._packed_terms.keys() | self.postings.keys())
+
+    @staticmethod
+    def score_tokens(title_tokens, description_tokens, body_tokens) -> Counter:
+        """計算一篇文章各詞的加權分數"""
+        scores = Counter()
+        for tokens, weight in ((title_tokens, TITLE_WEIGHT),
+                               (description_tokens, DESCRIPTION_WEIGHT),
+                               (body_tokens, BODY_WEIGHT)):
+            for token in tokens:
+                scores[token] += weight
+        return scores
+
+    def _posting(self, token: str):
+        """詞的 posting（array 或快照中的 memoryview 片段），不存在時回傳 None"""
+        entry = self.postings.get(token)
+        if entry is None:
+            n = self._packed_terms.get(token)
+            if n is not None:
+                entry = self._packed[self._starts[n]:self._starts[n + 1]]
+        return entry
+
+    def _remove_unlocked(self, post_id: int) -> None:
+        docno = self.docnos.pop(post_id, None)
+        if docno is not None:
+            self.post_ids[docno] = 0
+
+    def _add_unlocked(self, post_id: int, scores: Dict[str, int]) -> None:
+        self._remove_unlocked(post_id)
+        docno = len(self.post_ids)
+        self.post_ids.append(post_id)
+        self.docnos[post_id] = docno
+        for token, score in scores.items():
+            entry = self.postings.get(token)
+            if entry is None:
+                entry = self.postings[token] = array('Q', self._posting(token) or ())
+            entry.append(docno << SCORE_BITS | min(score, MAX_SCORE))
+
+    def add(self, post_id: int, scores: Dict[str, int]) -> None:
+        """新增或取代一篇文章"""
+        with self._lock:
+            self._add_unlocked(post_id, scores)
+
+    def remove(self, post_id: int) -> None:
+        """移除一篇文章"""
+        with self._lock:
+            self._remove_unlocked(post_id)
+
+    def search(self, tokens: List[str], offset: int = 0, limit: int = 10) -> Tuple[List[int], int]:
+        """
+        搜尋符合所有詞的文章
+
+        回傳：
+            (依分數排序的文章 ID（該頁）, 符合的總數)
+        """
+        with self._lock:
+            lists = []
+            for token in dict.fromkeys(tokens):
+                entry = self._posting(token)
+                if entry is None:
+                    return [], 0
+                lists.append(entry)
+            if not lists:
+                return [], 0
+
+            lists.sort(key=len)
+            total_docs = len(self.docnos) or 1
+            idfs = [math.log(1 + total_docs / len(entry)) for entry in lists]
+            first, others = lists[0], lists[1:]
+            # 各 posting 的搜尋起點：候選編號遞增，之後的比對不必回頭
+            starts = [0] * len(others)
+            post_ids = self.post_ids
+            matches = []
+            for value in first:
+                docno = value >> SCORE_BITS
+                post_id = post_ids[docno]
+                if not post_id:
+                    continue
+                total = (value & MAX_SCORE) * idfs[0]
+                for n, entry in enumerate(others):
+                    i = bisect_left(entry, docno << SCORE_BITS, starts[n])
+                    starts[n] = i
+                    if i == len(entry) or entry[i] >> SCORE_BITS != docno:
+                        break
+                    total += (entry[i] & MAX_SCORE) * idfs[n + 1]
+                else:
+                    matches.append((-total, -post_id))
+            # 只需排出到本頁為止的結果
+            ranked = heapq.nsmallest(offset + limit, matches)
+        return [-post_id for _score, post_id in ranked[offset:]], len(matches)
+
+    def dumps(self) -> bytes:
+        """
+        序列化為 gzip 壓縮的二進位快照（已刪除的內部編號不寫入）
+
+        格式：標頭、post_ids、各詞的 posting 長度、串接的 posting、
+        以換行分隔的詞（詞不含空白字元）
+        """
+        with self._lock:
+            post_ids = self.post_ids
+            has_deleted = len(post_ids) != len(self.docnos)
+            tokens, lengths, packed = [], array('Q'), array('Q')
+            for token in self._packed_terms.keys() | self.postings.keys():
+                entry = self._posting(token)
+                if has_deleted:
+                    entry = [value for value in entry if post_ids[value >> SCORE_BITS]]
+                    if not entry:
+                        continue
+                tokens.append(token)
+                lengths.append(len(entry))
+                packed.extend(entry)
+            parts = [
+                _HEADER.pack(FORMAT_MAGIC, FORMAT_VERSION, len(post_ids), len(tokens), len(packed)),
+                _to_little_endian(post_ids),
+                _to_little_endian(lengths),
+                _to_little_endian(packed),
+                '\n'.join(tokens).encode('utf-8'),
+            ]
+        # 快照只在壓縮日誌時寫入，以較低的壓縮等級換取寫入速度
+        return gzip.compress(b''.join(parts), compresslevel=1, mtime=0)
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'MemorySearchIndex':
+        """由 dumps 的結果還原；格式不符時拋出 ValueError"""
+        try:
+            data = gzip.decompress(data)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f'Corrupt search index: {e}') from e
+        if len(data) < _HEADER.size:
+            raise ValueError('Truncated search index')
+        magic, version, doc_count, term_count, posting_count = _HEADER.unpack_from(data)
+        if magic != FORMAT_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'Unsupported search index version: {version}')
+
+        offset = _HEADER.size
+        sections = []
+        for typecode, count in (('I', doc_count), ('Q', term_count), ('Q', posting_count)):
+            size = count * array(typecode).itemsize
+            sections.append(_from_little_endian(typecode, data[offset:offset + size]))
+            offset += size
+        post_ids, lengths, packed = sections
+        tokens = data[offset:].decode('utf-8').split('\n') if term_count else []
+        if len(tokens) != term_count or len(lengths) != term_count or len(packed) != posting_count:
+            raise ValueError('Truncated search index')
+
+        index = cls()
+        index.post_ids = post_ids
+        index.docnos = {post_id: docno for docno, post_id in enumerate(post_ids) if post_id}
+        index._packed = memoryview(packed)
+        index._packed_terms = dict(zip(tokens, range(term_count)))
+        index._starts = array('Q', accumulate(lengths, initial=0))
+        return index
+
+    @staticmethod
+    def journal_path(path: str) -> str:
+        return f'{path}.journal'
+
+    def save(self, path: str) -> None:
+        """寫入新快照（暫存檔 + os.replace 原子取代）並清空日誌"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.dumps())
+        os.replace(tmp_path, path)
+        # 先取代快照再清空日誌：期間載入的 worker 會在新快照上重播舊日誌，結果相同
+        with open(self.journal_path(path), 'wb'):
+            pass
+        self.mtime = os.stat(path).st_mtime_ns
+        self.journal_offset = 0
+        self.journal_entries = 0
+
+    @classmethod
+    def load(cls, path: str) -> 'MemorySearchIndex':
+        """從快照載入並重播日誌"""
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, 'rb') as f:
+            index = cls.loads(f.read())
+        index.mtime = mtime
+        index.replay_journal(path)
+        return index
+
+    def refresh(self, path: str) -> bool:
+        """
+        補讀其他 worker 附加的日誌
+
+        回傳：
+            False 表示快照已被取代（或檔案不存在），需要重新載入
+        """
+        try:
+            if os.stat(path).st_mtime_ns != self.mtime:
+                return False
+            size = os.path.getsize(self.journal_path(path))
+        except OSError:
+            return False
+        if size < self.journal_offset:
+            return False
+        if size > self.journal_offset:
+            self.replay_journal(path)
+        return True
+
+    def replay_journal(self, path: str) -> None:
+        """套用日誌中尚未讀取的部分"""
+        try:
+            with open(self.journal_path(path), 'rb') as f:
+                f.seek(self.journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # 只處理完整的行，寫到一半的最後一行留待下次
+        end = data.rfind(b'\n') + 1
+        with self._lock:
+            for line in data[:end].splitlines():
+                entry = json.loads(line)
+                if entry.get('scores') is None:
+                    self._remove_unlocked(entry['id'])
+                else:
+                    self._add_unlocked(entry['id'], entry['scores'])
+                self.journal_entries += 1
+            self.journal_offset += end
+
+    def append_journal(self, path: str, changes: Dict[int, Optional[Counter]]) -> None:
+        """
+        套用變更並附加到日誌（呼叫端需持有跨程序的寫入鎖）
+
+        參數：
+            changes: 文章 ID -> 各詞分數，None 表示移除
+        """
+        lines = []
+        with self._lock:
+            for post_id, scores in changes.items():
+                if scores is None:
+                    self._remove_unlocked(post_id)
+                else:
+                    self._add_unlocked(post_id, scores)
+                lines.append(json.dumps({'id': post_id, 'scores': scores}, ensure_ascii=False,
+                                        separators=(',', ':')) + '\n')
+        if self.journal_entries + len(lines) > JOURNAL_COMPACT_ENTRIES or self.mtime is None:
+            self.save(path)
+            return
+        data = ''.join(lines).encode('utf-8')
+        with open(self.journal_path(path), 'ab') as f:
+            f.write(data)
+        self.journal_offset += len(data)
+        self.journal_entries += len(lines)
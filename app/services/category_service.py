@@ -4,24 +4,25 @@ Category Service
 
 Handles category-related business logic
 """
+from datetime import datetime, timezone
+from types import SimpleNamespace
 from typing import List, Tuple, Optional
+from sqlalchemy import case, func, update
 from app.models import Category
-from app import cache
+from app.cache_namespaces import invalidate_namespace
 
 
 class CategoryService:
     """Service for handling category operations"""
     
     @staticmethod
-    @cache.memoize(timeout=300, make_name=lambda fname: f'blog_category_choices_{fname}')
     def get_category_choices() -> List[Tuple[int, str]]:
-        """Get category choices for forms
+        """Get category choices for forms (from the cached category views)
         
         Returns:
             List of tuples containing (category_id, category_name)
         """
-        categories = Category.query.all()
-        return [(0, '選擇分類')] + [(c.id, c.name) for c in categories]
+        return [(0, '選擇分類')] + [(view.id, view.name) for view in Category.cached_views()]
     
     @staticmethod
     def has_categories() -> bool:
@@ -62,15 +63,20 @@ class CategoryService:
     
     @staticmethod
     def clear_category_cache():
-        """Clear category-related caches"""
-        cache.delete('blog_available_categories')
-        cache.delete('blog_category_choices')
-        cache.delete('nav_available_categories')
-        cache.delete_memoized(CategoryService.get_category_choices)
-        
+        """Clear category-related caches
+
+        Category lists, form choices, the navigation menu and the search
+        suggestions (keyed on the `categories` version) all drop at once.
+        """
+        invalidate_namespace('categories')
+
         # 也清除統計快取，因為分類數量可能已改變
         from app.services.statistics_service import StatisticsService
         StatisticsService.clear_stats_cache()
+        
+        # 公開頁面（首頁、分類頁、文章頁）的整頁快取一併失效
+        from app.services.page_cache_service import PageCacheService
+        PageCacheService.clear_page_cache()
 
     @staticmethod
     def get_or_create_default_category() -> Category:
@@ -94,3 +100,120 @@ class CategoryService:
             CategoryService.clear_category_cache()
                 
         return default_category
+
+    @staticmethod
+    def delete_category(category: Category) -> int:
+        """Delete a category, moving its posts to 'Uncategorized' in bulk
+
+        Posts are reassigned with a single UPDATE in the same transaction
+        as the delete, so no Post objects are loaded and no per-row
+        flush events run. What those events would have done is done here
+        once: the UPDATE also sets `updated_at` (post ETags, sitemap
+        lastmod), the sitemap gets a snapshot of each moved post, the
+        counters move with the posts, and after commit the `posts`,
+        `categories`, `stats` and `pages` namespaces are invalidated once.
+        The search index holds no category data and is left as is.
+
+        Args:
+            category: Category to delete (must not be the default category)
+
+        Returns:
+            int: Number of posts moved to 'Uncategorized'
+
+        Raises:
+            ValueError: If the category is the default one or the default
+                category does not exist
+        """
+        from app import db
+        from app.models import Post
+        from app.services.sitemap_service import SitemapService
+
+        if category.is_default_category:
+            raise ValueError('無法刪除預設分類 "Uncategorized"！')
+        uncategorized = Category.query.filter_by(slug='uncategorized').first()
+        if uncategorized is None:
+            raise ValueError('找不到預設分類 "Uncategorized"！')
+
+        try:
+            published, total = db.session.query(
+                func.count(case((Post.status == 'published', 1))),
+                func.count(Post.id),
+            ).filter(Post.category_id == category.id).one()
+
+            moved = 0
+            if total:
+                now = datetime.now(timezone.utc)
+                # 批次 UPDATE 不觸發 mapper 事件：網站地圖快照由此補記，提交後套用
+                sitemap_changes = db.session.info.setdefault('sitemap_changes', {})
+                for row in db.session.query(Post.id, Post.slug, Post.status, Post.created_at).filter(
+                    Post.category_id == category.id
+                ):
+                    sitemap_changes[row.id] = SitemapService.post_snapshot(
+                        SimpleNamespace(**row._asdict(), updated_at=now)
+                    )
+                moved = db.session.execute(
+                    update(Post)
+                    .where(Post.category_id == category.id)
+                    .values(category_id=uncategorized.id, updated_at=now)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                # 提交後失效由文章衍生的快取（見 app.models.clear_post_caches_after_commit）
+                db.session.info['post_caches_changed'] = True
+                db.session.execute(
+                    update(Category)
+                    .where(Category.id == uncategorized.id)
+                    .values(
+                        published_count=Category.published_count + published,
+                        total_count=Category.total_count + total,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+            db.session.delete(category)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if not total:
+            # 有文章移動時，提交後已一併失效 posts、categories、stats、pages
+            CategoryService.clear_category_cache()
+        return moved
+
+    @staticmethod
+    def check_post_counts(fix: bool = False) -> List[Tuple[Category, int, int, int, int]]:
+        """Compare the stored post counters with the actual post rows
+
+        Args:
+            fix: Overwrite mismatched counters with the actual values and commit
+
+        Returns:
+            List of (category, stored_published, actual_published,
+            stored_total, actual_total) for every mismatched category
+        """
+        from app import db
+        from app.models import Post
+        from sqlalchemy import case, func
+
+        actual = dict(
+            (row.category_id, (row.published, row.total))
+            for row in db.session.query(
+                Post.category_id,
+                func.count(case((Post.status == 'published', 1))).label('published'),
+                func.count(Post.id).label('total'),
+            ).group_by(Post.category_id)
+        )
+
+        mismatches = []
+        for category in Category.query.order_by(Category.id):
+            published, total = actual.get(category.id, (0, 0))
+            if (category.published_count, category.total_count) != (published, total):
+                mismatches.append((category, category.published_count, published, category.total_count, total))
+                if fix:
+                    category.published_count = published
+                    category.total_count = total
+
+        if fix and mismatches:
+            db.session.commit()
+            CategoryService.clear_category_cache()
+        return mismatches
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Page Cache Service
+
+Full-page response cache for anonymous visitors of the public `main` blueprint
+"""
+import hashlib
+from typing import Optional
+from urllib.parse import urlencode
+
+from flask import current_app, g, request, session, Response
+from flask_login import current_user
+from app import cache
+from app.cache_namespaces import invalidate_namespace, namespaced_key
+from app.compression import build_gzip_segments
+
+
+# Validator headers replayed on cache hits so conditional requests still get a 304
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+# Query parameters that change a public page; anything else is ignored so
+# `?x=1`, `?x=2`, ... cannot fill the cache with copies of the same page
+CACHE_KEY_ARGS = ('page', 'before', 'after', 'q')
+# Endpoints answered from in-process structures; a cache lookup would only add latency
+UNCACHED_ENDPOINTS = frozenset({'main.search_suggest'})
+
+
+class PageCacheService:
+    """Service for caching rendered public pages"""
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Check if the page cache is enabled for the current app
+
+        Cached bodies must not contain a real nonce, so the cache requires
+        templates to render the CSP nonce placeholder.
+        """
+        return bool(current_app.config.get('PAGE_CACHE_ENABLED', False)
+                    and current_app.config.get('CSP_NONCE_PLACEHOLDER'))
+
+    @staticmethod
+    def make_key() -> str:
+        """Build the cache key from host, path and the relevant query parameters
+
+        Only CACHE_KEY_ARGS are kept (first value, empty values dropped), so
+        `?b=2&page=1`, `?page=1&utm_source=x` and `?page=1&q=` share one entry.
+        """
+        args = [(name, request.args.get(name)) for name in CACHE_KEY_ARGS if request.args.get(name)]
+        raw = f'{request.host}{request.path}?{urlencode(args)}'
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return namespaced_key('pages', digest)
+
+    @staticmethod
+    def is_cacheable_request() -> bool:
+        """Only anonymous GET/HEAD requests without pending flashes are cached"""
+        if not PageCacheService.is_enabled():
+            return False
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if request.endpoint in UNCACHED_ENDPOINTS:
+            return False
+        if current_user.is_authenticated:
+            return False
+        if '_flashes' in session:
+            return False
+        return True
+
+    @staticmethod
+    def serve_cached_page() -> Optional[Response]:
+        """Return a cached response for the current request, if any
+
+        Called from the blueprint's before_request hook. On a miss the key
+        is remembered on `g` so the after_request hook can store the page.
+        """
+        g.page_cache_key = None
+        if not PageCacheService.is_cacheable_request():
+            return None
+
+        key = PageCacheService.make_key()
+        entry = cache.get(key)
+        if entry is None:
+            if request.method == 'GET':
+                g.page_cache_key = key
+            return None
+
+        # 快取內容保存的是 nonce 佔位符，由 set_security_headers 換上本次請求的 nonce
+        response = Response(entry['body'], status=200, content_type=entry['content_type'])
+        for header, value in entry.get('headers', ()):
+            response.headers[header] = value
+        # 預先壓縮的 gzip 段落，壓縮階段只需插入 nonce 即可重用
+        g.gzip_segments = entry.get('gzip_segments')
+        response.headers['X-Cache'] = 'HIT'
+        # 保存的 ETag / Last-Modified 仍有效（內容異動時整個快取世代失效）
+        return response.make_conditional(request)
+
+    @staticmethod
+    def store_page(response: Response) -> Response:
+        """Store a freshly rendered page in the cache (after_request hook)"""
+        key = getattr(g, 'page_cache_key', None)
+        if not key:
+            return response
+        if response.status_code != 200 or response.mimetype != 'text/html':
+            return response
+        if response.is_streamed or response.direct_passthrough:
+            return response
+        if 'Set-Cookie' in response.headers or session.modified:
+            return response
+
+        # 藍圖的 after_request 先於應用程式層級執行，此時 body 仍是佔位符
+        body = response.get_data()
+        entry = {
+            'body': body,
+            'content_type': response.content_type,
+            'headers': [
+                (header, response.headers[header])
+                for header in CACHED_HEADERS if header in response.headers
+            ],
+        }
+        if current_app.config.get('COMPRESSION_ENABLED', False):
+            placeholder = current_app.config['CSP_NONCE_PLACEHOLDER'].encode('ascii')
+            entry['gzip_segments'] = build_gzip_segments(body, placeholder)
+
+        cache.set(key, entry, timeout=current_app.config.get('PAGE_CACHE_TIMEOUT', 300))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    @staticmethod
+    def clear_page_cache():
+        """Invalidate every cached page by bumping the `pages` namespace"""
+        invalidate_namespace('pages')
@@ -10,7 +10,6 @@ from flask_login import current_user
 from sqlalchemy.exc import IntegrityError
 from app.models import Post, db
 from app.services.category_service import CategoryService
-from app.services.statistics_service import StatisticsService
 
 
 class PostService:
@@ -43,6 +42,7 @@ class PostService:
             thumbnail=form_data.get('thumbnail'),
             description=form_data.get('description'),
             content=form_data.get('content', ''),
+            content_format=form_data.get('content_format') or 'html',
             category_id=category_id,
             status=status,
             author_id=current_user.id
@@ -59,10 +59,7 @@ class PostService:
         try:
             db.session.commit()
             current_app.logger.info(f"文章建立成功：ID={post.id}, 標題={post.title}, 狀態={status}")
-            
-            # 清除快取
-            CategoryService.clear_category_cache()
-            StatisticsService.clear_stats_cache()
+            # 快取於提交後由 app.models.clear_post_caches_after_commit 失效
         
             return {
                 'success': True,
@@ -126,6 +123,7 @@ class PostService:
         post.thumbnail = form_data.get('thumbnail')
         post.description = form_data.get('description')
         post.content = form_data.get('content', '')
+        post.content_format = form_data.get('content_format') or 'html'
         post.category_id = category_id
         
         current_app.logger.info(f"更新文章 {post.id}：狀態={post.status}")
@@ -133,10 +131,7 @@ class PostService:
         try:
             db.session.commit()
             current_app.logger.info(f"文章更新成功：ID={post.id}, 標題={post.title}, 狀態={post.status}")
-            
-            # 清除快取
-            CategoryService.clear_category_cache()
-            StatisticsService.clear_stats_cache()
+            # 快取於提交後由 app.models.clear_post_caches_after_commit 失效
             
             return {
                 'success': True,
@@ -180,10 +175,7 @@ class PostService:
             post_id = post.id
             db.session.delete(post)
             db.session.commit()
-            
-            # 清除快取
-            CategoryService.clear_category_cache()
-            StatisticsService.clear_stats_cache()
+            # 快取於提交後由 app.models.clear_post_caches_after_commit 失效
             
             current_app.logger.info(f"文章 {post_id} 由使用者 {current_user.id} 刪除")
             
@@ -201,6 +193,38 @@ class PostService:
                 'message': f'刪除失敗：{str(e)}'
             }
     
+    @staticmethod
+    def rerender_posts(only_missing: bool = False, batch_size: int = 200) -> int:
+        """重新產生文章的渲染結果（rendered_html、目錄、字數、閱讀時間）
+
+        用於補上既有文章的渲染欄位，或渲染規則變更後全部重算。
+        渲染結果未改變的文章不會寫入資料庫。
+
+        參數:
+            only_missing: 只處理尚未渲染（rendered_html 為空）的文章
+            batch_size: 每批載入並提交的文章數
+
+        回傳:
+            實際更新的文章數
+        """
+        from app.rendering import render_post
+
+        query = db.session.query(Post.id).order_by(Post.id)
+        if only_missing:
+            query = query.filter(Post.rendered_html.is_(None))
+        post_ids = [row.id for row in query]
+
+        updated = 0
+        for start in range(0, len(post_ids), batch_size):
+            batch = Post.query.filter(Post.id.in_(post_ids[start:start + batch_size])).all()
+            for post in batch:
+                render_post(post)
+            updated += sum(1 for post in batch if db.session.is_modified(post))
+            db.session.commit()
+
+        current_app.logger.info(f"重新渲染文章：{updated}/{len(post_ids)} 篇已更新")
+        return updated
+
     @staticmethod
     def check_post_permission(post: Post, user) -> bool:
         """Check if user has permission to modify post
@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+"""
+Search Service
+
+Full-text search over published posts (title, description and content)
+
+The index lives next to the `posts` table and is maintained by the Post
+flush listeners on the same connection, so it commits or rolls back with
+the post itself:
+
+- SQLite: an FTS5 virtual table `posts_fts` (rowid = post id), ranked with bm25
+- PostgreSQL: a `posts_search` table holding a weighted tsvector behind a
+  GIN index, ranked with ts_rank_cd
+
+Text is pre-tokenized before indexing and querying: CJK runs are split
+into overlapping bigrams (neither FTS5's unicode61 nor Postgres' simple
+parser segments Chinese), everything else is lowercased as is.
+
+With SEARCH_BACKEND = 'memory' (single-node SQLite without FTS5) the
+database index is not used at all: searches run against an in-process
+inverted index (app.search_index) persisted in the instance directory,
+and committed post changes are applied to it incrementally. The FTS5
+table is then never created, and on SQLite builds without FTS5 the
+database index is skipped (searches return nothing) instead of failing
+`db.create_all()` or `flask search reindex`.
+"""
+import math
+import os
+import re
+import threading
+import weakref
+from contextlib import contextmanager
+from html import unescape
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import inspect as sa_inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+from app.rendering import CJK_RANGES
+from app.search_index import MemorySearchIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows：僅單一程序開發時使用，不需要跨程序鎖
+    fcntl = None
+
+
+SQLITE_TABLE = 'posts_fts'
+POSTGRES_TABLE = 'posts_search'
+# Relative weight of title, description and body matches
+SQLITE_WEIGHTS = (10.0, 5.0, 1.0)
+MAX_QUERY_TOKENS = 16
+
+_CJK_RUN = re.compile(f'[{CJK_RANGES}]+')
+_TOKEN = re.compile(f'[{CJK_RANGES}]+|[^\\W_]+')
+_TAG = re.compile(r'<[^>]+>')
+
+# Engines on which the index table is known to exist (checked once per engine)
+_index_ready = weakref.WeakKeyDictionary()
+# SQLite engines and whether their build includes FTS5 (checked once per engine)
+_fts5_support = weakref.WeakKeyDictionary()
+# Serializes loading the in-memory index within one process
+_memory_index_lock = threading.Lock()
+MEMORY_INDEX_FILENAME = 'index.bin.gz'
+
+
+def _cjk_bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def search_tokens(value: Optional[str]) -> List[str]:
+    """Split text into index tokens (lowercased words, CJK bigrams)"""
+    tokens = []
+    for token in _TOKEN.findall((value or '').lower()):
+        if _CJK_RUN.fullmatch(token):
+            tokens.extend(_cjk_bigrams(token))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def search_text(value: Optional[str]) -> str:
+    """Pre-tokenized text stored in the index"""
+    return ' '.join(search_tokens(value))
+
+
+def sqlite_has_fts5(connection) -> bool:
+    """Whether the SQLite library behind the connection was built with FTS5"""
+    try:
+        return connection.execute(text("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")).first() is not None
+    except DBAPIError:
+        # 較舊或未啟用 introspection pragma 的 SQLite：改看編譯選項
+        options = {row[0] for row in connection.execute(text('PRAGMA compile_options'))}
+        return 'ENABLE_FTS5' in options
+
+
+def html_to_text(html: Optional[str]) -> str:
+    """Plain text of rendered post HTML"""
+    return unescape(_TAG.sub(' ', html or ''))
+
+
+class SearchResults:
+    """One page of search results
+
+    Mirrors the attributes of Flask-SQLAlchemy's Pagination that the
+    templates and `_pagination_urls` use.
+    """
+
+    def __init__(self, items, total: int, page: int, per_page: int):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.pages = max(1, math.ceil(total / per_page)) if per_page else 1
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+
+class SearchService:
+    """Service for maintaining and querying the full-text search index"""
+
+    @staticmethod
+    def backend(connection) -> Optional[str]:
+        """'sqlite' (with FTS5) or 'postgresql' when the database is supported, else None"""
+        name = connection.dialect.name
+        if name == 'sqlite':
+            return name if SearchService.sqlite_has_fts5(connection) else None
+        return name if name == 'postgresql' else None
+
+    @staticmethod
+    def sqlite_has_fts5(connection) -> bool:
+        """Check (once per engine) whether the SQLite build provides FTS5"""
+        engine = connection.engine
+        supported = _fts5_support.get(engine)
+        if supported is None:
+            supported = sqlite_has_fts5(connection)
+            _fts5_support[engine] = supported
+            if not supported:
+                current_app.logger.warning('SQLite has no FTS5; the database search index is disabled '
+                                           '(set SEARCH_BACKEND=memory)')
+        return supported
+
+    @staticmethod
+    def create_index(connection) -> None:
+        """Create the index table for the connection's dialect (idempotent)
+
+        Skipped with the memory backend and on SQLite builds without FTS5.
+        """
+        if has_app_context() and SearchService.uses_memory_index():
+            return
+        backend = SearchService.backend(connection)
+        if backend == 'sqlite':
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} "
+                f"USING fts5(title, description, body, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+        elif backend == 'postgresql':
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+                f"post_id INTEGER PRIMARY KEY REFERENCES posts (id) ON DELETE CASCADE, "
+                f"document TSVECTOR NOT NULL)"
+            ))
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{POSTGRES_TABLE}_document "
+                f"ON {POSTGRES_TABLE} USING GIN (document)"
+            ))
+        if backend:
+            _index_ready[connection.engine] = True
+
+    @staticmethod
+    def drop_index(connection) -> None:
+        """Drop the index table"""
+        backend = SearchService.backend(connection)
+        if backend:
+            table = SQLITE_TABLE if backend == 'sqlite' else POSTGRES_TABLE
+            connection.execute(text(f'DROP TABLE IF EXISTS {table}'))
+            _index_ready[connection.engine] = False
+
+    @staticmethod
+    def is_ready(connection) -> bool:
+        """Check (once per engine) that the index table exists"""
+        engine = connection.engine
+        ready = _index_ready.get(engine)
+        if ready is None:
+            backend = SearchService.backend(connection)
+            table = SQLITE_TABLE if backend == 'sqlite' else POSTGRES_TABLE
+            ready = bool(backend) and sa_inspect(connection).has_table(table)
+            _index_ready[engine] = ready
+            if backend and not ready:
+                current_app.logger.warning('Search index missing, run `flask search reindex` after migrating')
+        return ready
+
+    @staticmethod
+    def index_post(connection, post_id: int, title: str, description: str, body_html: str) -> None:
+        """Insert or replace one post's index entry"""
+        if not SearchService.is_ready(connection):
+            return
+        params = {
+            'id': post_id,
+            'title': search_text(title),
+            'description': search_text(description),
+            'body': search_text(html_to_text(body_html)),
+        }
+        if SearchService.backend(connection) == 'sqlite':
+            connection.execute(text(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = :id'), params)
+            connection.execute(text(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, description, body) '
+                f'VALUES (:id, :title, :description, :body)'
+            ), params)
+        else:
+            connection.execute(text(
+                f"INSERT INTO {POSTGRES_TABLE} (post_id, document) VALUES (:id, "
+                f"setweight(to_tsvector('simple', :title), 'A') || "
+                f"setweight(to_tsvector('simple', :description), 'B') || "
+                f"setweight(to_tsvector('simple', :body), 'C')) "
+                f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document"
+            ), params)
+
+    @staticmethod
+    def remove_post(connection, post_id: int) -> None:
+        """Remove one post from the index"""
+        if not SearchService.is_ready(connection):
+            return
+        if SearchService.backend(connection) == 'sqlite':
+            connection.execute(text(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = :id'), {'id': post_id})
+        else:
+            connection.execute(text(f'DELETE FROM {POSTGRES_TABLE} WHERE post_id = :id'), {'id': post_id})
+
+    # ---- In-memory index (SEARCH_BACKEND = 'memory') ----
+
+    @staticmethod
+    def uses_memory_index() -> bool:
+        """Check if searches use the in-process index instead of the database"""
+        return current_app.config.get('SEARCH_BACKEND', 'database') == 'memory'
+
+    @staticmethod
+    def memory_index_path() -> str:
+        """File holding the persisted in-memory index"""
+        directory = current_app.config.get('SEARCH_INDEX_DIR') or os.path.join(current_app.instance_path, 'search')
+        return os.path.join(directory, MEMORY_INDEX_FILENAME)
+
+    @staticmethod
+    @contextmanager
+    def _locked():
+        """Serialize index file writers across worker processes"""
+        directory = os.path.dirname(SearchService.memory_index_path())
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def document_scores(title: str, description: str, body_html: str):
+        """Weighted token scores of one post for the in-memory index"""
+        return MemorySearchIndex.score_tokens(
+            search_tokens(title), search_tokens(description), search_tokens(html_to_text(body_html))
+        )
+
+    @staticmethod
+    def build_memory_index() -> MemorySearchIndex:
+        """Build the in-memory index from the published posts"""
+        from app.models import Post
+
+        index = MemorySearchIndex()
+        query = db.session.query(
+            Post.id, Post.title, Post.description, Post.rendered_html, Post.content
+        ).filter(Post.status == 'published').order_by(Post.id)
+        for row in query.yield_per(500):
+            index.add(row.id, SearchService.document_scores(
+                row.title, row.description, row.rendered_html or row.content
+            ))
+        return index
+
+    @staticmethod
+    def get_memory_index() -> MemorySearchIndex:
+        """Return this process's index, loading or building it on first use
+
+        The persisted snapshot is reused on worker startup; entries other
+        workers appended to the journal are replayed, and a snapshot
+        rewritten since it was loaded is reloaded.
+        """
+        path = SearchService.memory_index_path()
+        index = current_app.extensions.get('search_index')
+        if index is not None and index.refresh(path):
+            return index
+
+        with _memory_index_lock:
+            index = current_app.extensions.get('search_index')
+            if index is not None and index.refresh(path):
+                return index
+            if index is not None and not os.path.exists(path):
+                # 索引檔被刪除：以記憶體中的版本重新寫入，不必查詢資料庫
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                index.save(path)
+                return index
+
+            index = None
+            if os.path.exists(path):
+                try:
+                    index = MemorySearchIndex.load(path)
+                except (OSError, ValueError) as e:
+                    current_app.logger.warning(f'Search index file unusable, rebuilding: {e}')
+            if index is None:
+                # 同時建立的 worker 會得到相同結果，原子取代即可，不需跨程序鎖
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                index = SearchService.build_memory_index()
+                index.save(path)
+                current_app.logger.info(f'In-memory search index built: {len(index)} posts')
+            current_app.extensions['search_index'] = index
+        return index
+
+    @staticmethod
+    def apply_memory_changes(changes: Dict[int, Optional[Tuple[str, str, str]]]) -> None:
+        """Apply committed post changes to the in-memory index and journal them
+
+        Args:
+            changes: post id -> (title, description, body_html), or None to remove
+        """
+        path = SearchService.memory_index_path()
+        if 'search_index' not in current_app.extensions and not os.path.exists(path):
+            # 索引尚未建立：第一次搜尋時會由已提交的資料建立，不必在此
+            # （after_commit 中無法再查詢資料庫）
+            return
+        scores = {
+            post_id: None if document is None else dict(SearchService.document_scores(*document))
+            for post_id, document in changes.items()
+        }
+        with SearchService._locked():
+            # 先同步其他 worker 寫入的版本，避免覆蓋它們的更新
+            SearchService.get_memory_index().append_journal(path, scores)
+
+    @staticmethod
+    def search(query: str, page: int = 1, per_page: int = 10) -> SearchResults:
+        """Ranked, paginated search over published posts
+
+        Every token must match (AND); title matches rank above description
+        matches, which rank above body matches.
+        """
+        page = max(page, 1)
+        tokens = search_tokens(query)[:MAX_QUERY_TOKENS]
+        if not tokens:
+            return SearchResults([], 0, page, per_page)
+
+        if SearchService.uses_memory_index():
+            ids, total = SearchService.get_memory_index().search(tokens, (page - 1) * per_page, per_page)
+            return SearchResults(SearchService._load_posts(ids), total, page, per_page)
+
+        connection = db.session.connection()
+        if not SearchService.is_ready(connection):
+            return SearchResults([], 0, page, per_page)
+
+        params = {'limit': per_page, 'offset': (page - 1) * per_page}
+        if SearchService.backend(connection) == 'sqlite':
+            params['q'] = ' '.join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+            weights = ', '.join(str(w) for w in SQLITE_WEIGHTS)
+            total = db.session.execute(text(
+                f'SELECT count(*) FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH :q'
+            ), params).scalar()
+            rows = db.session.execute(text(
+                f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH :q '
+                f'ORDER BY bm25({SQLITE_TABLE}, {weights}) LIMIT :limit OFFSET :offset'
+            ), params)
+        else:
+            params['q'] = ' '.join(tokens)
+            total = db.session.execute(text(
+                f"SELECT count(*) FROM {POSTGRES_TABLE} WHERE document @@ plainto_tsquery('simple', :q)"
+            ), params).scalar()
+            rows = db.session.execute(text(
+                f"SELECT post_id FROM {POSTGRES_TABLE}, plainto_tsquery('simple', :q) AS query "
+                f"WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC, post_id DESC "
+                f"LIMIT :limit OFFSET :offset"
+            ), params)
+
+        ids = [row[0] for row in rows]
+        return SearchResults(SearchService._load_posts(ids), total or 0, page, per_page)
+
+    @staticmethod
+    def _load_posts(ids: List[int]) -> list:
+        """Load listing columns of the matched posts, keeping the ranked order"""
+        from app.models import Post
+
+        if not ids:
+            return []
+        posts = {
+            post.id: post
+            for post in Post.query.options(*Post.listing_options())
+            .filter(Post.id.in_(ids), Post.status == 'published')
+        }
+        return [posts[i] for i in ids if i in posts]
+
+    @staticmethod
+    def reindex(batch_size: int = 200) -> int:
+        """Rebuild the whole index from the published posts
+
+        Returns:
+            int: Number of posts indexed
+        """
+        from app.models import Post
+
+        if SearchService.uses_memory_index():
+            with SearchService._locked():
+                index = SearchService.build_memory_index()
+                index.save(SearchService.memory_index_path())
+            current_app.extensions['search_index'] = index
+            return len(index)
+
+        connection = db.session.connection()
+        SearchService.create_index(connection)
+        if SearchService.backend(connection) == 'sqlite':
+            connection.execute(text(f'DELETE FROM {SQLITE_TABLE}'))
+        elif SearchService.backend(connection) == 'postgresql':
+            connection.execute(text(f'DELETE FROM {POSTGRES_TABLE}'))
+        else:
+            return 0
+
+        count = 0
+        query = db.session.query(
+            Post.id, Post.title, Post.description, Post.rendered_html, Post.content
+        ).filter(Post.status == 'published').order_by(Post.id)
+        for row in query.yield_per(batch_size):
+            SearchService.index_post(connection, row.id, row.title, row.description, row.rendered_html or row.content)
+            count += 1
+        db.session.commit()
+        current_app.logger.info(f'Search index rebuilt: {count} posts')
+        return count
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Sitemap Service
+
+Maintains a precomputed sitemap in the instance directory
+
+The sitemap is kept as a JSON state file (one entry per published post)
+plus the rendered XML artifacts: `sitemap.xml` (a urlset, or a sitemap
+index once SITEMAP_MAX_URLS is exceeded), `sitemap-<n>.xml` shards and a
+`.gz` variant of each. Post listeners record changes during the flush and
+`apply_changes()` updates the state after the transaction commits, so
+crawler hits never touch the database.
+
+Links are built from SITEMAP_BASE_URL (or SERVER_NAME), never from the
+Host header of the request that happened to trigger a write; without
+either setting the precomputed sitemap is disabled and `/sitemap.xml`
+is rendered per request.
+
+Each commit still reads and rewrites the JSON state, which is O(posts)
+(roughly 150 bytes per post). Only the shards whose URLs changed are
+re-rendered and written, plus the index and the first shard when the
+static pages' lastmod moves.
+"""
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from flask import current_app, url_for
+from sqlalchemy.orm import load_only
+
+try:
+    import fcntl
+except ImportError:  # Windows：僅單一程序開發時使用，不需要跨程序鎖
+    fcntl = None
+
+
+STATE_FILENAME = 'entries.json'
+LOCK_FILENAME = '.lock'
+ARTIFACT_PREFIX = 'sitemap'
+
+
+class SitemapService:
+    """Service for building and serving the precomputed sitemap"""
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Check if the precomputed sitemap is enabled and has a configured base URL"""
+        return bool(current_app.config.get('SITEMAP_PRECOMPUTED', False)) and SitemapService.base_url() is not None
+
+    @staticmethod
+    def get_directory() -> str:
+        """Directory holding the sitemap state and artifacts"""
+        return current_app.config.get('SITEMAP_DIR') or os.path.join(current_app.instance_path, 'sitemap')
+
+    @staticmethod
+    def artifact_path(filename: str) -> Optional[str]:
+        """Resolve a served filename to its artifact path, if it exists
+
+        Args:
+            filename: `sitemap.xml`, `sitemap-<n>.xml` or their `.gz` variants
+        """
+        path = os.path.join(SitemapService.get_directory(), filename)
+        return path if os.path.isfile(path) else None
+
+    @staticmethod
+    @contextmanager
+    def _locked():
+        """Serialize writers across worker processes"""
+        directory = SitemapService.get_directory()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, LOCK_FILENAME), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield directory
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def base_url() -> Optional[str]:
+        """Configured base URL for absolute sitemap links
+
+        SITEMAP_BASE_URL wins, then SERVER_NAME with PREFERRED_URL_SCHEME.
+        The request host is deliberately not used: the artifacts are
+        persisted, so a forged Host header would poison them.
+        """
+        base_url = current_app.config.get('SITEMAP_BASE_URL')
+        if base_url:
+            return base_url
+        server_name = current_app.config.get('SERVER_NAME')
+        if server_name:
+            scheme = current_app.config.get('PREFERRED_URL_SCHEME', 'http')
+            root = current_app.config.get('APPLICATION_ROOT') or '/'
+            return f'{scheme}://{server_name}{root}'
+        return None
+
+    @staticmethod
+    def _base_url() -> str:
+        base_url = SitemapService.base_url()
+        if base_url is None:
+            raise RuntimeError('SITEMAP_BASE_URL (or SERVER_NAME) must be set to build the precomputed sitemap')
+        return base_url
+
+    @staticmethod
+    def post_snapshot(post) -> Dict:
+        """Capture the fields the sitemap needs from a Post
+
+        Called from the flush listeners, where the database must not be
+        queried again; the snapshot is applied after commit.
+        """
+        lastmod = post.updated_at or post.created_at
+        return {
+            'id': post.id,
+            'slug': post.slug or f'untitled-{post.id}',
+            'lastmod': lastmod.date().isoformat() if lastmod else None,
+            'published': post.status == 'published',
+            'changefreq': getattr(post, 'changefreq', 'monthly'),
+            'priority': getattr(post, 'priority', '0.8'),
+        }
+
+    @staticmethod
+    def _entries_from_snapshots(snapshots: Iterable[Dict]) -> Dict[str, Dict]:
+        """Turn post snapshots into sitemap entries keyed by post id"""
+        entries = {}
+        with current_app.test_request_context(base_url=SitemapService._base_url()):
+            for snapshot in snapshots:
+                entries[str(snapshot['id'])] = {
+                    'loc': url_for('main.post', slug=snapshot['slug'], _external=True),
+                    'lastmod': snapshot['lastmod'],
+                    'changefreq': snapshot['changefreq'],
+                    'priority': snapshot['priority'],
+                }
+        return entries
+
+    @staticmethod
+    def _static_pages(lastmod: Optional[str]) -> List[Dict]:
+        """Entries for SITEMAP_STATIC_ROUTES
+
+        Their lastmod follows the newest post, since that is when listing
+        pages last changed.
+        """
+        pages = []
+        with current_app.test_request_context(base_url=SitemapService._base_url()):
+            for endpoint in current_app.config.get('SITEMAP_STATIC_ROUTES', ['main.index']):
+                try:
+                    loc = url_for(endpoint, _external=True)
+                except Exception as e:
+                    current_app.logger.warning(f"無法為 {endpoint} 生成 URL：{e}")
+                    continue
+                pages.append({
+                    'loc': loc,
+                    'lastmod': lastmod or date.today().isoformat(),
+                    'changefreq': 'daily',
+                    'priority': '1.0',
+                })
+        return pages
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        """Write a file through a temporary sibling and os.replace"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _render(template: str, **context) -> bytes:
+        """Render an XML template without running context processors"""
+        return ''.join(current_app.jinja_env.get_template(template).generate(**context)).encode('utf-8')
+
+    @staticmethod
+    def _write_xml(directory: str, filename: str, xml: bytes, gz_xml: Optional[bytes] = None) -> str:
+        """Write one XML artifact and its .gz variant
+
+        Args:
+            gz_xml: Content of the .gz variant when it differs (sitemap index
+                pointing at .xml.gz shards); defaults to `xml`
+        """
+        SitemapService._write_atomic(os.path.join(directory, filename), xml)
+        SitemapService._write_atomic(
+            os.path.join(directory, filename + '.gz'), gzip.compress(gz_xml or xml, mtime=0)
+        )
+        return filename
+
+    @staticmethod
+    def _newest_lastmod(entries: Dict[str, Dict]) -> Optional[str]:
+        return max((e['lastmod'] for e in entries.values() if e['lastmod']), default=None)
+
+    @staticmethod
+    def _shard_unchanged(directory: str, filename: str, keys: List[str], entries: Dict[str, Dict],
+                         previous: Dict[str, Dict], previous_keys: List[str], start: int, stop: int) -> bool:
+        """Whether shard `filename` (post positions start:stop) can be kept as written"""
+        if not (os.path.isfile(os.path.join(directory, filename))
+                and os.path.isfile(os.path.join(directory, filename + '.gz'))):
+            return False
+        if keys[start:stop] != previous_keys[start:stop]:
+            return False
+        return all(entries[key] == previous[key] for key in keys[start:stop])
+
+    @staticmethod
+    def _write_artifacts(directory: str, entries: Dict[str, Dict],
+                         previous: Optional[Dict[str, Dict]] = None) -> List[str]:
+        """Render the artifacts from the entry state and drop stale shards
+
+        Args:
+            previous: Entry state the current artifacts were rendered from.
+                When given, shards whose URLs are unchanged are not rewritten.
+        """
+        keys = sorted(entries, key=int)
+        posts = [entries[key] for key in keys]
+        lastmod = SitemapService._newest_lastmod(entries)
+        static_pages = SitemapService._static_pages(lastmod)
+        pages = static_pages + posts
+        max_urls = current_app.config.get('SITEMAP_MAX_URLS', 50000)
+        if previous is not None:
+            previous_keys = sorted(previous, key=int)
+            static_unchanged = SitemapService._newest_lastmod(previous) == lastmod
+
+        written = []
+        render = SitemapService._render
+        if len(pages) <= max_urls:
+            written.append(SitemapService._write_xml(
+                directory, f'{ARTIFACT_PREFIX}.xml', render('sitemap.xml', pages=pages)
+            ))
+        else:
+            sitemaps, gz_sitemaps = [], []
+            with current_app.test_request_context(base_url=SitemapService._base_url()):
+                for shard, start in enumerate(range(0, len(pages), max_urls), start=1):
+                    chunk = pages[start:start + max_urls]
+                    filename = f'{ARTIFACT_PREFIX}-{shard}.xml'
+                    # 分片內的文章位置（扣除排在最前面的靜態頁面）
+                    post_start = max(start - len(static_pages), 0)
+                    post_stop = start + max_urls - len(static_pages)
+                    if (previous is not None
+                            and (start >= len(static_pages) or static_unchanged)
+                            and SitemapService._shard_unchanged(directory, filename, keys, entries,
+                                                                previous, previous_keys, post_start, post_stop)):
+                        written.append(filename)
+                    else:
+                        written.append(SitemapService._write_xml(
+                            directory, filename, render('sitemap.xml', pages=chunk)
+                        ))
+                    lastmod = max((p['lastmod'] for p in chunk if p['lastmod']), default=None)
+                    sitemaps.append({
+                        'loc': url_for('sitemap.sitemap_shard', shard=shard, _external=True),
+                        'lastmod': lastmod,
+                    })
+                    gz_sitemaps.append({
+                        'loc': url_for('sitemap.sitemap_shard_gz', shard=shard, _external=True),
+                        'lastmod': lastmod,
+                    })
+            written.append(SitemapService._write_xml(
+                directory, f'{ARTIFACT_PREFIX}.xml',
+                render('sitemap_index.xml', sitemaps=sitemaps),
+                render('sitemap_index.xml', sitemaps=gz_sitemaps),
+            ))
+
+        keep = set(written) | {f + '.gz' for f in written}
+        for name in os.listdir(directory):
+            if name.startswith(ARTIFACT_PREFIX) and name not in keep and not name.endswith('.tmp'):
+                os.remove(os.path.join(directory, name))
+        return written
+
+    @staticmethod
+    def rebuild() -> int:
+        """Rebuild the state and artifacts from the database
+
+        Returns:
+            int: Number of post entries written
+        """
+        from app.models import Post
+
+        query = Post.query.filter_by(status='published').options(
+            load_only(Post.id, Post.slug, Post.status, Post.updated_at, Post.created_at)
+        ).order_by(Post.id)
+        entries = SitemapService._entries_from_snapshots(
+            SitemapService.post_snapshot(post) for post in query.yield_per(500)
+        )
+
+        with SitemapService._locked() as directory:
+            SitemapService._write_state(directory, entries)
+            SitemapService._write_artifacts(directory, entries)
+        return len(entries)
+
+    @staticmethod
+    def _write_state(directory: str, entries: Dict[str, Dict]) -> None:
+        """Persist the entries with the shard size they were rendered with"""
+        state = {'max_urls': current_app.config.get('SITEMAP_MAX_URLS', 50000), 'entries': entries}
+        SitemapService._write_atomic(
+            os.path.join(directory, STATE_FILENAME), json.dumps(state, separators=(',', ':')).encode('utf-8')
+        )
+
+    @staticmethod
+    def apply_changes(snapshots: Iterable[Dict], deleted_ids: Iterable[int]) -> bool:
+        """Apply committed post changes to the state and re-render the XML
+
+        Runs after commit without touching the database. When no state
+        exists yet nothing is done; the next request rebuilds from scratch.
+        Only the shards containing changed URLs are rewritten.
+
+        Returns:
+            bool: True if the artifacts were updated
+        """
+        state_path = os.path.join(SitemapService.get_directory(), STATE_FILENAME)
+        if not os.path.isfile(state_path):
+            return False
+
+        snapshots = list(snapshots)
+        deleted = {str(post_id) for post_id in deleted_ids}
+        deleted.update(str(s['id']) for s in snapshots if not s['published'])
+        upserts = SitemapService._entries_from_snapshots(s for s in snapshots if s['published'])
+
+        with SitemapService._locked() as directory:
+            try:
+                with open(state_path, encoding='utf-8') as f:
+                    state = json.load(f)
+                previous = state['entries']
+            except (OSError, ValueError, KeyError, TypeError):
+                return False
+
+            entries = dict(previous)
+            for key in deleted:
+                entries.pop(key, None)
+            entries.update(upserts)
+
+            # 分片大小改變後，既有分片的範圍不再對應，全部重新產生
+            if state.get('max_urls') != current_app.config.get('SITEMAP_MAX_URLS', 50000):
+                previous = None
+            SitemapService._write_state(directory, entries)
+            SitemapService._write_artifacts(directory, entries, previous)
+        return True
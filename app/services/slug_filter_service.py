@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Slug Filter Service
+
+Short-circuits requests for post slugs that do not exist
+
+Scanners and broken backlinks request thousands of made-up `/<slug>/`
+paths. Each worker keeps a Bloom filter of every post slug (published
+and drafts) and `main.post` answers 404 without a post query when the
+filter says the slug is absent; about `SLUG_FILTER_ERROR_RATE` of the
+unknown slugs still reach the post query.
+
+The filter is rebuilt lazily when the `posts` cache namespace version
+changes (after every post insert, update or delete, see
+`app.cache_namespaces`), and a worker adds the slugs of its own commits
+right away. Another worker may not see the new version yet (per-worker
+caches, or the TieredCache poll interval), so a slug missing from the
+filter is not trusted blindly: the miss is checked once against the
+database, a slug found there is added to the filter, and a confirmed
+miss is remembered for `SLUG_FILTER_MISS_TTL` seconds. A post created
+by another worker is therefore never answered 404 for longer than that.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional
+
+from flask import current_app
+
+from app import db
+from app.cache_namespaces import namespace_version
+
+
+# Smallest filter capacity (about 1.2 KiB), so small blogs get the nominal error rate
+MIN_CAPACITY = 1024
+# Most confirmed misses remembered per worker (oldest dropped first)
+MAX_MISSES = 10000
+
+_misses_lock = threading.Lock()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str) -> Iterable[int]:
+        # Double hashing: position i is h1 + i * h2 (mod size)
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        bits = self.bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class SlugFilter(NamedTuple):
+    version: int
+    slugs: BloomFilter
+    # Slugs confirmed absent from the database -> time.monotonic() expiry
+    misses: 'OrderedDict[str, float]'
+
+
+class SlugFilterService:
+    """Service for rejecting unknown post slugs before the database"""
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(current_app.config.get('SLUG_FILTER_ENABLED', True))
+
+    @staticmethod
+    def build_filter(version: int) -> SlugFilter:
+        """Build the filter from every post slug"""
+        from app.models import Post
+
+        slugs = [slug for (slug,) in db.session.query(Post.slug)]
+        bloom = BloomFilter(max(len(slugs), MIN_CAPACITY), current_app.config.get('SLUG_FILTER_ERROR_RATE', 0.01))
+        for slug in slugs:
+            bloom.add(slug)
+        return SlugFilter(version, bloom, OrderedDict())
+
+    @staticmethod
+    def get_filter() -> SlugFilter:
+        """Return this process's filter, rebuilding it when the posts namespace changed"""
+        version = namespace_version('posts')
+        slug_filter = current_app.extensions.get('slug_filter')
+        if slug_filter is None or slug_filter.version != version:
+            slug_filter = SlugFilterService.build_filter(version)
+            current_app.extensions['slug_filter'] = slug_filter
+        return slug_filter
+
+    @staticmethod
+    def add_slugs(slugs: Iterable[str]) -> None:
+        """Add committed slugs to this process's filter without a rebuild"""
+        slug_filter: Optional[SlugFilter] = current_app.extensions.get('slug_filter')
+        if slug_filter is None:
+            return
+        with _misses_lock:
+            for slug in slugs:
+                slug_filter.slugs.add(slug)
+                slug_filter.misses.pop(slug, None)
+
+    @staticmethod
+    def might_exist(slug: str) -> bool:
+        """False only when no post had this slug within the last SLUG_FILTER_MISS_TTL seconds"""
+        from app.models import Post
+
+        if not SlugFilterService.is_enabled():
+            return True
+        slug_filter = SlugFilterService.get_filter()
+        if slug in slug_filter.slugs:
+            return True
+
+        now = time.monotonic()
+        expires = slug_filter.misses.get(slug)
+        if expires is not None and expires > now:
+            return False
+        # 其他 worker 新增的文章可能尚未反映在本程序的過濾器中
+        if db.session.query(Post.query.filter_by(slug=slug).exists()).scalar():
+            SlugFilterService.add_slugs([slug])
+            return True
+        with _misses_lock:
+            slug_filter.misses[slug] = now + current_app.config.get('SLUG_FILTER_MISS_TTL', 30)
+            slug_filter.misses.move_to_end(slug)
+            while len(slug_filter.misses) > MAX_MISSES:
+                slug_filter.misses.popitem(last=False)
+        return False
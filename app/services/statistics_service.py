@@ -5,20 +5,26 @@ Statistics Service
 Handles dashboard statistics and counts
 """
 from app.models import Post, Category
-from app import cache
+from app.cache_fetch import fetch
+from app.cache_namespaces import invalidate_namespace
 
 
 class StatisticsService:
     """Service for handling dashboard statistics"""
     
     @staticmethod
-    @cache.memoize(timeout=300, make_name=lambda fname: f'blog_stats_{fname}')  # 快取 5 分鐘
     def get_dashboard_stats():
         """Get dashboard statistics including post and category counts
+
+        Cached for 5 minutes; only one request recomputes when it expires.
         
         Returns:
             dict: Dictionary containing posts_count, drafts_count, categories_count
         """
+        return fetch('stats', 'dashboard_stats', StatisticsService._compute_dashboard_stats, timeout=300)
+
+    @staticmethod
+    def _compute_dashboard_stats():
         return {
             'posts_count': Post.query.filter_by(status='published').count(),
             'drafts_count': Post.query.filter_by(status='draft').count(),
@@ -28,4 +34,4 @@ class StatisticsService:
     @staticmethod
     def clear_stats_cache():
         """Clear statistics cache"""
-        cache.delete_memoized(StatisticsService.get_dashboard_stats)
\ No newline at end of file
+        invalidate_namespace('stats')
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Suggest Service
+
+Search-as-you-type suggestions over published post titles and category names
+
+Suggestions are answered from an in-process prefix index without touching
+the database: every title is indexed under the suffixes starting at its
+words (and at each CJK character, since Chinese titles have no spaces),
+kept in one sorted list and searched with bisect. A lookup is a binary
+search plus a scan bounded by `limit * MAX_KEYS_PER_ENTRY` entries.
+
+The index is rebuilt lazily when its version changes. The version is
+made of the `posts` and `categories` cache namespace versions (see
+`app.cache_namespaces`), so every worker rebuilds after posts or
+categories change.
+"""
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import List, NamedTuple, Optional, Tuple
+
+from flask import current_app, url_for
+
+from app import db
+from app.cache_namespaces import namespace_version
+from app.rendering import CJK_RANGES
+
+
+MAX_SUGGESTIONS = 8
+# Suffixes indexed per title, and the indexed length of each suffix
+MAX_KEYS_PER_ENTRY = 12
+MAX_KEY_LENGTH = 32
+
+# A CJK character, or a letter/digit not preceded by a non-CJK letter/digit
+_WORD_START = re.compile(f'[{CJK_RANGES}]|(?<![^\\W_{CJK_RANGES}])[^\\W_]')
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+class Suggestion(NamedTuple):
+    kind: str  # 'category' or 'post'
+    title: str
+    slug: str
+
+
+def normalize(value: Optional[str]) -> str:
+    """Case- and width-insensitive form used for keys and queries
+
+    Punctuation counts as a word separator, so `post-1` matches "Post 1".
+    """
+    value = unicodedata.normalize('NFKC', value or '').casefold()
+    return _SEPARATORS.sub(' ', value).strip()
+
+
+def _entry_keys(title: str) -> List[str]:
+    """Indexed suffixes of a title: at each word start and each CJK character"""
+    text = normalize(title)
+    keys = []
+    for match in _WORD_START.finditer(text):
+        keys.append(text[match.start():match.start() + MAX_KEY_LENGTH])
+        if len(keys) == MAX_KEYS_PER_ENTRY:
+            break
+    return keys
+
+
+class PrefixIndex:
+    """Sorted suffix keys with a parallel array of entry numbers"""
+
+    def __init__(self, entries: List[Suggestion]):
+        self.entries = entries
+        pairs = sorted(
+            (key, number)
+            for number, entry in enumerate(entries)
+            for key in dict.fromkeys(_entry_keys(entry.title))
+        )
+        self.keys = [key for key, _number in pairs]
+        self.numbers = array('I', (number for _key, number in pairs))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, prefix: str, limit: int) -> List[Suggestion]:
+        """Entries having a word that starts with `prefix`, in key order"""
+        prefix = prefix[:MAX_KEY_LENGTH]
+        if not prefix or limit <= 0:
+            return []
+        found, seen = [], set()
+        keys, numbers = self.keys, self.numbers
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            number = numbers[i]
+            if number not in seen:
+                seen.add(number)
+                found.append(self.entries[number])
+                if len(found) == limit:
+                    break
+        return found
+
+
+class SuggestIndex(NamedTuple):
+    version: str
+    categories: PrefixIndex
+    posts: PrefixIndex
+
+
+class SuggestService:
+    """Service for prefix suggestions in the search box"""
+
+    @staticmethod
+    def _get_version() -> str:
+        """Get the current index version from the posts and categories namespaces"""
+        return f"{namespace_version('posts')}.{namespace_version('categories')}"
+
+    @staticmethod
+    def build_index(version: str) -> SuggestIndex:
+        """Build the prefix index from published post titles and category names"""
+        from app.models import Category, Post
+
+        categories = [
+            Suggestion('category', name, slug)
+            for name, slug in db.session.query(Category.name, Category.slug).order_by(Category.name)
+        ]
+        posts = [
+            Suggestion('post', title, slug)
+            for title, slug in db.session.query(Post.title, Post.slug)
+            .filter(Post.status == 'published').order_by(Post.id.desc())
+        ]
+        return SuggestIndex(version, PrefixIndex(categories), PrefixIndex(posts))
+
+    @staticmethod
+    def get_index() -> SuggestIndex:
+        """Return this process's index, rebuilding it when the version changed"""
+        version = SuggestService._get_version()
+        index = current_app.extensions.get('search_suggest')
+        if index is None or index.version != version:
+            index = SuggestService.build_index(version)
+            current_app.extensions['search_suggest'] = index
+        return index
+
+    @staticmethod
+    def suggest(query: str, limit: int = MAX_SUGGESTIONS) -> Tuple[str, List[dict]]:
+        """Suggestions for a search box prefix, categories first
+
+        Returns:
+            tuple: (index version, [{'type', 'title', 'url'}, ...])
+        """
+        index = SuggestService.get_index()
+        prefix = normalize(query)
+        matches = index.categories.lookup(prefix, limit)
+        matches += index.posts.lookup(prefix, limit - len(matches))
+        endpoints = {'category': 'main.category', 'post': 'main.post'}
+        return index.version, [
+            {'type': match.kind, 'title': match.title, 'url': url_for(endpoints[match.kind], slug=match.slug)}
+            for match in matches
+        ]
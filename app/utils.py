@@ -1,65 +1,51 @@
-import bleach
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 
-ALLOWED_HTML_TAGS = ['p', 'strong', 'h1', 'h2', 'h3', 'ul', 'ol', 'li', 'a', 'code', 'pre', 'span', 'img', 'details','summary']
-ALLOWED_HTML_ATTRIBUTES = {'*': ['class', 'id'], 'a': ['href', 'class'], 'img': ['src', 'alt', 'class'], 'details': ['open', 'class', 'id']}
+from flask import current_app, has_app_context
+
+# 白名單政策集中於 app.sanitizer，此處保留名稱供既有匯入使用
+from app.sanitizer import ALLOWED_HTML_TAGS, ALLOWED_HTML_ATTRIBUTES, get_sanitizer  # noqa: F401
 
 # Bleach version logging moved to app initialization
 
+# 最近清理結果的雜湊（LRU）：同一段內容在表單驗證時已清理過，
+# 寫入資料庫前的 before_update 事件不必再解析一次
+KNOWN_CLEAN_MAX_ENTRIES = 256
+_known_clean = OrderedDict()
+_known_clean_lock = threading.Lock()
+
+
+def content_digest(html_content: str) -> str:
+    """計算內容的 SHA-256 雜湊（對應 posts.content_hash）"""
+    return hashlib.sha256((html_content or '').encode('utf-8')).hexdigest()
+
+
+def remember_clean_content(digest: str) -> None:
+    """記錄一段已清理內容的雜湊"""
+    with _known_clean_lock:
+        _known_clean[digest] = True
+        _known_clean.move_to_end(digest)
+        while len(_known_clean) > KNOWN_CLEAN_MAX_ENTRIES:
+            _known_clean.popitem(last=False)
+
+
+def is_known_clean(digest: str) -> bool:
+    """此雜湊的內容是否為本程序近期 clean_html_content 的輸出"""
+    with _known_clean_lock:
+        return digest in _known_clean
+
 def clean_html_content(html_content: str, context: str = None) -> str:
     """
     Clean HTML content by removing disallowed tags and attributes.
     """
     try:
-        # 自定義屬性過濾函數 - 直接在 clean 函數中定義
-        def custom_attribute_filter(tag, name, value):
-            """
-            Custom attribute filter for bleach.clean()
-            Args:
-                tag: HTML tag name (e.g., 'a', 'img')
-                name: attribute name (e.g., 'href', 'src')
-                value: attribute value
-            Returns:
-                True to keep the attribute, False to remove it
-            """
-            # 允許基本屬性
-            if name in ['class', 'id', 'alt']:
-                return True
-            
-            # 處理 img 標籤的 src 屬性
-            if tag == 'img' and name == 'src':
-                if not isinstance(value, str):
-                    return False
-                # 允許本地靜態檔案和信任的外部網域
-                trusted_patterns = [
-                    '/static/images/',  # 本地靜態圖片
-                    'https://jake.tw',  # 外部信任網域
-                    'data:image/'       # base64 圖片
-                ]
-                return any(value.startswith(pattern) for pattern in trusted_patterns)
-            
-            # 處理 a 標籤的 href 屬性  
-            if tag == 'a' and name == 'href':
-                if not isinstance(value, str):
-                    return False
-                return value.startswith(('http://', 'https://'))
-            
-            # 其他屬性預設不允許
-            # Allow boolean "open" attribute on <details>
-            if tag == 'details' and name == 'open':
-                return True
-
-            return False
+        # 依 HTML_SANITIZER 選擇清理引擎（bleach / lxml），政策相同
+        engine = current_app.config.get('HTML_SANITIZER', 'bleach') if has_app_context() else 'bleach'
+        cleaned_content = get_sanitizer(engine).clean(html_content)
 
-        # 使用 bleach.clean 進行清理
-        cleaned_content = bleach.clean(
-            html_content,
-            tags=ALLOWED_HTML_TAGS,
-            attributes=custom_attribute_filter,  # 使用函數而不是字典
-            protocols=['http', 'https'],
-            strip=True  # 移除不允許的標籤而不是轉義
-        )
-        
+        remember_clean_content(content_digest(cleaned_content))
         return cleaned_content
     
     except Exception as e:
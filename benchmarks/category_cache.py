@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+導覽列分類快取：ORM 物件與 CategoryView 的比較
+
+每個請求都會經由 context processor 從快取取得分類清單。快取後端（SimpleCache、
+TieredCache 的 L1、FileSystemCache、Redis）保存的都是 pickle 後的位元組，
+每次讀取都要反序列化一次。本測試比較三種保存格式：
+
+- ORM：Category.query.order_by(Category.name).all()（先前的做法，detached 的實例）
+- views：CategoryView 的 list
+- packed：CategoryView.pack() 的欄位 tuple（目前的做法），讀取後以 unpack() 還原
+
+輸出每種格式的 pickle 大小、每次讀取（反序列化加還原）的平均與 p99 延遲，
+以及一份還原結果佔用的記憶體（tracemalloc）。
+
+Usage:
+    python -m benchmarks.category_cache [--categories 50] [--reads 20000]
+"""
+import argparse
+import os
+import pickle
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DevelopmentConfig  # noqa: E402
+
+
+class BenchmarkConfig(DevelopmentConfig):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ECHO = False
+    SITEMAP_PRECOMPUTED = False
+    PAGE_CACHE_ENABLED = False
+
+
+def read_latency(data, restore, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        restore(pickle.loads(data))
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.mean(samples), sorted(samples)[int(count * 0.99)]
+
+
+def retained_bytes(data, restore):
+    tracemalloc.start()
+    value = restore(pickle.loads(data))
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=50, help='分類數')
+    parser.add_argument('--reads', type=int, default=20000, help='讀取次數')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.models import Category, CategoryView
+
+    app = create_app(config_class=BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(
+            Category(name=f'Category {i:03d}', slug=f'category-{i:03d}', description='Articles about topic',
+                     published_count=i % 17, total_count=i % 23)
+            for i in range(args.categories)
+        )
+        db.session.commit()
+        db.session.expire_all()
+
+        orm = Category.query.order_by(Category.name).all()
+        db.session.expunge_all()
+        views = [CategoryView(c.id, c.name, c.slug, c.published_count) for c in orm]
+
+        formats = (
+            ('ORM instances', pickle.dumps(orm, pickle.HIGHEST_PROTOCOL), lambda value: value),
+            ('CategoryView list', pickle.dumps(views, pickle.HIGHEST_PROTOCOL), lambda value: value),
+            ('CategoryView.pack', pickle.dumps(CategoryView.pack(views), pickle.HIGHEST_PROTOCOL),
+             CategoryView.unpack),
+        )
+
+        print(f'{args.categories} categories, {args.reads} reads\n')
+        print(f"{'format':<20}{'bytes':>10}{'mean (us)':>12}{'p99 (us)':>12}{'memory (KiB)':>15}")
+        for name, data, restore in formats:
+            mean, p99 = read_latency(data, restore, args.reads)
+            memory = retained_bytes(data, restore)
+            print(f'{name:<20}{len(data):>10}{mean:>12.1f}{p99:>12.1f}{memory / 1024:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+HTML 清理引擎比較：bleach vs lxml
+
+1. 等價性：對一組實際文章片段與攻擊字串（tests/test_sanitizer_engines.py），比較兩個引擎的輸出
+   - exact：輸出字串完全相同
+   - dom：重新解析兩份輸出後 DOM（標籤、屬性、文字）相同
+   - safe：lxml 的輸出不含白名單以外的標籤、屬性或協定（必須全部通過）
+2. 吞吐量：對約 100 KB 的文章測量每秒清理次數
+
+Usage:
+    python -m benchmarks.html_sanitizer [--size 100000] [--rounds 20] [--verbose]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.sanitizer import get_sanitizer  # noqa: E402
+from tests.test_sanitizer_engines import (  # noqa: E402
+    CORPUS, KNOWN_DIFFERENCES, dom_signature, unsafe_parts,
+)
+
+def sample_post(size):
+    """產生約 size 位元組的文章內容"""
+    block = (
+        '<h2 class="title">章節標題</h2>'
+        '<p>Some <strong>bold</strong> text with <a href="https://example.com/?q=1&amp;r=2" onclick="x()">a link</a> '
+        'and <code>inline code</code>, 5 &lt; 6.</p>'
+        '<ul><li>first</li><li>second <span style="color:red">item</span></li></ul>'
+        '<pre><code class="language-python">print("hello")\nif a &lt; b:\n    pass</code></pre>'
+        '<img src="/static/images/pic.png" alt="pic" width="10">'
+        '<details><summary>More</summary><p>Hidden <em>text</em></p></details>'
+        '<script>alert(1)</script>'
+    )
+    return (block * (size // len(block) + 1))[:size]
+
+
+def check_equivalence(verbose):
+    bleach_engine, lxml_engine = get_sanitizer('bleach'), get_sanitizer('lxml')
+    exact = dom = safe = 0
+    snippets = CORPUS + KNOWN_DIFFERENCES
+    for snippet in snippets:
+        expected, actual = bleach_engine.clean(snippet), lxml_engine.clean(snippet)
+        same_text = expected == actual
+        same_dom = same_text or dom_signature(expected) == dom_signature(actual)
+        problems = unsafe_parts(actual)
+        exact += same_text
+        dom += same_dom
+        safe += not problems
+        if verbose or problems or not same_dom:
+            status = 'UNSAFE' if problems else ('exact' if same_text else ('dom' if same_dom else 'DIFF'))
+            print(f'[{status}] {snippet!r}')
+            if not same_text:
+                print(f'    bleach: {expected!r}\n    lxml:   {actual!r}')
+            for problem in problems:
+                print(f'    {problem}')
+
+    total = len(snippets)
+    print(f'\nequivalence over {total} snippets: exact {exact}, dom {dom}, safe {safe}')
+    return safe == total
+
+
+def measure(engine, html, rounds):
+    engine.clean(html)  # 預熱
+    start = time.perf_counter()
+    for _ in range(rounds):
+        engine.clean(html)
+    return rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=100000, help='文章內容的位元組數')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--verbose', action='store_true', help='列出每一個片段的比較結果')
+    args = parser.parse_args()
+
+    all_safe = check_equivalence(args.verbose)
+
+    html = sample_post(args.size)
+    before = measure(get_sanitizer('bleach'), html, args.rounds)
+    after = measure(get_sanitizer('lxml'), html, args.rounds)
+    print(f'\nthroughput on {len(html.encode("utf-8"))} bytes x {args.rounds} rounds')
+    print(f"{'engine':<10}{'cleans/s':>12}{'MB/s':>10}")
+    for name, rate in (('bleach', before), ('lxml', after)):
+        print(f'{name:<10}{rate:>12.1f}{rate * len(html) / 1e6:>10.2f}')
+    print(f'speedup: {after / before:.1f}x')
+
+    sys.exit(0 if all_safe else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Markdown 文章頁面渲染延遲基準測試
+
+建立內容相同的兩篇文章：一篇以 Markdown 撰寫，一篇是同一份 Markdown 預先轉好的 HTML，
+交錯請求兩者的文章頁並比較延遲（mean / p50 / p99）。
+
+Markdown 只在儲存時轉換一次，讀取時兩者都直接輸出 rendered_html，
+因此延遲應相同；測試期間也會計算 Markdown 解析器被呼叫的次數（應為 0）。
+
+使用記憶體 SQLite，不會寫入任何檔案。
+
+Usage:
+    python -m benchmarks.markdown_render [--requests 500] [--sections 40]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DevelopmentConfig  # noqa: E402
+
+
+class BenchmarkConfig(DevelopmentConfig):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ECHO = False
+    SITEMAP_PRECOMPUTED = False
+    PAGE_CACHE_ENABLED = False
+    CONDITIONAL_GET_ENABLED = False
+
+
+def sample_markdown(sections):
+    """產生含標題、清單、程式碼區塊與連結的 Markdown 文章"""
+    parts = []
+    for i in range(sections):
+        parts.append(
+            f'## Section {i}\n\n'
+            f'Some **bold** text with [a link](https://example.com/{i}) and `inline code`. '
+            '中文段落，測試閱讀時間的計算。\n\n'
+            '- first item\n- second item\n\n'
+            '```python\nprint("hello")\n```\n'
+        )
+    return '\n'.join(parts)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='每篇文章的請求次數')
+    parser.add_argument('--sections', type=int, default=40, help='文章的段落數')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    import app.rendering as rendering
+    from app.models import Category, Post, User
+
+    app = create_app(config_class=BenchmarkConfig)
+    source = sample_markdown(args.sections)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        category = Category(name='Bench', slug='bench')
+        db.session.add_all([user, category])
+        db.session.commit()
+        db.session.add_all([
+            Post(title='Markdown', slug='markdown-post', content=source, content_format='markdown',
+                 status='published', author_id=user.id, category_id=category.id),
+            Post(title='HTML', slug='html-post', content=rendering.compile_markdown(source),
+                 content_format='html', status='published', author_id=user.id, category_id=category.id),
+        ])
+        db.session.commit()
+        same_output = len({post.rendered_html for post in Post.query.all()}) == 1
+
+    # 讀取路徑不應呼叫 Markdown 解析器
+    calls = 0
+    original = rendering.markdown.markdown
+
+    def counting_markdown(*a, **kw):
+        nonlocal calls
+        calls += 1
+        return original(*a, **kw)
+
+    rendering.markdown.markdown = counting_markdown
+    client = app.test_client()
+    timings = {'html': [], 'markdown': []}
+    try:
+        for url in ('/html-post/', '/markdown-post/'):
+            assert client.get(url).status_code == 200  # 預熱
+        for _ in range(args.requests):
+            for name in ('html', 'markdown'):
+                start = time.perf_counter()
+                client.get(f'/{name}-post/')
+                timings[name].append((time.perf_counter() - start) * 1000)
+    finally:
+        rendering.markdown.markdown = original
+
+    print(f'{args.requests} requests per post, {len(source)} bytes of Markdown source')
+    print(f'identical rendered_html: {same_output}, Markdown parser calls during reads: {calls}\n')
+    print(f"{'format':<10}{'mean (ms)':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for name, samples in timings.items():
+        print(f'{name:<10}{statistics.mean(samples):>12.3f}'
+              f'{percentile(samples, 50):>12.3f}{percentile(samples, 99):>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
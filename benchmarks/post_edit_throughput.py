@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+文章編輯吞吐量基準測試
+
+比較 clean_post_content 事件在「每次更新都重新清理」（舊行為）與
+「依屬性歷史與內容雜湊略過清理」（新行為）下的每秒編輯數：
+
+- metadata：只切換 status / 分類，content 未改變
+- form save：內容先經 PostForm.validate_content 清理，再寫入資料庫
+
+使用記憶體 SQLite，不會寫入任何檔案。
+
+Usage:
+    python -m benchmarks.post_edit_throughput [--posts 20] [--rounds 5] [--size 50000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DevelopmentConfig  # noqa: E402
+
+
+class BenchmarkConfig(DevelopmentConfig):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ECHO = False
+    SITEMAP_PRECOMPUTED = False
+
+
+def sample_html(size):
+    """產生約 size 位元組、含允許與不允許標籤的文章內容"""
+    block = (
+        '<h2 class="title">章節標題</h2>'
+        '<p>Some <strong>bold</strong> text with <a href="https://example.com" onclick="x()">a link</a> '
+        'and <code>inline code</code>.</p>'
+        '<ul><li>first</li><li>second <span style="color:red">item</span></li></ul>'
+        '<pre><code class="language-python">print("hello")</code></pre>'
+        '<img src="/static/images/pic.png" alt="pic" width="10">'
+        '<script>alert(1)</script>'
+    )
+    return (block * (size // len(block) + 1))[:size]
+
+
+def run(app, posts, rounds, size, legacy):
+    """執行兩種情境並回傳 {情境: 每秒編輯數}"""
+    import app.models as models
+    from app import db
+    from app.models import Category, Post, User
+    from app.utils import clean_html_content
+
+    original = (models._content_changed, models._needs_sanitizing)
+    if legacy:
+        # 舊行為：每次 before_update 都重新執行 bleach
+        models._content_changed = lambda target: True
+        models._needs_sanitizing = lambda target, digest: True
+
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench')
+            categories = [Category(name=f'C{i}', slug=f'c{i}') for i in range(2)]
+            db.session.add_all([user] + categories)
+            db.session.commit()
+
+            html = sample_html(size)
+            items = [
+                Post(title=f'Post {i}', slug=f'post-{i}', content=html, status='draft',
+                     author_id=user.id, category_id=categories[0].id)
+                for i in range(posts)
+            ]
+            db.session.add_all(items)
+            db.session.commit()
+
+            results = {}
+
+            start = time.perf_counter()
+            for r in range(rounds):
+                for post in items:
+                    post.status = 'published' if r % 2 == 0 else 'draft'
+                    post.category_id = categories[r % 2].id
+                    db.session.commit()
+            results['metadata'] = rounds * posts / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for r in range(rounds):
+                for post in items:
+                    # 與 PostForm.validate_content 相同：表單先清理一次
+                    post.content = clean_html_content(f'{html}<p>rev {r}</p>', context='form')
+                    db.session.commit()
+            results['form save'] = rounds * posts / (time.perf_counter() - start)
+
+            db.session.remove()
+            return results
+    finally:
+        models._content_changed, models._needs_sanitizing = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--size', type=int, default=50000, help='每篇文章內容的位元組數')
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app(config_class=BenchmarkConfig)
+
+    before = run(app, args.posts, args.rounds, args.size, legacy=True)
+    after = run(app, args.posts, args.rounds, args.size, legacy=False)
+
+    print(f'{args.posts} posts x {args.rounds} rounds, {args.size} bytes of content each\n')
+    print(f"{'scenario':<12}{'before (edits/s)':>18}{'after (edits/s)':>18}{'speedup':>10}")
+    for scenario in before:
+        print(f'{scenario:<12}{before[scenario]:>18.1f}{after[scenario]:>18.1f}'
+              f'{after[scenario] / before[scenario]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+記憶體內搜尋索引（SEARCH_BACKEND = 'memory'）基準測試
+
+以合成的中英混合文章（標題、摘要、約 300 字內容）建立索引，文章數預設為
+1k / 10k / 100k，量測：
+
+- 建立時間、快照檔案大小、寫入與 worker 啟動時的載入時間、程序的記憶體峰值
+- 查詢延遲（p50 / p99）：常見單字、多字查詢、中文二字詞、罕見單字、無結果
+- 增量更新（修改一篇文章並附加到日誌）的延遲
+
+詞彙依 Zipf 分布抽樣（2 萬個英文單字、3 千個中文字），近似真實文章的詞頻。
+
+直接使用 MemorySearchIndex 與 SearchService.document_scores，不需要資料庫；
+索引檔寫入暫存目錄，結束後刪除。
+
+Usage:
+    python -m benchmarks.search_index [--sizes 1000 10000 100000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows 無 resource 模組，不顯示記憶體用量
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.search_index import MemorySearchIndex  # noqa: E402
+from app.services.search_service import SearchService, search_tokens  # noqa: E402
+
+VOCABULARY_SIZE = 20000
+CJK_CHARACTERS = 3000
+SYLLABLES = 'ka ri to ne sa mo lu pe di ve an or is el un ra co mi ta ge'.split()
+
+QUERIES = {
+    'common word': ['karito', 'rito', 'kane'],
+    'multi word': ['karito kane', 'rito kaka kane'],
+    'cjk bigram': ['\u4e00\u4e01', '\u4e00\u4e01\u4e02', '\u4e01\u4e00 \u4e00\u4e03'],
+    'rare word': ['zeolite'],
+    'no match': ['zzzz', 'karito \u9fa0\u9fa1'],
+}
+
+
+class Corpus:
+    """依 Zipf 分布抽樣的英文單字與中文字，近似真實文章的詞頻"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(VOCABULARY_SIZE)]
+        # 查詢用的固定詞放在最常見的位置
+        self.words = ['karito', 'rito', 'kane', 'kaka'] + words
+        self.word_weights = self._cumulative(len(self.words))
+        self.chars = [chr(0x4e00 + i) for i in range(CJK_CHARACTERS)]
+        self.char_weights = self._cumulative(len(self.chars))
+
+    @staticmethod
+    def _cumulative(n):
+        total, weights = 0.0, []
+        for rank in range(1, n + 1):
+            total += 1 / rank ** 1.1
+            weights.append(total)
+        return weights
+
+    def phrase(self, n):
+        parts = []
+        for _ in range(n):
+            if self.rng.random() < 0.5:
+                parts.append(''.join(self.rng.choices(self.chars, cum_weights=self.char_weights,
+                                                      k=self.rng.randint(2, 8))))
+            else:
+                parts.append(self.rng.choices(self.words, cum_weights=self.word_weights)[0])
+        return ' '.join(parts)
+
+    def document(self, doc_id):
+        """產生（標題, 摘要, 內容 HTML）"""
+        title = self.phrase(5)
+        description = self.phrase(15)
+        body = ''.join(f'<p>{self.phrase(30)}</p>' for _ in range(8))
+        if doc_id % 1000 == 0:
+            body += '<p>zeolite</p>'
+        return title, description, body
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(size, query_count, directory):
+    corpus = Corpus(random.Random(size))
+    path = os.path.join(directory, f'index-{size}.bin.gz')
+
+    # 建立時間包含斷詞與計分（對應 build_memory_index），不含產生合成文章
+    build_seconds = 0.0
+    index = MemorySearchIndex()
+    for doc_id in range(1, size + 1):
+        document = corpus.document(doc_id)
+        start = time.perf_counter()
+        index.add(doc_id, SearchService.document_scores(*document))
+        build_seconds += time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.save(path)
+    save_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    index = MemorySearchIndex.load(path)
+    load_seconds = time.perf_counter() - start
+
+    print(f'\n{size} posts, {index.term_count} terms: build {build_seconds:.2f}s, '
+          f'snapshot {os.path.getsize(path) / 1024:.0f} KiB '
+          f'(save {save_seconds * 1000:.0f} ms, load {load_seconds * 1000:.0f} ms)')
+    if resource is not None:
+        # Linux 的 ru_maxrss 單位為 KiB
+        print(f'  peak RSS so far: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB')
+    print(f"  {'query':<14}{'hits':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for name, queries in QUERIES.items():
+        timings, hits = [], 0
+        for i in range(query_count):
+            tokens = search_tokens(queries[i % len(queries)])
+            started = time.perf_counter()
+            _ids, total = index.search(tokens, 0, 10)
+            timings.append((time.perf_counter() - started) * 1000)
+            hits = max(hits, total)
+        print(f'  {name:<14}{hits:>8}{percentile(timings, 50):>12.3f}{percentile(timings, 99):>12.3f}')
+
+    # 增量更新（一次提交修改一篇文章）：套用並附加到日誌；第一次需建立反查表，先預熱
+    index.append_journal(path, {1: None})
+    timings = []
+    for i in range(100):
+        doc_id = random.Random(i).randint(1, size)
+        scores = dict(SearchService.document_scores(*corpus.document(doc_id)))
+        started = time.perf_counter()
+        index.append_journal(path, {doc_id: scores})
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f'  incremental update (journal append): p50 {percentile(timings, 50):.3f} ms, '
+          f'p99 {percentile(timings, 99):.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='文章數')
+    parser.add_argument('--queries', type=int, default=500, help='每類查詢的次數')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='search-index-bench-')
+    try:
+        for size in args.sizes:
+            run(size, args.queries, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+搜尋建議（/search/suggest）前綴索引基準測試
+
+以合成的中英混合標題建立 SuggestService 的前綴索引（預設 10 萬篇文章、50 個分類），
+量測建立時間、鍵的數量，以及輸入 1–6 個字元的前綴時 SuggestService.suggest 的延遲
+（mean / p50 / p99，含快取版本檢查與 url_for），目標為 p99 < 2 ms。
+
+另外以 test client 量測完整請求（路由、JSON 序列化與標頭）的延遲作為參考。
+索引直接由合成資料建立，不需要資料庫。
+
+Usage:
+    python -m benchmarks.search_suggest [--titles 100000] [--lookups 20000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DevelopmentConfig  # noqa: E402
+
+WORDS = (
+    'flask python database index query cache search template route session sqlite postgres '
+    'deploy nginx worker request response security token render markdown static asset '
+    'performance latency benchmark profile memory thread process stream gzip docker'
+).split()
+CHINESE = '資料庫索引搜尋快取部署效能模板路由安全文章分類標籤伺服器網站程式設計開發測試記憶體壓縮延遲使用者管理設定教學筆記心得'
+
+
+class BenchmarkConfig(DevelopmentConfig):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ECHO = False
+    SITEMAP_PRECOMPUTED = False
+    PAGE_CACHE_ENABLED = False
+
+
+def sample_title(rng):
+    parts = []
+    for _ in range(rng.randint(3, 7)):
+        if rng.random() < 0.5:
+            parts.append(rng.choice(WORDS).capitalize())
+        else:
+            start = rng.randrange(len(CHINESE) - 4)
+            parts.append(CHINESE[start:start + rng.randint(2, 4)])
+    return ' '.join(parts)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--titles', type=int, default=100000, help='文章標題數')
+    parser.add_argument('--lookups', type=int, default=20000, help='查詢次數')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.services.suggest_service import (
+        PrefixIndex, SuggestIndex, Suggestion, SuggestService, normalize
+    )
+
+    rng = random.Random(42)
+    posts = [Suggestion('post', sample_title(rng), f'post-{i}') for i in range(args.titles)]
+    categories = [Suggestion('category', f'{rng.choice(WORDS).capitalize()} {i}', f'category-{i}')
+                  for i in range(50)]
+
+    start = time.perf_counter()
+    post_index = PrefixIndex(posts)
+    build_seconds = time.perf_counter() - start
+
+    # 前綴取自實際標題：1–6 個字元，涵蓋大量符合（短前綴）與少量符合的情況
+    prefixes = []
+    for _ in range(args.lookups):
+        title = normalize(rng.choice(posts).title)
+        offset = rng.choice([0, title.find(' ') + 1])
+        prefixes.append(title[offset:offset + rng.randint(1, 6)])
+
+    app = create_app(config_class=BenchmarkConfig)
+    with app.test_request_context('/'):
+        version = SuggestService._get_version()
+        app.extensions['search_suggest'] = SuggestIndex(version, PrefixIndex(categories), post_index)
+
+        timings, returned = [], 0
+        for prefix in prefixes:
+            started = time.perf_counter()
+            _version, suggestions = SuggestService.suggest(prefix)
+            timings.append((time.perf_counter() - started) * 1000)
+            returned += len(suggestions)
+
+    client = app.test_client()
+    request_timings = []
+    for prefix in prefixes[:2000]:
+        started = time.perf_counter()
+        response = client.get('/search/suggest', query_string={'q': prefix})
+        request_timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200
+
+    print(f'{args.titles} titles, {len(post_index.keys)} prefix keys, built in {build_seconds:.2f}s')
+    print(f'average suggestions per lookup: {returned / len(prefixes):.1f}\n')
+    print(f"{'':<24}{'mean (ms)':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for name, samples in (('SuggestService.suggest', timings), ('GET /search/suggest', request_timings)):
+        print(f'{name:<24}{statistics.mean(samples):>12.3f}'
+              f'{percentile(samples, 50):>12.3f}{percentile(samples, 99):>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+靜態資源預先壓縮效益基準測試
+
+比較 app/static 下每個檔案在 identity / gzip / br 三種傳輸編碼下的位元組數，
+並彙總一次首頁瀏覽（CSS + favicon + 字型）實際傳輸的大小。
+不需要資料庫或執行中的伺服器，也不會寫入任何檔案。
+
+Usage:
+    python -m benchmarks.static_compression
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.assets import (  # noqa: E402
+    COMPRESSIBLE_EXTENSIONS, MIN_COMPRESS_SIZE, brotli, compress_bytes, _iter_static_files
+)
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'static')
+# 首頁實際會載入的靜態資源
+PAGE_VIEW_ASSETS = ('css/style.css', 'images/favicon.ico', 'fonts/OpenSans-Regular.woff2', 'fonts/OpenSans-Bold.woff2')
+
+
+def wire_sizes(rel_path, path):
+    """回傳 {encoding: 傳輸位元組數}；不壓縮的檔案各編碼皆為原始大小"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    sizes = {'identity': len(data), 'gzip': len(data), 'br': len(data)}
+    if os.path.splitext(rel_path)[1].lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE:
+        sizes['gzip'] = min(len(data), len(compress_bytes(data, 'gzip')))
+        if brotli is not None:
+            sizes['br'] = min(len(data), len(compress_bytes(data, 'br')))
+    return sizes
+
+
+def main():
+    if brotli is None:
+        print('Brotli not installed: br column falls back to identity sizes\n')
+
+    rows = {rel: wire_sizes(rel, path) for rel, path in sorted(_iter_static_files(STATIC_FOLDER))}
+
+    print(f"{'file':<55}{'identity':>10}{'gzip':>10}{'br':>10}{'saved':>8}")
+    totals = {'identity': 0, 'gzip': 0, 'br': 0}
+    for rel, sizes in rows.items():
+        for enc in totals:
+            totals[enc] += sizes[enc]
+        saved = 1 - sizes['br'] / sizes['identity'] if sizes['identity'] else 0
+        print(f"{rel:<55}{sizes['identity']:>10}{sizes['gzip']:>10}{sizes['br']:>10}{saved:>7.1%}")
+
+    print('-' * 93)
+    print(f"{'all static files':<55}{totals['identity']:>10}{totals['gzip']:>10}{totals['br']:>10}"
+          f"{1 - totals['br'] / totals['identity']:>7.1%}")
+
+    page = {enc: sum(rows[rel][enc] for rel in PAGE_VIEW_ASSETS if rel in rows) for enc in totals}
+    print(f"{'home page view (css + favicon + fonts)':<55}{page['identity']:>10}{page['gzip']:>10}{page['br']:>10}"
+          f"{1 - page['br'] / page['identity']:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
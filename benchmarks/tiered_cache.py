@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+兩層快取（TieredCache）與每個 worker 各自的 SimpleCache 比較
+
+在單一程序中模擬 N 個 gunicorn worker（每個 worker 一個快取實例，TieredCache 共用
+同一個 FileSystemCache 目錄），依序輪流處理請求；每個請求讀取一個「導覽列分類」鍵，
+未命中時重新計算（視為一次資料庫查詢）。期間由其中一個 worker 多次失效該鍵
+（相當於 CategoryService.clear_category_cache）。
+
+輸出：
+- 重新計算的次數（資料庫負載）
+- 失效後仍回傳舊值的請求數（SimpleCache 只清得到執行失效的 worker）
+- 讀取延遲：L1 命中、L2 命中（FileSystemCache）與 SimpleCache 命中
+
+Usage:
+    python -m benchmarks.tiered_cache [--workers 4] [--requests 20000] [--invalidations 20]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_caching.backends.filesystemcache import FileSystemCache  # noqa: E402
+from flask_caching.backends.simplecache import SimpleCache  # noqa: E402
+
+from app.cache_backends import TieredCache  # noqa: E402
+
+KEY = 'nav_available_categories'
+
+
+def simulate(caches, requests, invalidations, poll_interval):
+    """輪流以各 worker 處理請求，回傳（重新計算次數, 讀到舊值的請求數）"""
+    version = 0
+    computed = stale = 0
+    every = max(1, requests // (invalidations + 1))
+    for i in range(requests):
+        cache = caches[i % len(caches)]
+        if i and i % every == 0 and version < invalidations:
+            version += 1
+            cache.delete(KEY)
+        value = cache.get(KEY)
+        if value is None:
+            computed += 1
+            value = {'version': version, 'categories': [(n, f'Category {n}') for n in range(20)]}
+            cache.set(KEY, value)
+        elif value['version'] != version:
+            stale += 1
+        # 模擬請求的處理時間，讓輪詢間隔有機會經過
+        if poll_interval:
+            time.sleep(poll_interval / len(caches) / 50)
+    return computed, stale
+
+
+def read_latency(cache, key, count=20000):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        cache.get(key)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.mean(samples), sorted(samples)[int(count * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--invalidations', type=int, default=20)
+    parser.add_argument('--poll-interval', type=float, default=0.05, help='TieredCache 的 L1 輪詢間隔（秒）')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='tiered-cache-bench-')
+    try:
+        simple = [SimpleCache(threshold=500) for _ in range(args.workers)]
+        tiered = [
+            TieredCache(FileSystemCache(directory), max_entries=1024, ttl=30, poll_interval=args.poll_interval)
+            for _ in range(args.workers)
+        ]
+
+        print(f'{args.workers} workers, {args.requests} requests, {args.invalidations} invalidations\n')
+        print(f"{'backend':<28}{'recomputes':>12}{'stale reads':>14}")
+        for name, caches in (('SimpleCache per worker', simple), ('TieredCache (L1 + FS L2)', tiered)):
+            computed, stale = simulate(caches, args.requests, args.invalidations, args.poll_interval)
+            print(f'{name:<28}{computed:>12}{stale:>14}')
+
+        value = {'categories': [(n, f'Category {n}') for n in range(20)]}
+        simple[0].set('latency', value)
+        tiered[0].set('latency', value)
+        l2_only = TieredCache(FileSystemCache(directory), max_entries=0, poll_interval=3600)
+
+        print(f"\n{'read path':<28}{'mean (us)':>12}{'p99 (us)':>14}")
+        for name, cache in (('SimpleCache hit', simple[0]), ('TieredCache L1 hit', tiered[0]),
+                            ('TieredCache L2 hit', l2_only)):
+            mean, p99 = read_latency(cache, 'latency')
+            print(f'{name:<28}{mean:>12.1f}{p99:>14.1f}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+不存在的文章 slug（掃描器、失效的外部連結）的 404 成本
+
+以 test client 對 /<slug>/ 送出隨機、不存在的 slug，比較：
+
+- 未啟用 slug 過濾器，每次渲染 404 模板（先前的行為）
+- 啟用 SlugFilterService 的 Bloom filter，404 頁面每次渲染
+- 啟用 Bloom filter 且使用預先渲染的 404 頁面（目前的行為）
+
+輸出每個請求的平均 / p99 延遲與每個請求的 SQL 查詢數，
+以及 Bloom filter 的建立時間、大小與實測誤判率。
+
+Usage:
+    python -m benchmarks.unknown_slugs [--posts 10000] [--requests 3000]
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DevelopmentConfig  # noqa: E402
+
+
+class BenchmarkConfig(DevelopmentConfig):
+    TESTING = True
+    SQLALCHEMY_ECHO = False
+    SITEMAP_PRECOMPUTED = False
+    PAGE_CACHE_ENABLED = False
+    FORCE_HTTPS = False
+
+
+def random_slug(rng):
+    return '-'.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) for _ in range(3))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=10000, help='文章數')
+    parser.add_argument('--requests', type=int, default=3000, help='每種設定的請求數')
+    args = parser.parse_args()
+
+    from sqlalchemy import event, insert
+
+    from app import create_app, db
+    from app.models import Category, Post, User
+    from app.services.slug_filter_service import SlugFilterService
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+    try:
+        app = create_app(config_class=BenchmarkConfig)
+        rng = random.Random(42)
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench')
+            category = Category(name='Bench', slug='bench')
+            db.session.add_all([user, category])
+            db.session.commit()
+            # 直接插入資料列，略過渲染與事件，只需要 slug
+            db.session.execute(insert(Post), [
+                {'title': f'Post {i}', 'slug': f'post-{i}', 'content': '<p>x</p>', 'rendered_html': '<p>x</p>',
+                 'status': 'published', 'author_id': user.id, 'category_id': category.id}
+                for i in range(args.posts)
+            ])
+            db.session.commit()
+
+            started = time.perf_counter()
+            with app.test_request_context('/'):
+                bloom = SlugFilterService.build_filter(0).slugs
+            build_ms = (time.perf_counter() - started) * 1000
+            false_positives = sum(random_slug(rng) in bloom for _ in range(100000)) / 100000
+            print(f'{args.posts} posts: filter built in {build_ms:.1f} ms, {len(bloom.bits) / 1024:.1f} KiB, '
+                  f'{bloom.hashes} hashes, false positive rate {false_positives:.4f}\n')
+
+            queries = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *_args: queries.append(1))
+
+        client = app.test_client()
+        slugs = [random_slug(rng) for _ in range(args.requests)]
+        settings = (
+            ('no filter, render 404', False, ''),
+            ('filter, render 404', True, ''),
+            ('filter, pre-rendered 404', True, app.config['CSP_NONCE_PLACEHOLDER']),
+        )
+        print(f"{'setting':<28}{'mean (ms)':>12}{'p99 (ms)':>12}{'queries/req':>14}")
+        for name, enabled, placeholder in settings:
+            app.config['SLUG_FILTER_ENABLED'] = enabled
+            app.config['CSP_NONCE_PLACEHOLDER'] = placeholder
+            app.extensions.pop('not_found_pages', None)
+            client.get(f'/{slugs[0]}/')
+            queries.clear()
+            timings = []
+            for slug in slugs:
+                started = time.perf_counter()
+                response = client.get(f'/{slug}/')
+                timings.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 404
+            print(f'{name:<28}{statistics.mean(timings):>12.3f}{percentile(timings, 99):>12.3f}'
+                  f'{len(queries) / len(slugs):>14.2f}')
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
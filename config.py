@@ -59,12 +59,83 @@ class Config:
     WTF_CSRF_SSL_STRICT = env_bool('WTF_CSRF_SSL_STRICT', FORCE_HTTPS)
     PREFERRED_URL_SCHEME = 'https' if FORCE_HTTPS or SESSION_COOKIE_SECURE else 'http'
     
+    # Pagination Configuration
+    # 'keyset' uses opaque (created_at, id) cursors (?after=/?before=); 'offset' uses ?page=N
+    POSTS_PER_PAGE = int(os.environ.get('POSTS_PER_PAGE', '10'))
+    PAGINATION_MODE = os.environ.get('PAGINATION_MODE', 'keyset')
+    
     # Category Cache Timeout (10 minutes)
     CATEGORY_CACHE_TIMEOUT = 600
     
     # Flask-Caching Configuration
-    CACHE_TYPE = 'SimpleCache'
+    # 'app.cache_backends.TieredCache' puts a per-worker LRU (L1) in front of a shared
+    # backend (CACHE_SHARED_TYPE: FileSystemCache in CACHE_DIR, default instance/cache,
+    # or RedisCache with CACHE_REDIS_URL); invalidations reach every worker's L1
+    # within CACHE_L1_POLL_INTERVAL seconds
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
     CACHE_DEFAULT_TIMEOUT = 300
+    CACHE_SHARED_TYPE = os.environ.get('CACHE_SHARED_TYPE', 'FileSystemCache')
+    CACHE_DIR = os.environ.get('CACHE_DIR')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_L1_MAX_ENTRIES = int(os.environ.get('CACHE_L1_MAX_ENTRIES', '1024'))
+    CACHE_L1_TTL = float(os.environ.get('CACHE_L1_TTL', '30'))
+    CACHE_L1_POLL_INTERVAL = float(os.environ.get('CACHE_L1_POLL_INTERVAL', '1'))
+    
+    # Full-page cache for anonymous visitors of the public blueprint
+    PAGE_CACHE_ENABLED = env_bool('PAGE_CACHE_ENABLED', True)
+    PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', '300'))
+
+    # Sitemap protocol limit; larger sites get a sitemap index of /sitemap-<n>.xml shards
+    SITEMAP_MAX_URLS = int(os.environ.get('SITEMAP_MAX_URLS', '50000'))
+    # Serve a sitemap precomputed in the instance directory, updated after each post commit
+    SITEMAP_PRECOMPUTED = env_bool('SITEMAP_PRECOMPUTED', True)
+    # Absolute base for precomputed sitemap links, e.g. https://example.com (falls back to SERVER_NAME;
+    # without either the precomputed sitemap is disabled, never built from the request Host header)
+    SITEMAP_BASE_URL = os.environ.get('SITEMAP_BASE_URL')
+
+    # ETag / Last-Modified validators on public pages and the sitemap (304 on revalidation)
+    CONDITIONAL_GET_ENABLED = env_bool('CONDITIONAL_GET_ENABLED', True)
+
+    # Pygments style for css/pygments.css, regenerated with `flask assets pygments` (code blocks are highlighted at save time)
+    PYGMENTS_STYLE = os.environ.get('PYGMENTS_STYLE', 'default')
+
+    # Search backend: 'database' (SQLite FTS5 / PostgreSQL tsvector) or 'memory'
+    # (in-process inverted index persisted in instance/search, for single-node SQLite without FTS5)
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'database')
+    SEARCH_INDEX_DIR = os.environ.get('SEARCH_INDEX_DIR')
+    # Browser / CDN cache lifetime of /search/suggest responses (seconds)
+    SEARCH_SUGGEST_MAX_AGE = int(os.environ.get('SEARCH_SUGGEST_MAX_AGE', '300'))
+
+    # Per-worker Bloom filter of post slugs: unknown /<slug>/ paths get a 404
+    # without a post query (about SLUG_FILTER_ERROR_RATE of them still query).
+    # A slug missing from the filter is checked in the database once and the
+    # miss remembered for SLUG_FILTER_MISS_TTL seconds (posts other workers
+    # just created can 404 for at most that long)
+    SLUG_FILTER_ENABLED = env_bool('SLUG_FILTER_ENABLED', True)
+    SLUG_FILTER_ERROR_RATE = float(os.environ.get('SLUG_FILTER_ERROR_RATE', '0.01'))
+    SLUG_FILTER_MISS_TTL = int(os.environ.get('SLUG_FILTER_MISS_TTL', '30'))
+
+    # HTML sanitizer engine for post content: 'bleach' (html5lib) or 'lxml' (same policy, faster)
+    HTML_SANITIZER = os.environ.get('HTML_SANITIZER', 'bleach')
+
+    # Dynamic response compression (opt-in; nginx usually compresses instead)
+    COMPRESSION_ENABLED = env_bool('COMPRESSION_ENABLED', False)
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '500'))
+    COMPRESSION_ALGORITHMS = ['br', 'gzip']
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BR_LEVEL = 5
+    COMPRESSION_MIMETYPES = [
+        'text/html', 'text/css', 'text/plain', 'text/xml',
+        'application/xml', 'application/json', 'application/javascript',
+    ]
+
+    # Templates render this token instead of the per-request CSP nonce; an
+    # after_request stage swaps in the real nonce so rendered HTML can be cached.
+    # Unset (default): derived from SECRET_KEY, so it is secret but the same on
+    # every worker. Never use a well-known value: markup that contains the token
+    # would receive a valid nonce. Set to an empty string to embed the nonce
+    # directly (disables the page cache).
+    CSP_NONCE_PLACEHOLDER = os.environ.get('CSP_NONCE_PLACEHOLDER')
 
     # Basic Content Security Policy
     CSP = {
@@ -112,6 +183,11 @@ class DevelopmentConfig(Config):
     # Relaxed session settings for development
     SESSION_COOKIE_SECURE = False  # Allow HTTP in development
     FORCE_HTTPS = False  # Disable HTTPS enforcement in development
+    
+    # Template edits should show up immediately while developing
+    PAGE_CACHE_ENABLED = env_bool('PAGE_CACHE_ENABLED', False)
+    CONDITIONAL_GET_ENABLED = env_bool('CONDITIONAL_GET_ENABLED', False)
+    SITEMAP_PRECOMPUTED = env_bool('SITEMAP_PRECOMPUTED', False)
         
     # Development CSP - more permissive
     CSP = {
@@ -144,6 +220,9 @@ class ProductionConfig(Config):
     # 正式環境數據庫配置
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
 
+    # 多個 gunicorn worker 共用快取，失效時同步清除各 worker 的 L1
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'app.cache_backends.TieredCache')
+
     HTTPS_ENABLED = env_bool('HTTPS_ENABLED', True)
     SESSION_COOKIE_SECURE = HTTPS_ENABLED
     REMEMBER_COOKIE_SECURE = HTTPS_ENABLED
@@ -196,6 +275,9 @@ class ProductionConfig(Config):
             app.logger.warning('HTTPS enforcement is disabled in production. Set HTTPS_ENABLED=true once TLS is configured.')
         else:
             app.logger.info('HTTPS enforcement enabled; secure cookies and redirects are active.')
+
+        if app.config.get('SITEMAP_PRECOMPUTED') and not (app.config.get('SITEMAP_BASE_URL') or app.config.get('SERVER_NAME')):
+            app.logger.warning('SITEMAP_BASE_URL is not set; the precomputed sitemap is disabled and /sitemap.xml is rendered per request.')
         
         # Ensure log directory exists
         log_file = app.config.get('LOG_FILE', 'logs/app.log')
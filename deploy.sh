@@ -17,10 +17,26 @@ source venv/bin/activate
 echo "📦 安裝依賴..."
 pip install -r requirements.txt
 
+# 產生靜態資源雜湊清單
+echo "🧾 產生靜態資源清單..."
+flask assets build
+
 # 運行資料庫遷移
 echo "🗄️ 運行資料庫遷移..."
 flask db upgrade
 
+# 補上尚未產生渲染結果的文章
+echo "📝 渲染文章內容..."
+flask posts rerender --missing
+
+# 重建全文搜尋索引
+echo "🔍 重建搜尋索引..."
+flask search reindex
+
+# 重建預先產生的網站地圖（未設定 SITEMAP_BASE_URL 時略過，改為請求時即時產生）
+echo "🗺️ 重建網站地圖..."
+flask sitemap rebuild --if-configured
+
 # 重啟Gunicorn服務
 echo "🔄 重啟應用服務..."
 sudo systemctl restart flask-blog
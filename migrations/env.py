@@ -51,6 +51,15 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # 全文搜尋索引表（FTS5 虛擬表與其影子表、posts_search）不在模型中，
+    # 由 SearchService 管理，autogenerate 不應產生刪除它們的遷移
+    if type_ == 'table' and reflected and compare_to is None \
+            and name.startswith(('posts_fts', 'posts_search')):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -93,6 +102,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,62 @@
+"""Add post search index
+
+Revision ID: f3c8d2a6b517
+Revises: e1f7a3b9c402
+Create Date: 2026-10-19 15:08:42.774120
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8d2a6b517'
+down_revision = 'e1f7a3b9c402'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.env')
+
+
+def _sqlite_has_fts5(bind):
+    try:
+        return bind.execute(sa.text("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")).first() is not None
+    except sa.exc.DBAPIError:
+        options = {row[0] for row in bind.execute(sa.text('PRAGMA compile_options'))}
+        return 'ENABLE_FTS5' in options
+
+
+def upgrade():
+    # 全文搜尋索引表依資料庫類型建立（SQLite FTS5 / PostgreSQL tsvector + GIN），
+    # 內容由 `flask search reindex` 填入，之後由 Post 的事件同步。
+    # 未編譯 FTS5 的 SQLite 不建立索引表（改用 SEARCH_BACKEND=memory）
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        if not _sqlite_has_fts5(bind):
+            logger.warning('SQLite has no FTS5, skipping posts_fts (set SEARCH_BACKEND=memory)')
+            return
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts "
+            "USING fts5(title, description, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif bind.dialect.name == 'postgresql':
+        op.create_table(
+            'posts_search',
+            sa.Column('post_id', sa.Integer(), nullable=False),
+            sa.Column('document', postgresql.TSVECTOR(), nullable=False),
+            sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('post_id'),
+        )
+        op.create_index('ix_posts_search_document', 'posts_search', ['document'], postgresql_using='gin')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS posts_fts')
+    elif bind.dialect.name == 'postgresql':
+        op.drop_index('ix_posts_search_document', table_name='posts_search')
+        op.drop_table('posts_search')
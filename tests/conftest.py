@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+測試共用的 fixture
+
+每個測試使用獨立的 SQLite 檔案與 SimpleCache，預設關閉整頁快取、條件式請求與
+預先產生的網站地圖；個別測試可透過 app.config 開啟。
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import DevelopmentConfig
+
+
+class TestConfig(DevelopmentConfig):
+    TESTING = True
+    SECRET_KEY = 'test-secret-key'
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_ECHO = False
+    CACHE_TYPE = 'SimpleCache'
+    PAGE_CACHE_ENABLED = False
+    CONDITIONAL_GET_ENABLED = False
+    SITEMAP_PRECOMPUTED = False
+    SEARCH_BACKEND = 'database'
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app, db
+
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+
+    app = create_app(config_class=Config)
+    app.instance_path = str(tmp_path / 'instance')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def author(app):
+    from app import db
+    from app.models import User
+
+    user = User(username='author', email='author@example.com')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def category(app):
+    from app import db
+    from app.models import Category
+
+    category = Category(name='Tech', slug='tech')
+    db.session.add(category)
+    db.session.commit()
+    return category
+
+
+@pytest.fixture
+def make_post(app, author, category):
+    """建立文章的工廠；created_at 依建立順序遞增"""
+    from app import db
+    from app.models import Post
+
+    base = datetime(2024, 1, 1)
+    counter = {'n': 0}
+
+    def make(**fields):
+        n = counter['n']
+        counter['n'] += 1
+        values = {
+            'title': f'Post {n}',
+            'slug': f'post-{n}',
+            'content': f'<p>Body {n}</p>',
+            'description': f'Description {n}',
+            'status': 'published',
+            'author_id': author.id,
+            'category_id': category.id,
+            'created_at': base + timedelta(hours=n),
+        }
+        values.update(fields)
+        post = Post(**values)
+        db.session.add(post)
+        db.session.commit()
+        return post
+
+    return make
+
+
+@pytest.fixture
+def login(client, author):
+    def do_login():
+        return client.post('/admin_login/', data={'email': 'author@example.com', 'password': 'password'})
+    return do_login
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""兩層快取（TieredCache）：以兩個實例共用同一個 L2 模擬兩個 worker"""
+import pytest
+from flask_caching.backends.simplecache import SimpleCache
+
+from app.cache_backends import INVALIDATION_LOG_SIZE, TieredCache
+
+
+@pytest.fixture
+def shared():
+    return SimpleCache(threshold=10000)
+
+
+@pytest.fixture
+def workers(shared):
+    return [TieredCache(shared, poll_interval=0) for _ in range(2)]
+
+
+def test_delete_drops_only_that_key_from_other_workers(shared, workers):
+    a, b = workers
+    a.set('x', 1)
+    a.set('y', 1)
+    assert (b.get('x'), b.get('y')) == (1, 1)
+
+    # 直接改寫 L2，b 仍以 L1 回傳 y 的舊值，可確認 y 留在 L1
+    shared.set('y', 2)
+    a.delete('x')
+    assert b.get('x') is None
+    assert b.get('y') == 1
+
+
+def test_inc_is_seen_by_other_workers(workers):
+    a, b = workers
+    a.set('counter', 1)
+    assert b.get('counter') == 1
+    a.inc('counter')
+    assert b.get('counter') == 2
+
+
+def test_set_does_not_query_l2_or_flush_other_workers(shared, workers, monkeypatch):
+    a, b = workers
+    a.set('x', 1)
+    assert b.get('x') == 1
+
+    monkeypatch.setattr(shared, 'has', lambda key: pytest.fail('set must not call has()'))
+    a.set('x', 2)
+    a.set_many({'y': 1, 'z': 1})
+    # 覆寫不通知其他 worker：b 在 L1 TTL 內仍使用 L1 的值
+    assert b.get('x') == 1
+    assert a.get('x') == 2
+
+
+def test_falling_behind_the_log_clears_l1(shared, workers):
+    a, b = workers
+    a.set('x', 1)
+    assert b.get('x') == 1
+    shared.set('x', 2)
+    for n in range(INVALIDATION_LOG_SIZE + 1):
+        a.delete(f'other-{n}')
+    assert b.get('x') == 2
+
+
+def test_clear_flushes_other_workers(workers):
+    a, b = workers
+    a.set('x', 1)
+    assert b.get('x') == 1
+    a.clear()
+    assert b.get('x') is None
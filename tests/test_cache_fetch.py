@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""防止快取雪崩的 fetch()"""
+import pytest
+from flask_caching.backends.simplecache import SimpleCache
+
+
+@pytest.fixture
+def computed():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    compute.calls = calls
+    return compute
+
+
+def test_value_is_computed_once(app, computed):
+    from app.cache_fetch import fetch
+
+    assert fetch('stats', 'x', computed, timeout=60) == 1
+    assert fetch('stats', 'x', computed, timeout=60) == 1
+    assert len(computed.calls) == 1
+
+
+def test_invalidation_recomputes(app, computed):
+    from app.cache_fetch import fetch
+    from app.cache_namespaces import invalidate_namespace
+
+    fetch('stats', 'x', computed, timeout=60)
+    invalidate_namespace('stats')
+    assert fetch('stats', 'x', computed, timeout=60) == 2
+
+
+def test_stale_value_is_returned_while_another_caller_computes(app, computed):
+    from app import cache
+    from app.cache_fetch import fetch
+    from app.cache_namespaces import invalidate_namespace
+
+    fetch('stats', 'x', computed, timeout=60)
+    invalidate_namespace('stats')
+    cache.add('stats:x:lock', True)
+    assert fetch('stats', 'x', computed, timeout=60) == 1
+    assert len(computed.calls) == 1
+
+
+def test_wait_timeout_returns_a_stale_value_instead_of_computing(app, computed, monkeypatch):
+    from app import cache, cache_fetch
+    from app.cache_fetch import fetch
+
+    cache.add('stats:x:lock', True)
+    monkeypatch.setattr(cache_fetch, 'WAIT_TIMEOUT', 0.05)
+    # 等待期間其他呼叫者寫入了上一版的值
+    monkeypatch.setattr(cache_fetch.time, 'sleep', lambda seconds: cache.set('stats:x', (-1, 'stale', 0, 0)))
+    assert fetch('stats', 'x', computed, timeout=60) == 'stale'
+    assert computed.calls == []
+
+
+def test_wait_timeout_without_any_value_computes(app, computed, monkeypatch):
+    from app import cache, cache_fetch
+    from app.cache_fetch import fetch
+
+    cache.add('stats:x:lock', True)
+    monkeypatch.setattr(cache_fetch, 'WAIT_TIMEOUT', 0.05)
+    assert fetch('stats', 'x', computed, timeout=60) == 1
+
+
+def test_tiered_workers_share_refreshes_without_invalidating_l1(app, computed, monkeypatch):
+    from app import cache
+    from app.cache_backends import INVALIDATION_LOG_KEY, TieredCache
+    from app.cache_fetch import fetch
+    from app.cache_namespaces import invalidate_namespace
+
+    shared = SimpleCache()
+    a, b = (TieredCache(shared, poll_interval=0) for _ in range(2))
+
+    def use(worker):
+        monkeypatch.setitem(app.extensions['cache'], cache, worker)
+
+    use(a)
+    fetch('stats', 'x', computed, timeout=60)
+    use(b)
+    assert fetch('stats', 'x', computed, timeout=60) == 1
+    b.set('unrelated', 'kept')
+    # 計算與釋放鎖都不寫入失效紀錄
+    assert shared.get(INVALIDATION_LOG_KEY) is None
+
+    invalidate_namespace('stats')
+    use(a)
+    assert fetch('stats', 'x', computed, timeout=60) == 2
+    # b 的 L1 仍是上一版：先讀 L2 取得 a 算好的值，不再計算
+    use(b)
+    assert fetch('stats', 'x', computed, timeout=60) == 2
+    assert len(computed.calls) == 2
+    shared.set('unrelated', 'changed in L2')
+    assert b.get('unrelated') == 'kept'
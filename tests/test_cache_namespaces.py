@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""快取命名空間的版本號與失效"""
+import pytest
+from flask_caching.backends.simplecache import SimpleCache
+
+
+def test_invalidation_hides_old_keys(app):
+    from app import cache
+    from app.cache_namespaces import invalidate_namespace, namespace_version, namespaced_key
+
+    key = namespaced_key('categories', 'nav')
+    cache.set(key, 'old')
+    version = namespace_version('categories')
+    stats_version = namespace_version('stats')
+
+    invalidate_namespace('categories')
+
+    assert namespace_version('categories') != version
+    assert cache.get(namespaced_key('categories', 'nav')) is None
+    assert namespace_version('stats') == stats_version
+
+
+def test_unknown_namespace_is_rejected(app):
+    from app.cache_namespaces import namespaced_key
+
+    with pytest.raises(ValueError):
+        namespaced_key('nope', 'key')
+
+
+def test_non_atomic_backend_does_not_use_inc(app, monkeypatch):
+    from app import cache
+    from app.cache_namespaces import invalidate_namespace, namespace_version
+
+    version = namespace_version('posts')
+    monkeypatch.setattr(cache.cache, 'inc', lambda *args, **kwargs: pytest.fail('inc is not atomic here'))
+    invalidate_namespace('posts')
+    assert namespace_version('posts') != version
+
+
+def test_atomic_backend_increments(app, monkeypatch):
+    from app import cache, cache_namespaces
+    from app.cache_namespaces import invalidate_namespace, namespace_version
+
+    monkeypatch.setattr(cache_namespaces, 'ATOMIC_INC_BACKENDS', (SimpleCache,))
+    version = namespace_version('posts')
+    invalidate_namespace('posts')
+    assert namespace_version('posts') == version + 1
+
+    # 版本鍵不存在時 inc 從 0 起算，改為新的隨機版本號
+    cache.delete('ns:posts:version')
+    invalidate_namespace('posts')
+    assert namespace_version('posts') > 1
+
+
+def test_invalidation_reaches_other_tiered_workers(app, monkeypatch):
+    from app import cache
+    from app.cache_backends import TieredCache
+    from app.cache_namespaces import invalidate_namespace, namespace_version
+
+    shared = SimpleCache()
+    workers = [TieredCache(shared, poll_interval=0) for _ in range(2)]
+    monkeypatch.setitem(app.extensions['cache'], cache, workers[0])
+    version = namespace_version('pages')
+    monkeypatch.setitem(app.extensions['cache'], cache, workers[1])
+    assert namespace_version('pages') == version
+
+    monkeypatch.setitem(app.extensions['cache'], cache, workers[0])
+    invalidate_namespace('pages')
+    new_version = namespace_version('pages')
+    monkeypatch.setitem(app.extensions['cache'], cache, workers[1])
+    assert namespace_version('pages') == new_version != version
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""CategoryService 的分類刪除"""
+from datetime import datetime, timedelta
+
+
+def test_delete_category_moves_posts_and_invalidates_caches(app, make_post, category):
+    from app import db
+    from app.cache_namespaces import namespace_version
+    from app.models import Category, Post
+    from app.services.category_service import CategoryService
+
+    uncategorized = CategoryService.get_or_create_default_category()
+    old = datetime(2020, 1, 1)
+    post = make_post()
+    make_post(status='draft')
+    db.session.execute(db.update(Post).values(updated_at=old))
+    db.session.commit()
+    versions = {ns: namespace_version(ns) for ns in ('posts', 'categories', 'pages')}
+
+    assert CategoryService.delete_category(category) == 2
+
+    db.session.expire_all()
+    moved = db.session.get(Post, post.id)
+    assert moved.category_id == uncategorized.id
+    assert moved.updated_at.replace(tzinfo=None) > old + timedelta(days=1)
+    assert db.session.get(Category, uncategorized.id).published_count == 1
+    assert db.session.get(Category, uncategorized.id).total_count == 2
+    for ns, version in versions.items():
+        assert namespace_version(ns) != version, ns
+
+
+def test_delete_category_updates_the_precomputed_sitemap(app, client, make_post, category):
+    from app import db
+    from app.models import Post
+    from app.services.category_service import CategoryService
+
+    app.config['SITEMAP_PRECOMPUTED'] = True
+    app.config['SITEMAP_BASE_URL'] = 'https://blog.example.com'
+    CategoryService.get_or_create_default_category()
+    make_post()
+    db.session.execute(db.update(Post).values(updated_at=datetime(2020, 1, 1)))
+    db.session.commit()
+    assert '2020-01-01' in client.get('/sitemap.xml').get_data(as_text=True)
+
+    CategoryService.delete_category(category)
+
+    assert '2020-01-01' not in client.get('/sitemap.xml').get_data(as_text=True)
+
+
+def test_counters_follow_changes_to_expired_posts(make_post, category):
+    """commit 後屬性已過期，直接設定新值時計數仍需扣除舊狀態與舊分類"""
+    from app import db
+    from app.models import Category
+
+    other = Category(name='Other', slug='other')
+    db.session.add(other)
+    db.session.commit()
+    post = make_post()
+    post.status = 'draft'
+    db.session.commit()
+    db.session.refresh(category)
+    assert (category.published_count, category.total_count) == (0, 1)
+
+    post.category_id = other.id
+    db.session.commit()
+    db.session.refresh(category)
+    db.session.refresh(other)
+    assert (category.published_count, category.total_count) == (0, 0)
+    assert (other.published_count, other.total_count) == (0, 1)
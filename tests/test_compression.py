@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""動態回應壓縮與可重複使用的 gzip 段落（app.compression）"""
+import gzip
+import re
+
+import pytest
+
+PLACEHOLDER = b'@@NONCE@@'
+NONCE = b'r4nd0m-N0nce_value'
+
+
+@pytest.fixture
+def compression(app):
+    app.config['COMPRESSION_ENABLED'] = True
+    app.config['COMPRESSION_MIN_SIZE'] = 100
+    return app
+
+
+@pytest.fixture
+def routes(compression):
+    """測試用路由（須在第一個請求之前註冊）"""
+    from flask import Response, stream_with_context
+
+    def page():
+        response = Response('<p>' + 'x' * 2000 + '</p>', mimetype='text/html')
+        response.set_etag('page-v1')
+        return response
+
+    def stream():
+        def generate():
+            for i in range(100):
+                yield f'<p>chunk {i} ' + 'y' * 200 + '</p>\n'
+        return Response(stream_with_context(generate()), mimetype='text/html')
+
+    compression.add_url_rule('/_test/page', 'test_page', page)
+    compression.add_url_rule('/_test/stream', 'test_stream', stream)
+    return compression
+
+
+@pytest.mark.parametrize('body', [
+    b'<html>@@NONCE@@ start</html>',
+    b'<script nonce="@@NONCE@@">x</script>' + b'<p>middle</p>' * 500,
+    b'<p>end</p>' * 500 + b'@@NONCE@@',
+    b'@@NONCE@@<a>@@NONCE@@</a>' + b'z' * 70000 + b'@@NONCE@@@@NONCE@@',
+    b'no placeholder at all',
+    b'@@NONCE@@',
+])
+def test_assembled_gzip_round_trips(app, body):
+    from app.compression import assemble_gzip, build_gzip_segments
+
+    expected = body.replace(PLACEHOLDER, NONCE)
+    assembled = assemble_gzip(build_gzip_segments(body, PLACEHOLDER), NONCE, expected)
+    assert gzip.decompress(assembled) == expected
+
+
+def test_streamed_response_is_compressed(client, routes):
+    response = client.get('/_test/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    body = gzip.decompress(response.get_data()).decode('utf-8')
+    assert body.startswith('<p>chunk 0 ') and '<p>chunk 99 ' in body
+
+
+def test_compressed_response_varies_and_weakens_the_etag(client, routes):
+    response = client.get('/_test/page', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['ETag'] == 'W/"page-v1"'
+    assert gzip.decompress(response.get_data()) == b'<p>' + b'x' * 2000 + b'</p>'
+
+
+@pytest.mark.parametrize('path', ['/_test/page', '/_test/stream'])
+def test_clients_without_gzip_get_the_identity_body(client, routes, path):
+    response = client.get(path, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.get_data().startswith(b'<p>')
+
+
+def test_cached_page_reuses_segments_with_the_request_nonce(client, compression, make_post):
+    compression.config['PAGE_CACHE_ENABLED'] = True
+    make_post()
+    client.get('/')
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    body = gzip.decompress(response.get_data()).decode('utf-8')
+    nonce = re.search(r"'nonce-([^']+)'", response.headers['Content-Security-Policy']).group(1)
+    assert f'nonce="{nonce}"' in body
+    assert compression.config['CSP_NONCE_PLACEHOLDER'] not in body
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""公開頁面的條件式請求（ETag / Last-Modified 與 304）"""
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Category, Post
+
+
+@pytest.fixture
+def conditional(app):
+    app.config['CONDITIONAL_GET_ENABLED'] = True
+    return app
+
+
+@pytest.fixture
+def statements(app):
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement.lower())
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+
+def test_index_304_without_aggregate_query(client, conditional, make_post, statements):
+    make_post()
+    etag = client.get('/').headers['ETag']
+    statements.clear()
+    response = revalidate(client, '/', etag)
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert not any('max(' in s or 'count(' in s for s in statements)
+
+
+def test_index_etag_changes_after_post_write(client, conditional, make_post):
+    make_post()
+    etag = client.get('/').headers['ETag']
+    make_post(title='Another')
+    assert revalidate(client, '/', etag).status_code == 200
+
+
+def test_index_etag_changes_after_post_delete(client, conditional, make_post):
+    make_post()
+    post = make_post()
+    etag = client.get('/').headers['ETag']
+    db.session.delete(post)
+    db.session.commit()
+    assert revalidate(client, '/', etag).status_code == 200
+
+
+def test_category_page_304_and_rename(client, conditional, make_post, category):
+    from app.services.category_service import CategoryService
+
+    make_post()
+    etag = client.get('/category/tech/').headers['ETag']
+    assert revalidate(client, '/category/tech/', etag).status_code == 304
+    category.name = 'Technology'
+    db.session.commit()
+    CategoryService.clear_category_cache()
+    assert revalidate(client, '/category/tech/', etag).status_code == 200
+
+
+def test_post_page_304_and_last_modified(client, conditional, make_post):
+    make_post()
+    first = client.get('/post-0/')
+    assert first.status_code == 200
+    assert revalidate(client, '/post-0/', first.headers['ETag']).status_code == 304
+    response = client.get('/post-0/', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert response.status_code == 304
+
+
+def test_post_page_etag_changes_when_moved_in_bulk(client, conditional, make_post, category):
+    post = make_post()
+    etag = client.get('/post-0/').headers['ETag']
+    other = Category(name='Other', slug='other')
+    db.session.add(other)
+    db.session.commit()
+    # 不經過 ORM 事件、不更新 updated_at 的批次搬移
+    Post.query.filter_by(id=post.id).update({'category_id': other.id}, synchronize_session=False)
+    db.session.commit()
+    db.session.expire_all()
+    assert revalidate(client, '/post-0/', etag).status_code == 200
+
+
+def test_logged_in_etag_differs_from_anonymous(client, conditional, make_post, login):
+    make_post()
+    anonymous = client.get('/').headers['ETag']
+    login()
+    response = revalidate(client, '/', anonymous)
+    assert response.status_code == 200
+    assert 'private' in response.headers['Cache-Control']
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""PostForm 的分類選單"""
+from sqlalchemy import event
+
+
+def test_category_choices_come_from_the_cached_views(app, category):
+    from app import db
+    from app.forms import PostForm
+    from app.models import Category
+    from app.services.category_service import CategoryService
+
+    uncategorized = CategoryService.get_or_create_default_category()
+    db.session.add(Category(name='Art', slug='art'))
+    db.session.commit()
+    CategoryService.clear_category_cache()
+    statements = []
+
+    def record(*args):
+        statements.append(args[2])
+
+    with app.test_request_context('/'):
+        PostForm()._update_category_choices()
+        event.listen(db.engine, 'before_cursor_execute', record)
+        form = PostForm()
+        form._update_category_choices()
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    names = [name for _id, name in form.category.choices]
+    assert names == ['Select Category', uncategorized.name, 'Art', 'Tech']
+    assert statements == []
+
+
+def test_new_category_appears_after_invalidation(app, category):
+    from app import db
+    from app.forms import PostForm
+    from app.models import Category
+    from app.services.category_service import CategoryService
+
+    with app.test_request_context('/'):
+        PostForm()._update_category_choices()
+        db.session.add(Category(name='Zoo', slug='zoo'))
+        db.session.commit()
+        CategoryService.clear_category_cache()
+        form = PostForm()
+        form._update_category_choices()
+
+    assert form.category.choices[-1][1] == 'Zoo'
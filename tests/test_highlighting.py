@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""程式碼高亮樣式表（css/pygments.css）"""
+import re
+
+import pytest
+
+pytest.importorskip('pygments')
+
+
+def test_every_rule_is_scoped_to_highlight():
+    from app.highlighting import stylesheet_css
+
+    for selector in re.findall(r'^([^{]+)\{', stylesheet_css(), re.M):
+        assert '.highlight' in selector, selector
+
+
+def test_committed_stylesheet_is_current(app):
+    from app.highlighting import stylesheet_is_current
+
+    assert stylesheet_is_current(app.static_folder, app.config['PYGMENTS_STYLE'])
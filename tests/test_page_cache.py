@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""匿名訪客的整頁快取（PageCacheService）"""
+import pytest
+
+
+@pytest.fixture
+def page_cache(app):
+    app.config['PAGE_CACHE_ENABLED'] = True
+    return app
+
+
+def test_second_request_is_a_hit(client, page_cache, make_post):
+    make_post()
+    assert client.get('/').headers['X-Cache'] == 'MISS'
+    response = client.get('/')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert 'Post 0' in response.get_data(as_text=True)
+
+
+def test_unknown_query_arguments_share_the_entry(client, page_cache, make_post):
+    make_post()
+    client.get('/')
+    for query in ('?x=1', '?x=2', '?utm_source=feed&x=3', '?q='):
+        assert client.get('/' + query).headers['X-Cache'] == 'HIT'
+
+
+def test_relevant_query_arguments_get_their_own_entry(client, page_cache, make_post):
+    make_post()
+    client.get('/')
+    assert client.get('/?page=2').headers['X-Cache'] == 'MISS'
+    assert client.get('/?page=2&x=1').headers['X-Cache'] == 'HIT'
+
+
+def test_clear_category_cache_invalidates_cached_pages(client, page_cache, make_post):
+    from app.services.category_service import CategoryService
+
+    make_post()
+    client.get('/')
+    make_post(title='Fresh post')
+    CategoryService.clear_category_cache()
+    response = client.get('/')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Fresh post' in response.get_data(as_text=True)
+
+
+def test_logged_in_users_bypass_the_cache(client, page_cache, make_post, login):
+    make_post()
+    login()
+    assert 'X-Cache' not in client.get('/').headers
+
+
+def test_post_commit_invalidates_cached_pages(client, page_cache, make_post):
+    from app import db
+
+    post = make_post()
+    client.get('/')
+    post.title = 'Renamed post'
+    db.session.commit()
+    response = client.get('/')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Renamed post' in response.get_data(as_text=True)
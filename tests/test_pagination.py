@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""鍵集分頁（app/pagination.py 與公開列表頁）"""
+import re
+from datetime import datetime
+
+import pytest
+
+from app.models import Post
+from app.pagination import KeysetPagination, decode_cursor, encode_cursor
+
+
+def paginate(per_page, **kwargs):
+    query = Post.query.filter_by(status='published')
+    return KeysetPagination(query, per_page, Post.created_at, Post.id, **kwargs)
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize('token', [None, '', 'not-base64!!', 'Zm9v', encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_invalid_cursor_decodes_to_none(token):
+    assert decode_cursor(token) is None
+
+
+def test_forward_and_backward_walks_cover_every_post_once(make_post):
+    # 相同 created_at 的文章以 id 決定順序，不可重複或遺漏
+    same_time = datetime(2024, 3, 1)
+    for i in range(7):
+        make_post(created_at=same_time if i % 2 else datetime(2024, 2, 1 + i))
+    make_post(status='draft')
+    expected = [p.id for p in Post.query.filter_by(status='published')
+                .order_by(Post.created_at.desc(), Post.id.desc())]
+
+    pages, cursor = [], None
+    while True:
+        page = paginate(3, after=decode_cursor(cursor))
+        pages.append([p.id for p in page.items])
+        if not page.has_next:
+            assert page.next_cursor is None
+            break
+        cursor = page.next_cursor
+    assert [i for ids in pages for i in ids] == expected
+    assert [len(ids) for ids in pages] == [3, 3, 1]
+
+    # 由最後一頁以 before 游標往回走，得到相同的頁面
+    page = paginate(3, after=decode_cursor(cursor))
+    backwards = [[p.id for p in page.items]]
+    while page.has_prev:
+        page = paginate(3, before=decode_cursor(page.prev_cursor))
+        backwards.append([p.id for p in page.items])
+    assert backwards[::-1] == pages
+
+
+def test_exactly_one_full_page_has_no_next(make_post):
+    for _ in range(3):
+        make_post()
+    page = paginate(3)
+    assert len(page.items) == 3
+    assert not page.has_next and not page.has_prev
+    assert page.total == 3
+
+
+def test_empty_listing(app):
+    page = paginate(3)
+    assert page.items == []
+    assert page.next_cursor is None and page.prev_cursor is None
+
+
+def test_index_links_follow_cursors(client, app, make_post):
+    app.config['POSTS_PER_PAGE'] = 2
+    for _ in range(5):
+        make_post()
+    response = client.get('/')
+    assert response.status_code == 200
+    next_url = re.search(r'href="(/\?after=[^"]+)"', response.get_data(as_text=True)).group(1)
+    second = client.get(next_url)
+    assert second.status_code == 200
+    assert 'Post 2' in second.get_data(as_text=True)
+    assert 'Post 4' not in second.get_data(as_text=True)
+
+
+def test_invalid_cursor_is_404(client, make_post):
+    make_post()
+    assert client.get('/?after=garbage').status_code == 404
+    assert client.get('/?before=garbage').status_code == 404
+
+
+def test_legacy_page_numbers_still_work(client, app, make_post):
+    app.config['POSTS_PER_PAGE'] = 2
+    for _ in range(5):
+        make_post()
+    response = client.get('/?page=3')
+    assert response.status_code == 200
+    assert 'Post 0' in response.get_data(as_text=True)
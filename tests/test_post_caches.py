@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""文章異動後的快取失效（提交後每個命名空間一次）"""
+import pytest
+
+
+@pytest.fixture
+def invalidations(app, monkeypatch):
+    from app import models
+
+    calls = []
+    original = models.invalidate_namespace
+
+    def record(*namespaces):
+        calls.extend(namespaces)
+        original(*namespaces)
+
+    monkeypatch.setattr(models, 'invalidate_namespace', record)
+    return calls
+
+
+def test_post_commit_invalidates_each_namespace_once(make_post, invalidations):
+    from app import db
+
+    post = make_post()
+    assert sorted(invalidations) == ['categories', 'pages', 'posts', 'stats']
+
+    invalidations.clear()
+    post.title = 'Renamed'
+    post.status = 'draft'
+    db.session.flush()
+    # flush 時不失效，提交後才失效
+    assert invalidations == []
+    db.session.commit()
+    assert sorted(invalidations) == ['categories', 'pages', 'posts', 'stats']
+
+
+def test_rollback_does_not_invalidate(make_post, invalidations):
+    from app import db
+
+    post = make_post()
+    invalidations.clear()
+    post.title = 'Never saved'
+    db.session.flush()
+    db.session.rollback()
+    assert invalidations == []
+
+
+def test_new_slug_passes_the_filter_after_commit(client, make_post):
+    client.get('/missing-post/')
+    make_post(slug='missing-post', title='Now here')
+    assert client.get('/missing-post/').status_code == 200
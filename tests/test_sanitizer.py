@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""文章內容寫入前的 HTML 清理（clean_post_content）"""
+import re
+
+import pytest
+
+UNSAFE = '<p>Hello</p><script>alert(1)</script><img src="x.png" onerror="alert(2)">'
+
+
+@pytest.fixture(params=['bleach', 'lxml'])
+def sanitizer(request, app):
+    app.config['HTML_SANITIZER'] = request.param
+    return request.param
+
+
+def _assert_clean(html):
+    assert '<script' not in html
+    assert 'onerror' not in html
+
+
+def test_unsafe_html_is_cleaned_on_insert(sanitizer, make_post):
+    post = make_post(content=UNSAFE)
+    _assert_clean(post.content)
+    _assert_clean(post.rendered_html)
+    assert 'Hello' in post.rendered_html
+
+
+def test_unsafe_html_is_cleaned_on_update(sanitizer, make_post):
+    from app import db
+
+    post = make_post()
+    post.content = UNSAFE
+    db.session.commit()
+    _assert_clean(post.content)
+    _assert_clean(post.rendered_html)
+
+
+def test_markdown_output_is_cleaned(sanitizer, make_post):
+    post = make_post(content=f'# Title\n\n{UNSAFE}\n', content_format='markdown')
+    _assert_clean(post.rendered_html)
+    assert '<h1' in post.rendered_html
+
+
+def test_flipping_markdown_to_html_cleans_the_unchanged_source(sanitizer, make_post):
+    """Markdown 文章的 content_hash 是未清理原始碼的雜湊，改為 HTML 時不可沿用"""
+    from app import db
+
+    post = make_post(content=UNSAFE, content_format='markdown')
+    post.content_format = 'html'
+    db.session.commit()
+    _assert_clean(post.content)
+    _assert_clean(post.rendered_html)
+
+
+def test_preset_hash_on_a_new_post_is_not_trusted(sanitizer, make_post):
+    from app.utils import content_digest
+
+    post = make_post(content=UNSAFE, content_hash=content_digest(UNSAFE))
+    _assert_clean(post.content)
+    _assert_clean(post.rendered_html)
+
+
+def test_unchanged_clean_content_is_not_parsed_again(sanitizer, make_post, monkeypatch):
+    from app import db
+    from app import models
+
+    post = make_post(content=UNSAFE)
+    calls = []
+    monkeypatch.setattr(models, 'clean_html_content', lambda html: calls.append(html) or html)
+    post.content = str(post.content)
+    post.title = 'Renamed'
+    db.session.commit()
+    assert calls == []
+
+
+def test_empty_markdown_output_never_falls_back_to_the_source(sanitizer, client, make_post, login):
+    """清理後為空的 Markdown 輸出不可改為輸出未清理的原始碼"""
+    post = make_post(content='<div><svg onload=alert(1)></svg></div>', content_format='markdown')
+    assert post.rendered_html == ''
+    assert 'onload' not in client.get(f'/{post.slug}/').get_data(as_text=True)
+    login()
+    response = client.get(f'/dashboard/preview_post/{post.id}/')
+    assert response.status_code == 200
+    assert 'onload' not in response.get_data(as_text=True)
+
+
+def test_unrendered_html_post_falls_back_to_the_cleaned_content(client, make_post):
+    from app import db
+    from app.models import Post
+
+    post = make_post(content='<p>Legacy body</p>')
+    db.session.execute(db.update(Post).values(rendered_html=None))
+    db.session.commit()
+    assert 'Legacy body' in client.get(f'/{post.slug}/').get_data(as_text=True)
+
+
+def test_status_change_does_not_load_deferred_content(make_post):
+    from sqlalchemy import event
+    from sqlalchemy.orm import defer
+
+    from app import db
+    from app.models import Post
+
+    post_id = make_post().id
+    db.session.expunge_all()
+    post = Post.query.options(defer(Post.content)).filter_by(id=post_id).one()
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        post.status = 'draft'
+        db.session.commit()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert not [s for s in statements if s.lstrip().startswith('SELECT') and re.search(r'posts\.content\b', s)]
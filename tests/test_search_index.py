@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""記憶體內倒排索引（MemorySearchIndex）"""
+import gzip
+import os
+
+import pytest
+
+
+def _index(documents):
+    """documents: 文章 ID -> (標題, 摘要, 內容)"""
+    from app.search_index import MemorySearchIndex
+
+    index = MemorySearchIndex()
+    for post_id, (title, description, body) in documents.items():
+        index.add(post_id, _scores(title, description, body))
+    return index
+
+
+def _scores(title, description='', body=''):
+    from app.search_index import MemorySearchIndex
+    from app.services.search_service import search_tokens
+
+    return dict(MemorySearchIndex.score_tokens(search_tokens(title), search_tokens(description), search_tokens(body)))
+
+
+def _search(index, query, offset=0, limit=10):
+    from app.services.search_service import search_tokens
+
+    return index.search(search_tokens(query), offset, limit)
+
+
+def test_all_terms_must_match():
+    index = _index({
+        1: ('Flask caching', '', ''),
+        2: ('Flask', '', 'templates'),
+        3: ('Caching', '', ''),
+    })
+    assert _search(index, 'flask caching') == ([1], 1)
+    # 分數相同時較新的文章（ID 較大）在前
+    assert _search(index, 'flask') == ([2, 1], 2)
+    assert _search(index, 'flask missing') == ([], 0)
+
+
+def test_title_ranks_above_description_above_body():
+    index = _index({
+        1: ('Other', '', 'flask cache'),
+        2: ('Other', 'flask cache', ''),
+        3: ('Flask cache', '', ''),
+    })
+    assert _search(index, 'flask cache') == ([3, 2, 1], 3)
+    assert _search(index, 'flask cache', offset=1, limit=1) == ([2], 3)
+
+
+def test_cjk_queries_match_bigrams_in_order():
+    from app.services.search_service import search_tokens
+
+    assert search_tokens('快取設計') == ['快取', '取設', '設計']
+    index = _index({
+        1: ('快取設計', '', ''),
+        2: ('設計與快取', '', ''),
+        3: ('其他', '', '談快取設計的細節'),
+    })
+    ids, total = _search(index, '快取設計')
+    assert (ids, total) == ([1, 3], 2)
+    assert _search(index, '快取')[1] == 3
+
+
+def test_removed_and_replaced_posts_are_not_returned():
+    index = _index({1: ('Flask', '', ''), 2: ('Flask', '', '')})
+    index.remove(1)
+    index.add(2, _scores('Django'))
+    assert _search(index, 'flask') == ([], 0)
+    assert _search(index, 'django') == ([2], 1)
+    assert len(index) == 1
+
+
+def test_snapshot_round_trips_without_deleted_entries(tmp_path):
+    from app.search_index import MemorySearchIndex
+
+    index = _index({1: ('Flask', '', ''), 2: ('Flask cache', '', ''), 3: ('Cache', '', '')})
+    index.remove(3)
+    path = str(tmp_path / 'index.bin')
+    index.save(path)
+    loaded = MemorySearchIndex.load(path)
+    assert len(loaded) == 2
+    assert _search(loaded, 'flask') == _search(index, 'flask')
+    assert _search(loaded, 'cache') == ([2], 1)
+
+
+def test_journal_is_replayed_after_the_snapshot(tmp_path):
+    from app.search_index import MemorySearchIndex
+
+    path = str(tmp_path / 'index.bin')
+    writer = _index({1: ('Flask', '', ''), 2: ('Cache', '', '')})
+    writer.save(path)
+    reader = MemorySearchIndex.load(path)
+
+    writer.append_journal(path, {3: _scores('Flask cache'), 2: None, 1: _scores('Django')})
+
+    for index in (MemorySearchIndex.load(path), reader):
+        assert index.refresh(path)
+        assert _search(index, 'flask') == ([3], 1)
+        assert _search(index, 'cache') == ([3], 1)
+        assert _search(index, 'django') == ([1], 1)
+
+
+def test_partial_journal_line_waits_for_the_rest(tmp_path):
+    from app.search_index import MemorySearchIndex
+
+    path = str(tmp_path / 'index.bin')
+    _index({}).save(path)
+    with open(MemorySearchIndex.journal_path(path), 'ab') as f:
+        f.write(b'{"id":1,"scores":{"flask":10}}\n{"id":2,"sc')
+    index = MemorySearchIndex.load(path)
+    assert _search(index, 'flask') == ([1], 1)
+    with open(MemorySearchIndex.journal_path(path), 'ab') as f:
+        f.write(b'ores":{"flask":5}}\n')
+    assert index.refresh(path)
+    assert _search(index, 'flask') == ([1, 2], 2)
+
+
+def test_rewritten_snapshot_requires_a_reload(tmp_path):
+    from app.search_index import MemorySearchIndex
+
+    path = str(tmp_path / 'index.bin')
+    _index({1: ('Flask', '', '')}).save(path)
+    reader = MemorySearchIndex.load(path)
+    _index({2: ('Flask', '', '')}).save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, reader.mtime + 1_000_000))
+    assert not reader.refresh(path)
+
+
+@pytest.mark.parametrize('data', [
+    b'not gzip at all',
+    gzip.compress(b'FBSI'),
+    gzip.compress(b'XXXX' + b'\x00' * 16),
+])
+def test_corrupt_snapshot_raises_value_error(data):
+    from app.search_index import MemorySearchIndex
+
+    with pytest.raises(ValueError):
+        MemorySearchIndex.loads(data)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""全文搜尋（SearchService）"""
+import pytest
+
+
+def _recreate_tables():
+    """清除 engine 的檢查結果後重建資料表（須在建立任何資料之前）"""
+    from app import db
+    from app.services import search_service
+
+    db.session.remove()
+    db.drop_all()
+    search_service._fts5_support.pop(db.engine, None)
+    search_service._index_ready.pop(db.engine, None)
+    db.create_all()
+
+
+@pytest.fixture
+def without_fts5(app, monkeypatch):
+    from app.services import search_service
+
+    monkeypatch.setattr(search_service, 'sqlite_has_fts5', lambda connection: False)
+    _recreate_tables()
+
+
+def _has_fts_table():
+    from app import db
+    from app.services.search_service import SQLITE_TABLE
+
+    return db.inspect(db.engine).has_table(SQLITE_TABLE)
+
+
+def test_database_search_uses_fts5(make_post):
+    from app.services.search_service import SearchService
+
+    make_post(title='Flask caching')
+    make_post(title='Other')
+    results = SearchService.search('caching')
+    assert [post.title for post in results.items] == ['Flask caching']
+
+
+def test_sqlite_without_fts5_degrades_instead_of_failing(app, without_fts5, make_post):
+    from app.services.search_service import SearchService
+
+    assert not _has_fts_table()
+
+    make_post(title='Flask caching')
+    assert SearchService.reindex() == 0
+    assert SearchService.search('caching').total == 0
+    result = app.test_cli_runner().invoke(args=['search', 'reindex'])
+    assert result.exit_code == 0
+
+
+def test_memory_backend_does_not_create_the_fts_table(app):
+    app.config['SEARCH_BACKEND'] = 'memory'
+    _recreate_tables()
+    assert not _has_fts_table()
+
+
+@pytest.fixture
+def memory_backend(app):
+    app.config['SEARCH_BACKEND'] = 'memory'
+    return app
+
+
+def _titles(query):
+    from app.services.search_service import SearchService
+
+    return [post.title for post in SearchService.search(query).items]
+
+
+def test_memory_index_follows_committed_changes(memory_backend, make_post):
+    from app import db
+    from app.search_index import MemorySearchIndex
+    from app.services.search_service import SearchService
+
+    make_post(title='Flask caching')
+    assert _titles('caching') == ['Flask caching']
+
+    post = make_post(title='Redis caching')
+    assert _titles('caching') == ['Redis caching', 'Flask caching']
+
+    post.title = 'Redis queues'
+    db.session.commit()
+    assert _titles('caching') == ['Flask caching']
+    assert _titles('queues') == ['Redis queues']
+
+    post.status = 'draft'
+    db.session.commit()
+    assert _titles('queues') == []
+
+    post.status = 'published'
+    db.session.commit()
+    assert _titles('queues') == ['Redis queues']
+
+    db.session.delete(post)
+    db.session.commit()
+    assert _titles('queues') == []
+
+    # 變更已寫入日誌：重新載入的 worker 看到相同結果
+    reloaded = MemorySearchIndex.load(SearchService.memory_index_path())
+    assert len(reloaded) == 1
+
+
+def test_changes_before_the_first_search_are_picked_up(memory_backend, make_post):
+    import os
+
+    from app.services.search_service import SearchService
+
+    make_post(title='Flask caching')
+    assert not os.path.exists(SearchService.memory_index_path())
+    assert _titles('caching') == ['Flask caching']
+
+
+def test_corrupt_snapshot_is_rebuilt_from_the_database(memory_backend, make_post, caplog):
+    from app.services.search_service import SearchService
+
+    make_post(title='Flask caching')
+    SearchService.reindex()
+    memory_backend.extensions.pop('search_index')
+    with open(SearchService.memory_index_path(), 'wb') as f:
+        f.write(b'garbage')
+
+    assert _titles('caching') == ['Flask caching']
+    assert 'unusable' in caplog.text
+
+
+def test_snapshot_rewritten_by_another_worker_is_reloaded(memory_backend, make_post):
+    import os
+
+    from app.search_index import MemorySearchIndex
+    from app.services.search_service import SearchService
+
+    post = make_post(title='Flask caching')
+    assert _titles('caching') == ['Flask caching']
+    before = SearchService.get_memory_index()
+
+    path = SearchService.memory_index_path()
+    other = MemorySearchIndex.load(path)
+    other.add(post.id, dict(SearchService.document_scores('Flask queues', '', '')))
+    other.save(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, before.mtime + 1_000_000))
+
+    # 只有重新載入的快照含有 queues（文章本身仍由資料庫讀取）
+    assert _titles('queues') == ['Flask caching']
+    assert SearchService.get_memory_index() is not before
+
+
+def test_memory_search_requires_every_term_and_ranks_titles_first(memory_backend, make_post):
+    make_post(title='Other', description='Misc', content='<p>快取設計</p>')
+    make_post(title='快取設計', description='Notes')
+    make_post(title='快取', description='設計')
+    assert _titles('快取設計') == ['快取設計', 'Other']
+    assert _titles('快取 notes') == ['快取設計']
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""安全標頭與 CSP nonce 佔位符"""
+import re
+
+
+def test_nonce_placeholder_is_derived_from_the_secret_key(app):
+    from app import csp_nonce_placeholder
+
+    placeholder = app.config['CSP_NONCE_PLACEHOLDER']
+    assert placeholder == csp_nonce_placeholder('test-secret-key')
+    assert placeholder != csp_nonce_placeholder('another-secret-key')
+    assert placeholder != '__CSP_NONCE_PLACEHOLDER__'
+    assert csp_nonce_placeholder(None) != csp_nonce_placeholder(None)
+
+
+def test_rendered_scripts_get_the_request_nonce(app, client):
+    response = client.get('/')
+    nonce = re.search(r"'nonce-([^']+)'", response.headers['Content-Security-Policy']).group(1)
+    body = response.get_data(as_text=True)
+    assert f'nonce="{nonce}"' in body
+    assert app.config['CSP_NONCE_PLACEHOLDER'] not in body
+
+
+def test_well_known_placeholder_in_content_gets_no_nonce(client, make_post):
+    post = make_post(content='<p>__CSP_NONCE_PLACEHOLDER__</p>')
+    response = client.get(f'/{post.slug}/')
+    nonce = re.search(r"'nonce-([^']+)'", response.headers['Content-Security-Policy']).group(1)
+    body = response.get_data(as_text=True)
+    assert '<p>__CSP_NONCE_PLACEHOLDER__</p>' in body
+    assert body.count(nonce) == body.count('nonce="')
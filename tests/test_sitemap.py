@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""預先產生的網站地圖（SitemapService）"""
+import os
+
+import pytest
+
+
+@pytest.fixture
+def precomputed(app):
+    app.config['SITEMAP_PRECOMPUTED'] = True
+    app.config['SITEMAP_BASE_URL'] = 'https://blog.example.com'
+    return app
+
+
+def _artifact(name):
+    from app.services.sitemap_service import SitemapService
+    return SitemapService.artifact_path(name)
+
+
+def test_links_use_the_configured_base_url_not_the_host_header(client, precomputed, make_post):
+    make_post()
+    body = client.get('/sitemap.xml', headers={'Host': 'evil.example'}).get_data(as_text=True)
+    assert 'https://blog.example.com/post-0/' in body
+    assert 'evil.example' not in body
+    with open(_artifact('sitemap.xml'), encoding='utf-8') as f:
+        assert 'evil.example' not in f.read()
+
+
+def test_without_a_base_url_nothing_is_persisted(app, client, make_post):
+    from app.services.sitemap_service import SitemapService
+
+    app.config['SITEMAP_PRECOMPUTED'] = True
+    make_post()
+    assert not SitemapService.is_enabled()
+    assert client.get('/sitemap.xml').status_code == 200
+    assert not os.path.exists(SitemapService.get_directory())
+
+
+def test_server_name_is_used_as_the_base_url(app):
+    from app.services.sitemap_service import SitemapService
+
+    app.config['SERVER_NAME'] = 'blog.example.com'
+    app.config['PREFERRED_URL_SCHEME'] = 'https'
+    assert SitemapService.base_url() == 'https://blog.example.com/'
+
+
+def test_apply_changes_without_state_does_nothing(precomputed, make_post, caplog):
+    from app.services.sitemap_service import SitemapService
+
+    make_post()
+    assert SitemapService.apply_changes([], [1]) is False
+    assert not os.path.exists(SitemapService.get_directory())
+    assert not [r for r in caplog.records if r.levelname == 'ERROR']
+
+
+def test_commit_updates_the_precomputed_sitemap(client, precomputed, make_post):
+    from app import db
+
+    post = make_post()
+    client.get('/sitemap.xml')
+    make_post(slug='fresh-post')
+    post.status = 'draft'
+    db.session.commit()
+    body = client.get('/sitemap.xml').get_data(as_text=True)
+    assert '/fresh-post/' in body
+    assert '/post-0/' not in body
+
+
+def test_only_changed_shards_are_rewritten(client, precomputed, make_post):
+    from app import db
+    from app.services.sitemap_service import SitemapService
+
+    precomputed.config['SITEMAP_MAX_URLS'] = 3
+    # 靜態頁面佔 1 個 URL：分片 1 = 靜態 + post-0、post-1，分片 2 = post-2..4，分片 3 = post-5..7
+    posts = [make_post(updated_at=None) for _ in range(8)]
+    SitemapService.rebuild()
+
+    def inodes():
+        return {name: os.stat(_artifact(name)).st_ino
+                for name in ('sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml', 'sitemap-3.xml.gz')}
+
+    before = inodes()
+    posts[6].slug = 'renamed-post'
+    db.session.commit()
+    after = inodes()
+
+    assert after['sitemap-2.xml'] == before['sitemap-2.xml']
+    assert after['sitemap-3.xml'] != before['sitemap-3.xml']
+    assert after['sitemap-3.xml.gz'] != before['sitemap-3.xml.gz']
+    body = client.get('/sitemap-3.xml').get_data(as_text=True)
+    assert '/renamed-post/' in body and '/post-6/' not in body
+
+
+def test_rebuild_command_can_skip_when_unconfigured(app):
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['sitemap', 'rebuild']).exit_code != 0
+    result = runner.invoke(args=['sitemap', 'rebuild', '--if-configured'])
+    assert result.exit_code == 0
+    assert 'skipped' in result.output
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""文章 slug 的 Bloom filter（SlugFilterService）"""
+from collections import OrderedDict
+
+import pytest
+
+
+@pytest.fixture
+def post_queries(app):
+    """記錄對 posts 表的 SELECT"""
+    from sqlalchemy import event
+
+    from app import db
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'posts' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _stale_filter(app):
+    """模擬另一個 worker 在文章新增前建立、尚未看到新版本號的過濾器"""
+    from app.cache_namespaces import namespace_version
+    from app.services.slug_filter_service import MIN_CAPACITY, BloomFilter, SlugFilter
+
+    app.extensions['slug_filter'] = SlugFilter(namespace_version('posts'), BloomFilter(MIN_CAPACITY), OrderedDict())
+
+
+def test_post_created_after_the_filter_was_built_is_found(app, client, make_post):
+    make_post()
+    assert client.get('/post-0/').status_code == 200
+    post = make_post(slug='fresh-post')
+    _stale_filter(app)
+
+    assert client.get(f'/{post.slug}/').status_code == 200
+    assert post.slug in app.extensions['slug_filter'].slugs
+
+
+def test_confirmed_misses_are_remembered(app, client, make_post, post_queries):
+    make_post()
+    assert client.get('/missing-post/').status_code == 404
+    post_queries.clear()
+    assert client.get('/missing-post/').status_code == 404
+    assert post_queries == []
+
+
+def test_own_commits_are_added_without_waiting_for_the_miss_ttl(app, client, make_post, monkeypatch):
+    from app import models
+
+    # 版本號不變：只靠提交後加入本程序的過濾器
+    monkeypatch.setattr(models, 'invalidate_namespace', lambda *namespaces: None)
+    make_post()
+    assert client.get('/later-post/').status_code == 404
+    make_post(slug='later-post')
+    assert client.get('/later-post/').status_code == 200
+
+
+def test_expired_miss_is_checked_again(app, client, make_post, monkeypatch):
+    from app import models
+    from app.services.slug_filter_service import SlugFilterService
+
+    # 模擬另一個 worker 的提交：本程序的過濾器與版本號都不變
+    monkeypatch.setattr(models, 'invalidate_namespace', lambda *namespaces: None)
+    monkeypatch.setattr(SlugFilterService, 'add_slugs', staticmethod(lambda slugs: None))
+    app.config['SLUG_FILTER_MISS_TTL'] = 0
+    make_post()
+    assert client.get('/late-post/').status_code == 404
+    make_post(slug='late-post')
+    assert client.get('/late-post/').status_code == 200
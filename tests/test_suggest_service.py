@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""搜尋框即時建議（SuggestService）"""
+
+
+def _suggest(app, query, **kwargs):
+    from app.services.suggest_service import SuggestService
+
+    with app.test_request_context('/'):
+        return [(item['type'], item['title']) for item in SuggestService.suggest(query, **kwargs)[1]]
+
+
+def test_prefix_matches_categories_before_titles(app, make_post):
+    make_post(title='Technical debt')
+    make_post(title='Other notes')
+    assert _suggest(app, 'tec') == [('category', 'Tech'), ('post', 'Technical debt')]
+    assert _suggest(app, 'debt') == [('post', 'Technical debt')]
+    assert _suggest(app, 'ebt') == []
+
+
+def test_matching_ignores_case_width_and_punctuation(app, make_post):
+    make_post(title='Flask-Caching 入門')
+    assert _suggest(app, 'ＦＬＡＳＫ') == [('post', 'Flask-Caching 入門')]
+    assert _suggest(app, 'flask caching') == [('post', 'Flask-Caching 入門')]
+    assert _suggest(app, 'caching') == [('post', 'Flask-Caching 入門')]
+
+
+def test_cjk_titles_match_from_any_character(app, make_post):
+    make_post(title='快取設計筆記')
+    assert _suggest(app, '設計') == [('post', '快取設計筆記')]
+    assert _suggest(app, '筆記') == [('post', '快取設計筆記')]
+
+
+def test_results_are_limited_and_ordered_by_key(app, make_post):
+    from app.services.suggest_service import MAX_SUGGESTIONS
+
+    for letter in 'edcbajihgf':
+        make_post(title=f'Flask {letter}')
+    make_post(title='Flask draft', status='draft')
+
+    assert _suggest(app, 'flask', limit=3) == [('post', 'Flask a'), ('post', 'Flask b'), ('post', 'Flask c')]
+    results = _suggest(app, 'flask')
+    assert len(results) == MAX_SUGGESTIONS
+    assert ('post', 'Flask draft') not in results
+
+
+def test_equal_keys_list_newer_posts_first(app, make_post):
+    from app.services.suggest_service import SuggestService
+
+    make_post(title='Same title')
+    newer = make_post(title='Same title')
+
+    with app.test_request_context('/'):
+        urls = [item['url'] for item in SuggestService.suggest('same')[1]]
+    assert urls[0] == f'/{newer.slug}/'
+
+
+def test_post_committed_after_the_index_was_built_is_suggested(app, make_post):
+    from app import db
+
+    make_post(title='Flask caching')
+    assert _suggest(app, 'zeb') == []
+
+    post = make_post(title='Zebra notes')
+    assert _suggest(app, 'zeb') == [('post', 'Zebra notes')]
+
+    post.status = 'draft'
+    db.session.commit()
+    assert _suggest(app, 'zeb') == []
+
+
+def test_suggest_endpoint_etag_changes_after_commit(client, make_post):
+    make_post(title='Flask caching')
+    first = client.get('/search/suggest?q=fla')
+    assert first.get_json()['suggestions'][0]['title'] == 'Flask caching'
+    assert client.get('/search/suggest?q=fla', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    make_post(title='Flask routing')
+    second = client.get('/search/suggest?q=fla', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert [item['title'] for item in second.get_json()['suggestions']] == ['Flask caching', 'Flask routing']